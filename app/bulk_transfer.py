@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+"""
+Streaming NDJSON import and export of favorites and playlists.
+
+Exports are generated a chunk of lines at a time. Imports read the request
+body one line at a time, so memory use does not grow with the upload: a
+record is parsed, validated and normalized, then either spooled to disk
+(favorites) or merged (playlists, which are small enough to live in
+state.json anyway). Nothing is committed until the whole body has been
+read, and then it is committed once.
+
+Favorites are one JSON object per line, as exported:
+
+    {"name": "Cozy Fireplace", "url": "https://youtu.be/L_LUpnjgPso"}
+    {"name": "Logs", "filename": "logs.mp4"}
+
+Playlists are one playlist per line:
+
+    {"name": "evening", "videos": ["logs.mp4", "embers.mp4"]}
+"""
+
+import json
+import logging
+import re
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    # Try relative import first (when run as module)
+    from .validators import FavoritesValidator, FileValidator
+except ImportError:
+    # Fall back to direct import (when run as script)
+    from validators import FavoritesValidator, FileValidator
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+# Longer lines are rejected without being held in memory
+MAX_LINE_BYTES = 64 * 1024
+# Request body read size
+READ_CHUNK_BYTES = 64 * 1024
+# Records encoded per chunk of a streamed export
+EXPORT_CHUNK_RECORDS = 256
+# Per-line errors listed in an import report; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+# Imported favorites spooled in memory before moving to a temp file
+SPOOL_MAX_BYTES = 1024 * 1024
+# Same rule as the playlists keys in the state schema
+PLAYLIST_NAME = re.compile(r'^[a-zA-Z0-9_-]+$')
+
+
+class ImportReport:
+    """What an import did, with the first few rejected lines and why."""
+
+    def __init__(self):
+        self.imported = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def reject(self, line: int, error: str):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "errors": self.errors,
+        }
+
+
+def encode_ndjson(records: Iterable[Any]) -> Iterator[str]:
+    """NDJSON for records, EXPORT_CHUNK_RECORDS lines per yielded chunk."""
+    chunk = []
+    for record in records:
+        chunk.append(json.dumps(record, separators=(',', ':')))
+        if len(chunk) == EXPORT_CHUNK_RECORDS:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def read_lines(stream) -> Iterator[Optional[bytes]]:
+    """Lines of a binary stream without their newlines, read a chunk at a time.
+
+    A line longer than MAX_LINE_BYTES comes out as None; it is discarded
+    as it is read rather than buffered. Request streams are unbuffered, so
+    readline() on them would cost a call per byte.
+    """
+    pending = b""
+    skipping = False
+    while True:
+        chunk = stream.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if skipping:
+                skipping = False
+                yield None
+            else:
+                yield line if len(line) <= MAX_LINE_BYTES else None
+        if len(pending) > MAX_LINE_BYTES:
+            pending = b""
+            skipping = True
+    if skipping:
+        yield None
+    elif pending:
+        yield pending if len(pending) <= MAX_LINE_BYTES else None
+
+
+def iter_ndjson(stream, report: ImportReport) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(line number, object) for each JSON object line of a binary stream.
+
+    Blank lines are skipped; anything else that is not a JSON object within
+    MAX_LINE_BYTES is recorded in report and skipped.
+    """
+    for number, line in enumerate(read_lines(stream), 1):
+        if line is None:
+            report.reject(number, f"line longer than {MAX_LINE_BYTES} bytes")
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            report.reject(number, f"invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            report.reject(number, "expected a JSON object")
+            continue
+        yield number, record
+
+
+def favorite_from_record(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """A new favorite for an imported or exported record, or None if it is not valid.
+
+    Ids are always fresh so they cannot collide with this unit's favorites;
+    the name and creation date are kept.
+    """
+    name = record.get("name")
+    if isinstance(record.get("url"), str):
+        favorite = FavoritesValidator.create_favorite_from_online(name, record["url"].strip())
+    elif isinstance(record.get("filename"), str):
+        filename = record["filename"]
+        if FileValidator.sanitize_filename(filename) != filename:
+            return None
+        favorite = FavoritesValidator.create_favorite_from_offline(name, filename)
+    else:
+        return None
+
+    if favorite is not None and isinstance(record.get("created_date"), str):
+        favorite["created_date"] = record["created_date"]
+    return favorite
+
+
+def spool_favorites(stream, report: ImportReport, validate=None):
+    """Read and validate favorites from stream into a temp file; returns (file, count).
+
+    Memory stays bounded however long the body is, and the favorites store
+    is not locked while a slow client uploads.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode='w+')
+    count = 0
+    try:
+        for number, record in iter_ndjson(stream, report):
+            favorite = favorite_from_record(record)
+            if favorite is None or (validate and not validate(favorite)):
+                report.reject(number, "not a valid favorite")
+                continue
+            spool.write(json.dumps(favorite, separators=(',', ':')) + "\n")
+            count += 1
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, count
+
+
+def read_spool(spool) -> Iterator[Dict[str, Any]]:
+    for line in spool:
+        yield json.loads(line)
+
+
+def playlist_from_record(record: Dict[str, Any]) -> Optional[Tuple[str, List[str]]]:
+    """(name, videos) for a playlist record, or None if it is not valid."""
+    name = record.get("name")
+    videos = record.get("videos")
+    if not isinstance(name, str) or not PLAYLIST_NAME.match(name) or not isinstance(videos, list):
+        return None
+    for video in videos:
+        if (not isinstance(video, str) or FileValidator.sanitize_filename(video) != video
+                or not FileValidator.is_supported_video(video)):
+            return None
+    return name, videos
+
+
+def read_playlists(stream, report: ImportReport) -> Dict[str, List[str]]:
+    """Playlists in stream; lines naming the same playlist are combined, repeats counted as duplicates."""
+    imported: Dict[str, List[str]] = {}
+    members: Dict[str, set] = {}
+    for number, record in iter_ndjson(stream, report):
+        playlist = playlist_from_record(record)
+        if playlist is None:
+            report.reject(number, "not a valid playlist")
+            continue
+        name, videos = playlist
+        target = imported.setdefault(name, [])
+        seen = members.setdefault(name, set())
+        for video in videos:
+            if video in seen:
+                report.duplicates += 1
+            else:
+                seen.add(video)
+                target.append(video)
+    return imported
+
+
+def merge_playlists(playlists: Dict[str, List[str]], imported: Dict[str, List[str]],
+                    report: ImportReport) -> Dict[str, List[str]]:
+    """playlists with imported merged in; playlists itself is not modified.
+
+    A playlist that already exists keeps its order and gains the imported
+    videos it did not have.
+    """
+    merged = dict(playlists)
+    for name, videos in imported.items():
+        existing = set(merged.get(name, ()))
+        added = [video for video in videos if video not in existing]
+        report.duplicates += len(videos) - len(added)
+        if added:
+            merged[name] = list(merged.get(name, [])) + added
+            report.imported += len(added)
+    return merged
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+"""
+Minimal Chrome DevTools Protocol client for steering the kiosk browser.
+
+Chromium is started with ``--remote-debugging-port``; the HTTP endpoints
+(/json/version, /json/list) tell us whether it is healthy and which tab
+to drive, and commands go over the tab's WebSocket. Only what the watcher
+needs is implemented: one request/response at a time over a small
+RFC 6455 client, so no extra dependency is required.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import socket
+import struct
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+DEFAULT_CDP_PORT = 9222
+# DevTools calls are local; anything slower than this means the browser is wedged
+CDP_TIMEOUT = 2.0
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_OP_TEXT = 0x1
+_OP_CLOSE = 0x8
+_OP_PING = 0x9
+_OP_PONG = 0xA
+
+
+class CDPError(Exception):
+    pass
+
+
+def _recv_exact(sock: socket.socket, length: int) -> bytes:
+    data = b''
+    while len(data) < length:
+        chunk = sock.recv(length - len(data))
+        if not chunk:
+            raise CDPError("DevTools connection closed")
+        data += chunk
+    return data
+
+
+def ws_send(sock: socket.socket, opcode: int, payload: bytes, mask: bool = True):
+    """Send one unfragmented WebSocket frame (clients must mask)."""
+    header = bytes([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header += bytes([mask_bit | length])
+    elif length < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack('!H', length)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack('!Q', length)
+    if mask:
+        key = os.urandom(4)
+        header += key
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+    sock.sendall(header + payload)
+
+
+def ws_recv(sock: socket.socket):
+    """Receive one WebSocket frame; returns (opcode, payload)."""
+    first, second = _recv_exact(sock, 2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', _recv_exact(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', _recv_exact(sock, 8))[0]
+    key = _recv_exact(sock, 4) if second & 0x80 else None
+    payload = _recv_exact(sock, length)
+    if key is not None:
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+def ws_accept_key(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+
+
+class CDPClient:
+    def __init__(self, port: int = DEFAULT_CDP_PORT, host: str = '127.0.0.1',
+                 timeout: float = CDP_TIMEOUT):
+        self.port = port
+        self.host = host
+        self.timeout = timeout
+        self._next_id = 1
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def _get_json(self, path: str, timeout: Optional[float] = None) -> Any:
+        response = requests.get(self.base_url + path, timeout=timeout or self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def version(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Browser version info, or None if DevTools is not answering."""
+        try:
+            return self._get_json('/json/version', timeout)
+        except (requests.RequestException, ValueError):
+            return None
+
+    def page_targets(self) -> List[Dict[str, Any]]:
+        try:
+            targets = self._get_json('/json/list')
+        except (requests.RequestException, ValueError) as e:
+            raise CDPError(f"Could not list DevTools targets: {e}")
+        return [t for t in targets if t.get('type') == 'page' and t.get('webSocketDebuggerUrl')]
+
+    def _connect(self, ws_url: str) -> socket.socket:
+        parsed = urlparse(ws_url)
+        sock = socket.create_connection((parsed.hostname, parsed.port or 80), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            key = base64.b64encode(os.urandom(16)).decode()
+            sock.sendall((
+                f"GET {parsed.path} HTTP/1.1\r\n"
+                f"Host: {parsed.hostname}:{parsed.port}\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Key: {key}\r\n"
+                "Sec-WebSocket-Version: 13\r\n\r\n"
+            ).encode())
+
+            response = b''
+            while b'\r\n\r\n' not in response:
+                chunk = sock.recv(1024)
+                if not chunk:
+                    raise CDPError("DevTools closed the connection during handshake")
+                response += chunk
+            head = response.split(b'\r\n\r\n', 1)[0].decode('latin-1')
+            if not head.startswith('HTTP/1.1 101') or ws_accept_key(key) not in head:
+                raise CDPError(f"DevTools refused WebSocket upgrade: {head.splitlines()[0]}")
+            return sock
+        except Exception:
+            sock.close()
+            raise
+
+    def call(self, ws_url: str, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Send one command to a target and wait for its result."""
+        message_id = self._next_id
+        self._next_id += 1
+        try:
+            sock = self._connect(ws_url)
+        except OSError as e:
+            raise CDPError(f"Could not connect to DevTools: {e}")
+
+        try:
+            ws_send(sock, _OP_TEXT, json.dumps(
+                {"id": message_id, "method": method, "params": params or {}}).encode())
+            while True:
+                opcode, payload = ws_recv(sock)
+                if opcode == _OP_PING:
+                    ws_send(sock, _OP_PONG, payload)
+                    continue
+                if opcode == _OP_CLOSE:
+                    raise CDPError("DevTools closed the connection")
+                if opcode != _OP_TEXT:
+                    continue
+                message = json.loads(payload)
+                # Skip events; wait for the reply to our command
+                if message.get("id") != message_id:
+                    continue
+                if "error" in message:
+                    raise CDPError(f"{method} failed: {message['error'].get('message')}")
+                return message.get("result", {})
+        except (OSError, ValueError) as e:
+            raise CDPError(f"{method} failed: {e}")
+        finally:
+            try:
+                ws_send(sock, _OP_CLOSE, b'')
+            except OSError:
+                pass
+            sock.close()
+
+    def navigate(self, url: str):
+        """Load url in the browser's first page tab."""
+        targets = self.page_targets()
+        if not targets:
+            raise CDPError("No page target to navigate")
+        result = self.call(targets[0]['webSocketDebuggerUrl'], 'Page.navigate', {"url": url})
+        if result.get('errorText'):
+            raise CDPError(f"Navigation to {url} failed: {result['errorText']}")
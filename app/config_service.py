@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+"""
+Shared, hot-reloading view of policy.json and presets.json.
+
+Both the control server and the watcher read configuration through a
+ConfigService. Each file is parsed once and re-read only when it changes
+on disk (detected with inotify, or a stat() when that is unavailable).
+A version that fails validation is logged and ignored: readers keep the
+last good version, or the built-in defaults if there never was one.
+
+Subscribers are called with the new configuration whenever a different
+valid version is loaded, so long-lived objects such as NetworkMonitor
+can apply edits without a restart.
+"""
+
+import copy
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    # Try relative import first (when run as module)
+    from .state_cache import StateCache
+    from .validators import ConfigValidator
+except ImportError:
+    # Fall back to direct import (when run as script)
+    from state_cache import StateCache
+    from validators import ConfigValidator
+
+logger = logging.getLogger(__name__)
+
+POLICY_FILE = "/opt/fireplace/config/policy.json"
+PRESETS_FILE = "/opt/fireplace/config/presets.json"
+
+POLICY_FILE_DEV = Path(__file__).parent.parent / "config" / "policy.json"
+PRESETS_FILE_DEV = Path(__file__).parent.parent / "config" / "presets.json"
+
+# Used until a valid file has been loaded
+DEFAULT_POLICY = {"network": {"check_interval": 5, "check_timeout": 2, "check_endpoints": ["https://8.8.8.8/"]}}
+DEFAULT_PRESETS = {"presets": []}
+
+
+class ConfigFile:
+    def __init__(self, path, validate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 default: Optional[Dict[str, Any]] = None, use_inotify: bool = True,
+                 normalize: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None):
+        self.path = Path(path)
+        self._validate = validate
+        # Applied once to each valid version loaded; must not modify its argument
+        self._normalize = normalize
+        self._loaded = None
+        self._normalized = None
+        self._default = default or {}
+        self._last_good = None
+        self._notified = None
+        self._notify_lock = threading.Lock()
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._cache = StateCache(self.path, validate=self._check,
+                                 default_factory=self._fallback, use_inotify=use_inotify)
+
+    def _check(self, data: Any) -> bool:
+        valid = isinstance(data, dict) and (self._validate is None or self._validate(data))
+        if not valid:
+            logger.error(f"{self.path.name} is invalid, keeping the last good version")
+        return valid
+
+    def _fallback(self) -> Dict[str, Any]:
+        if self._last_good is not None:
+            return self._last_good
+        return copy.deepcopy(self._default)
+
+    @property
+    def revision(self) -> int:
+        return self._cache.revision
+
+    def fileno(self) -> Optional[int]:
+        return self._cache.fileno()
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        self._subscribers.append(callback)
+
+    def get(self) -> Dict[str, Any]:
+        """Current configuration. Treat it as read-only; it is shared."""
+        config = self._cache.get()
+        if self._normalize is not None:
+            config = self._apply_normalize(config)
+        self._last_good = config
+        if config is not self._notified:
+            self._notify(config)
+        return config
+
+    def _apply_normalize(self, loaded: Dict[str, Any]) -> Dict[str, Any]:
+        with self._notify_lock:
+            if loaded is not self._loaded:
+                # The last good version (already normalized) comes back as the fallback
+                self._normalized = loaded if loaded is self._last_good else self._normalize(loaded)
+                self._loaded = loaded
+            return self._normalized
+
+    def _notify(self, config: Dict[str, Any]):
+        with self._notify_lock:
+            if config is self._notified:
+                return
+            first_load = self._notified is None
+            self._notified = config
+        if first_load:
+            return
+
+        logger.info(f"Reloaded {self.path.name}")
+        for callback in list(self._subscribers):
+            try:
+                callback(config)
+            except Exception as e:
+                logger.error(f"Config subscriber failed for {self.path.name}: {e}")
+
+    def close(self):
+        self._cache.close()
+
+
+class ConfigService:
+    def __init__(self, policy_file=None, presets_file=None,
+                 validator: Optional[ConfigValidator] = None, use_inotify: bool = True):
+        if policy_file is None:
+            policy_file = POLICY_FILE if os.path.exists(POLICY_FILE) else POLICY_FILE_DEV
+        if presets_file is None:
+            presets_file = PRESETS_FILE if os.path.exists(PRESETS_FILE) else PRESETS_FILE_DEV
+        validator = validator or ConfigValidator()
+        self._validator = validator
+
+        self.policy_file = ConfigFile(policy_file, validate=validator.validate_policy,
+                                      default=DEFAULT_POLICY, use_inotify=use_inotify)
+        self.presets_file = ConfigFile(presets_file, validate=validator.validate_presets,
+                                       default=DEFAULT_PRESETS, use_inotify=use_inotify,
+                                       normalize=self._playable_presets)
+
+    def _playable_presets(self, presets_data: Dict[str, Any]) -> Dict[str, Any]:
+        playable, problems = self._validator.playable_presets(presets_data)
+        for problem in problems:
+            logger.warning(f"Skipping preset {problem}")
+        return playable
+
+    def policy(self) -> Dict[str, Any]:
+        return self.policy_file.get()
+
+    def presets(self) -> Dict[str, Any]:
+        return self.presets_file.get()
+
+    @property
+    def revision(self) -> Tuple[int, int]:
+        """Changes whenever either file is reloaded; refresh with policy()/presets() first."""
+        return (self.policy_file.revision, self.presets_file.revision)
+
+    def subscribe_policy(self, callback: Callable[[Dict[str, Any]], None]):
+        self.policy_file.subscribe(callback)
+
+    def subscribe_presets(self, callback: Callable[[Dict[str, Any]], None]):
+        self.presets_file.subscribe(callback)
+
+    def close(self):
+        self.policy_file.close()
+        self.presets_file.close()
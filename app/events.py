@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+"""
+In-process publish/subscribe for state change notifications.
+
+Used by the control server to push Server-Sent Events to connected
+browsers. Each subscriber gets a small bounded queue; a subscriber that
+falls behind is flagged for a full resync instead of blocking publishers.
+"""
+
+import json
+import queue
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+RESYNC = 'resync'
+
+
+class Subscription:
+    def __init__(self, max_queue: int):
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._overflowed = False
+
+    def put(self, event: Tuple[str, Dict[str, Any]]):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._overflowed = True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Next event, (RESYNC, {}) after an overflow, or None on timeout."""
+        if self._overflowed:
+            self._overflowed = False
+            with self._queue.mutex:
+                self._queue.queue.clear()
+            return (RESYNC, {})
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBroker:
+    def __init__(self, max_queue: int = 64, max_subscribers: Optional[int] = None):
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Optional[Subscription]:
+        """New subscription, or None if max_subscribers are already connected."""
+        subscription = Subscription(self.max_queue)
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event_type: str, data: Dict[str, Any]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put((event_type, data))
+
+
+def diff_state(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Top-level fields that changed between two states."""
+    changes = {key: value for key, value in new.items() if key not in old or old[key] != value}
+    removed = [key for key in old if key not in new]
+    result = {"changes": changes}
+    if removed:
+        result["removed"] = removed
+    return result
+
+
+def format_sse(event_type: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+
+"""
+Favorites kept in their own append-only file and indexed in memory.
+
+Favorites used to live in state.json, so every add or remove rewrote and
+re-validated the whole state. The store keeps them in an insertion-ordered
+dict (the list order is the order they were added) with indexes by id,
+by YouTube video id (the URL itself if no id can be extracted) and by
+filename. Add, remove and lookup are O(1), and each change is persisted by
+appending one JSON line:
+
+    {"op": "add", "favorite": {...}}
+    {"op": "remove", "id": "fav_0123abcd"}
+
+Once records that no longer describe a live favorite outnumber the live
+ones, the file is atomically rewritten to just the live favorites, so its
+size stays proportional to the list. A record cut short by power loss is
+ignored on load and dropped before the next append.
+
+Several processes may share the file (gunicorn workers): appends happen
+under flock(), and every read first replays whatever other processes have
+appended, so all of them see the same list.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    # Try relative import first (when run as module)
+    from .state_cache import atomic_file, write_text_atomic
+    from .validators import parse_youtube_url
+except ImportError:
+    # Fall back to direct import (when run as script)
+    from state_cache import atomic_file, write_text_atomic
+    from validators import parse_youtube_url
+
+logger = logging.getLogger(__name__)
+
+FAVORITES_FILENAME = "favorites.ndjson"
+# Dead records tolerated before compaction, however short the list
+COMPACT_MIN_DEAD = 256
+# Read size when an import copies the existing records
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def encode_record(record: Dict[str, Any]) -> str:
+    return json.dumps(record, separators=(',', ':')) + "\n"
+
+
+def video_key(url: str, cache: bool = True) -> str:
+    """Index key for an online favorite: the same video under different URLs matches."""
+    video_id = parse_youtube_url(url, cache).video_id
+    return f"youtube:{video_id}" if video_id else url
+
+
+class FavoritesStore:
+    def __init__(self, path, validate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 fsync: bool = True):
+        self.path = Path(path)
+        self._validate = validate
+        self._fsync = fsync
+        self._lock = threading.RLock()
+        self._revision = 0
+        self._reset()
+        with self._lock:
+            self._refresh()
+
+    def _reset(self):
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_video: Dict[str, str] = {}
+        self._by_filename: Dict[str, str] = {}
+        self._ino = None
+        self._offset = 0
+        self._dead = 0
+        self._list = None
+        self._revision += 1
+
+    @property
+    def revision(self) -> int:
+        """Changes whenever the list changes, in this process or another."""
+        with self._lock:
+            self._refresh()
+            return self._revision
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._by_id)
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Favorites in the order they were added. Treat as read-only; it is shared."""
+        with self._lock:
+            self._refresh()
+            if self._list is None:
+                self._list = list(self._by_id.values())
+            return self._list
+
+    def get(self, favorite_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            return self._by_id.get(favorite_id)
+
+    def find(self, url: Optional[str] = None, filename: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The favorite for this video URL or offline file, if there is one."""
+        with self._lock:
+            self._refresh()
+            favorite_id = None
+            if url:
+                favorite_id = self._by_video.get(video_key(url))
+            elif filename:
+                favorite_id = self._by_filename.get(filename)
+            return self._by_id.get(favorite_id) if favorite_id else None
+
+    def add(self, favorite: Dict[str, Any]) -> bool:
+        """Append favorite; False if it is invalid or already a favorite."""
+        return bool(self._commit([{"op": "add", "favorite": favorite}]))
+
+    def add_many(self, favorites: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Append several favorites with one write and one fsync; returns those added."""
+        added = self._commit([{"op": "add", "favorite": favorite} for favorite in favorites])
+        return [record["favorite"] for record in added]
+
+    def import_favorites(self, favorites: Iterable[Dict[str, Any]], validated: bool = False) -> int:
+        """Add a stream of favorites in one atomic commit; returns how many were new.
+
+        Favorites already in the store (or earlier in the stream) are
+        skipped. The file is rewritten as the live favorites followed by the
+        new ones and swapped in with a single rename, so other processes see
+        all of the import or none of it, and favorites is consumed lazily.
+        ``validated=True`` skips validation the caller has already done, so
+        it is not repeated while the store is locked.
+        """
+        with self._lock, self._locked_file():
+            self._refresh()
+            added = 0
+            try:
+                with atomic_file(self.path, fsync=self._fsync, mode='wb') as f:
+                    if self._dead:
+                        for favorite in self._by_id.values():
+                            f.write(encode_record({"op": "add", "favorite": favorite}).encode())
+                    elif self._offset:
+                        # Already just the live favorites; copy rather than re-encode
+                        with open(self.path, 'rb') as current:
+                            remaining = self._offset
+                            while remaining:
+                                data = current.read(min(remaining, COPY_CHUNK_BYTES))
+                                if not data:
+                                    break
+                                f.write(data)
+                                remaining -= len(data)
+                    for favorite in favorites:
+                        record = {"op": "add", "favorite": favorite}
+                        if self._apply(record, validate=not validated):
+                            f.write(encode_record(record).encode())
+                            added += 1
+            except BaseException:
+                # Memory may be ahead of the file; rebuild from what is on disk
+                self._reset()
+                self._refresh()
+                raise
+            st = os.stat(self.path)
+            self._ino = st.st_ino
+            self._offset = st.st_size
+            self._dead = 0
+            return added
+
+    def remove(self, favorite_id: str) -> Optional[Dict[str, Any]]:
+        """Remove a favorite; returns it, or None if there was no such favorite."""
+        with self._lock:
+            favorite = self.get(favorite_id)
+            if favorite is None or not self._commit([{"op": "remove", "id": favorite_id}]):
+                return None
+            return favorite
+
+    # Index maintenance
+
+    @staticmethod
+    def _key(favorite: Dict[str, Any]):
+        """(index, key) locating favorite by what it plays, or None if malformed."""
+        if favorite.get("source") == "online":
+            url = favorite.get("url")
+            # Loading or importing sees every URL once; keep them out of the request cache
+            return ("video", video_key(url, cache=False)) if isinstance(url, str) else None
+        filename = favorite.get("filename")
+        return ("filename", filename) if isinstance(filename, str) else None
+
+    def _index(self, name: str) -> Dict[str, str]:
+        return self._by_video if name == "video" else self._by_filename
+
+    def _apply(self, record: Any, validate: bool = True) -> bool:
+        """Apply one record to the indexes; False if it changes nothing."""
+        if not isinstance(record, dict):
+            return False
+        if record.get("op") == "add":
+            favorite = record.get("favorite")
+            if not isinstance(favorite, dict) or not isinstance(favorite.get("id"), str):
+                return False
+            key = self._key(favorite)
+            if key is None or favorite["id"] in self._by_id or key[1] in self._index(key[0]):
+                return False
+            if validate and self._validate and not self._validate(favorite):
+                return False
+            self._by_id[favorite["id"]] = favorite
+            self._index(key[0])[key[1]] = favorite["id"]
+        elif record.get("op") == "remove":
+            favorite = self._by_id.pop(record.get("id"), None)
+            if favorite is None:
+                return False
+            index, key = self._key(favorite)
+            self._index(index).pop(key, None)
+            # The remove and the add it cancels
+            self._dead += 2
+        else:
+            return False
+        self._list = None
+        self._revision += 1
+        return True
+
+    # Persistence
+
+    def _refresh(self):
+        """Replay records appended since the last read (by any process)."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            if self._ino is not None:
+                self._reset()
+            return
+        if st.st_ino != self._ino or st.st_size < self._offset:
+            # First load, or the file was compacted or replaced
+            self._reset()
+            self._ino = st.st_ino
+        if st.st_size == self._offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        # Leave a trailing partial line unconsumed: it is still being
+        # written, or it was torn by a crash and _commit() will drop it
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not self._apply(record):
+                self._dead += 1
+        self._offset += end
+
+    @contextmanager
+    def _locked_file(self):
+        """Append descriptor for the current file, held under an exclusive flock()."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    current = os.stat(self.path).st_ino
+                except FileNotFoundError:
+                    current = None
+                if current == os.fstat(fd).st_ino:
+                    break
+            except BaseException:
+                os.close(fd)
+                raise
+            # Compacted by another process while we waited; lock the new file
+            os.close(fd)
+        try:
+            yield fd
+        finally:
+            os.close(fd)
+
+    def _commit(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Apply the records that change something and append them in one write."""
+        with self._lock, self._locked_file() as fd:
+            self._refresh()
+            if os.fstat(fd).st_size > self._offset:
+                logger.warning(f"Dropping a partial record at the end of {self.path.name}")
+                os.ftruncate(fd, self._offset)
+
+            applied = [record for record in records if self._apply(record)]
+            if not applied:
+                return []
+            data = "".join(encode_record(record) for record in applied).encode()
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+                if self._fsync:
+                    os.fsync(fd)
+            except OSError:
+                # Memory is ahead of the file; rebuild from what was written
+                self._reset()
+                self._refresh()
+                raise
+            self._offset += len(data)
+
+            if self._dead > max(COMPACT_MIN_DEAD, len(self._by_id)):
+                self._compact()
+            return applied
+
+    def _compact(self):
+        text = "".join(encode_record({"op": "add", "favorite": favorite})
+                       for favorite in self._by_id.values())
+        write_text_atomic(self.path, text, fsync=self._fsync)
+        logger.info(f"Compacted {self.path.name}: {self._dead} dead records dropped")
+        self._ino = os.stat(self.path).st_ino
+        self._offset = len(text.encode())
+        self._dead = 0
+
+    def compact(self):
+        """Rewrite the file as just the live favorites."""
+        with self._lock, self._locked_file():
+            self._refresh()
+            self._compact()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+"""
+Gunicorn settings for the production control server.
+
+fire-web.service runs ``gunicorn --config app/gunicorn.conf.py``. Workers
+and threads are tunable through the environment:
+
+    FIREPLACE_WEB_BIND       listen address (default 0.0.0.0:8080)
+    FIREPLACE_WEB_WORKERS    worker processes (default 1)
+    FIREPLACE_WEB_SSE_CLIENTS  /api/events streams per worker (default 6)
+    FIREPLACE_WEB_THREADS    threads per worker (default: SSE clients + 4)
+    FIREPLACE_WEB_MEMORY_MB  memory available to the service (default 256,
+                             matching MemoryMax in fire-web.service)
+
+The worker count is clamped so that all workers fit in the memory budget.
+One worker is the recommended setting: state-change events are published
+in-process, so SSE clients connected to another worker only see a change
+on their next heartbeat. Threads are cheap and handle concurrency instead.
+
+Each open /api/events stream holds a thread for as long as the page is
+open, so the thread count is sized from the expected number of SSE clients
+plus REQUEST_THREADS for everything else. server.py refuses streams beyond
+FIREPLACE_WEB_SSE_CLIENTS with a 503 and Retry-After (the page polls
+/api/state meanwhile), so phones left open can never take every thread.
+If FIREPLACE_WEB_THREADS is set too low for the SSE clients, the SSE cap
+is lowered to fit rather than the other way round.
+
+Send SIGHUP (``systemctl reload fire-web``) for a graceful reload: new
+workers are started with fresh code before the old ones are retired.
+"""
+
+import os
+from pathlib import Path
+
+# Resident memory of one worker with the app loaded (about 36 MB measured,
+# rounded up to allow for caches and open streams)
+WORKER_MEMORY_MB = 55
+# Memory held by the gunicorn arbiter process itself
+ARBITER_MEMORY_MB = 25
+# Threads per worker kept free of SSE streams for ordinary requests
+REQUEST_THREADS = 4
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+def max_workers_for(memory_mb: int) -> int:
+    """Largest worker count that fits in memory_mb, leaving half a worker of headroom."""
+    usable = memory_mb - ARBITER_MEMORY_MB - WORKER_MEMORY_MB // 2
+    return max(1, usable // WORKER_MEMORY_MB)
+
+
+memory_budget_mb = _env_int("FIREPLACE_WEB_MEMORY_MB", 256)
+
+bind = os.environ.get("FIREPLACE_WEB_BIND", "0.0.0.0:8080")
+worker_class = "gthread"
+workers = min(_env_int("FIREPLACE_WEB_WORKERS", 1), max_workers_for(memory_budget_mb))
+sse_clients = _env_int("FIREPLACE_WEB_SSE_CLIENTS", 6)
+threads = _env_int("FIREPLACE_WEB_THREADS", sse_clients + REQUEST_THREADS)
+sse_clients = max(0, min(sse_clients, threads - REQUEST_THREADS))
+# Applied to the environment before workers start; server.py reads the cap from it
+raw_env = [f"FIREPLACE_WEB_SSE_CLIENTS={sse_clients}"]
+
+# server.py uses direct imports, so load it from the app directory
+pythonpath = str(Path(__file__).parent)
+wsgi_app = "server:app"
+# Not preloaded, so SIGHUP picks up new code and each worker starts its
+# own background threads (metadata probes, thumbnails) after the fork.
+preload_app = False
+
+# Idle keep-alive connections from phones are closed after this many seconds
+keepalive = 5
+# Seconds a worker may go without a heartbeat before it is restarted
+timeout = 30
+# Seconds in-flight requests (including SSE streams) get on reload/stop
+graceful_timeout = 10
+# Recycle workers periodically to bound slow memory growth, but only when
+# there are several. A recycling worker waits out graceful_timeout for its
+# SSE streams, which never end on their own, and video range requests make
+# recycles frequent. With one worker that would stall the whole server
+# every time, so it runs until reload and MemoryMax in fire-web.service is
+# the backstop (systemd restarts the service if it is exceeded).
+max_requests = 5000 if workers > 1 else 0
+max_requests_jitter = 500 if workers > 1 else 0
+
+accesslog = None
+errorlog = "-"
+loglevel = "info"
+proc_name = "fire-web"
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+"""
+Locating external tools (ffprobe, ffmpeg) and starting them at low priority.
+
+The server runs threaded, and ``preexec_fn`` is not safe once threads are
+running: the child can deadlock between fork() and exec(). So the
+priority is set by exec'ing through nice(1) and taskset(1) instead,
+where they are installed.
+
+Services may run with a PATH that leaves out /usr/bin, so tools are also
+looked for in TOOL_DIRS, and each can be pointed at explicitly with a
+FIREPLACE_<NAME> environment variable (e.g. FIREPLACE_FFMPEG).
+"""
+
+import logging
+import os
+import shutil
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Searched after PATH; where the distribution packages install the tools
+TOOL_DIRS = ("/usr/local/bin", "/usr/bin", "/bin")
+
+
+def find_tool(name: str) -> Optional[str]:
+    """Absolute path of an executable, or None if it cannot be found.
+
+    FIREPLACE_<NAME> wins if set; otherwise PATH, then TOOL_DIRS, are
+    searched. name may also be a path, which is used as is.
+    """
+    if os.sep in name:
+        return shutil.which(name)
+    override = os.environ.get(f"FIREPLACE_{name.upper()}")
+    if override:
+        return shutil.which(override)
+    return shutil.which(name) or shutil.which(name, path=os.pathsep.join(TOOL_DIRS))
+
+
+NICE = find_tool("nice")
+TASKSET = find_tool("taskset")
+if NICE is None:
+    logger.warning("nice not found, ffprobe and ffmpeg will run at normal priority")
+if TASKSET is None:
+    logger.warning("taskset not found, ffmpeg will not be pinned to one core")
+
+
+def low_priority_command(command: List[str], niceness: int, last_cpu_only: bool = False) -> List[str]:
+    """command run at niceness and, with last_cpu_only, pinned to the last allowed core."""
+    prefix = []
+    if NICE:
+        prefix += [NICE, "-n", str(niceness)]
+    cpu = _last_cpu() if last_cpu_only and TASKSET else None
+    if cpu is not None:
+        prefix += [TASKSET, "-c", str(cpu)]
+    return prefix + list(command)
+
+
+def _last_cpu() -> Optional[int]:
+    if not hasattr(os, 'sched_getaffinity'):
+        return None
+    cpus = sorted(os.sched_getaffinity(0))
+    # With one core there is nothing to leave free
+    return cpus[-1] if len(cpus) > 1 else None
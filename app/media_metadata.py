@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+"""
+Background ffprobe metadata (duration, codecs, resolution) for local videos.
+
+Results are cached on disk keyed by (inode, size, mtime), so a file is only
+probed again after it changes. Lookups never block: a file that has not
+been probed yet is reported as "pending" and queued for a worker.
+"""
+
+import json
+import logging
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+try:
+    # Try relative import first (when run as module)
+    from .low_priority import find_tool, low_priority_command
+    from .state_cache import write_json_atomic
+except ImportError:
+    # Fall back to direct import (when run as script)
+    from low_priority import find_tool, low_priority_command
+    from state_cache import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+# Write the cache to disk at least this often while a backlog is being probed
+FLUSH_EVERY = 20
+# ffprobe runs at this niceness so it never competes with playback
+PROBE_NICENESS = 10
+
+
+def cache_key(file_key: Tuple[int, int, int]) -> str:
+    inode, size, mtime_ns = file_key
+    return f"{inode}:{size}:{mtime_ns}"
+
+
+def parse_ffprobe_output(output: str) -> Dict[str, Any]:
+    data = json.loads(output)
+    metadata = {"status": "ready", "duration": None, "video_codec": None,
+                "audio_codec": None, "width": None, "height": None}
+
+    duration = data.get("format", {}).get("duration")
+    if duration is not None:
+        try:
+            metadata["duration"] = round(float(duration), 3)
+        except ValueError:
+            pass
+
+    for stream in data.get("streams", []):
+        codec_type = stream.get("codec_type")
+        if codec_type == "video" and metadata["video_codec"] is None:
+            metadata["video_codec"] = stream.get("codec_name")
+            metadata["width"] = stream.get("width")
+            metadata["height"] = stream.get("height")
+            if metadata["duration"] is None and stream.get("duration"):
+                metadata["duration"] = round(float(stream["duration"]), 3)
+        elif codec_type == "audio" and metadata["audio_codec"] is None:
+            metadata["audio_codec"] = stream.get("codec_name")
+
+    return metadata
+
+
+class MediaMetadataCache:
+    def __init__(self, cache_file, ffprobe: str = "ffprobe", max_workers: int = 1,
+                 probe_timeout: float = 30):
+        self.cache_file = Path(cache_file)
+        self.ffprobe = find_tool(ffprobe)
+        self.probe_timeout = probe_timeout
+        self.max_workers = max_workers
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._executor = None
+        self._unsaved = 0
+        self._pruned_revision = None
+        self.revision = 0
+
+        if self.ffprobe is None:
+            logger.warning(f"{ffprobe} not found (set FIREPLACE_FFPROBE), video metadata will be unavailable")
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self._entries = data.get("entries", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable metadata cache {self.cache_file}: {e}")
+
+    def flush(self):
+        # Serialised so an older snapshot can never overwrite a newer one
+        with self._flush_lock:
+            with self._lock:
+                if not self._unsaved:
+                    return
+                snapshot = {"version": CACHE_VERSION, "entries": dict(self._entries)}
+                self._unsaved = 0
+            try:
+                write_json_atomic(self.cache_file, snapshot, indent=None)
+            except OSError as e:
+                logger.warning(f"Could not write metadata cache {self.cache_file}: {e}")
+
+    def lookup(self, path: str, file_key: Tuple[int, int, int]) -> Dict[str, Any]:
+        """Cached metadata for a file, queueing a probe if there is none yet."""
+        key = cache_key(file_key)
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        if self.ffprobe is None:
+            return {"status": "unavailable"}
+
+        with self._lock:
+            if key not in self._pending:
+                self._pending.add(key)
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='ffprobe')
+                self._executor.submit(self._probe_worker, path, key)
+        return {"status": "pending"}
+
+    def annotate(self, listing) -> List[Dict[str, Any]]:
+        """Copies of the videos in a VideoLibrary listing with a "metadata" entry added to each."""
+        if listing.revision != self._pruned_revision:
+            self._prune({cache_key(file_key) for _, file_key in listing.videos})
+            self._pruned_revision = listing.revision
+
+        return [dict(video, metadata=self.lookup(video["path"], file_key))
+                for video, file_key in listing.videos]
+
+    def _prune(self, live_keys):
+        with self._lock:
+            stale = [key for key in self._entries if key not in live_keys]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self._unsaved += len(stale)
+        if stale:
+            self.flush()
+
+    def probe(self, path: str) -> Dict[str, Any]:
+        """Run ffprobe on one file. Blocking; used by the worker pool."""
+        result = subprocess.run(
+            low_priority_command([self.ffprobe, '-v', 'error', '-print_format', 'json',
+                                  '-show_format', '-show_streams', path], PROBE_NICENESS),
+            capture_output=True,
+            text=True,
+            timeout=self.probe_timeout
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip()[:200] or f"ffprobe exited with {result.returncode}")
+        return parse_ffprobe_output(result.stdout)
+
+    def _probe_worker(self, path: str, key: str):
+        try:
+            metadata = self.probe(path)
+        except Exception as e:
+            logger.warning(f"Could not read metadata for {path}: {e}")
+            metadata = {"status": "error"}
+
+        with self._lock:
+            self._entries[key] = metadata
+            self._pending.discard(key)
+            self._unsaved += 1
+            self.revision += 1
+            should_flush = not self._pending or self._unsaved >= FLUSH_EVERY
+        if should_flush:
+            self.flush()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self.flush()
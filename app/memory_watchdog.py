@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+"""
+Chromium memory watchdog for the kiosk.
+
+Long YouTube sessions make Chromium's memory grow until systemd's
+MemoryMax kills the whole kiosk. The watchdog samples the browser's
+process tree every MEMORY_SAMPLE_SECONDS and asks for a controlled
+restart on the current target before policy's
+``system.max_chromium_memory_mb`` is reached:
+
+- above the soft threshold a restart is *requested*; the watcher carries
+  it out at the next target change (e.g. going offline), where a reload
+  is not noticed;
+- above the hard threshold, or when the trend says the limit will be hit
+  before the next sample, the restart is *due* immediately.
+
+Sampling sums RSS over the tree, which is cheap (/proc/<pid>/statm) but
+counts pages shared between renderers once per process. Only when that
+overestimate crosses the soft threshold is PSS read, which splits shared
+pages fairly, and decisions use PSS.
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+MEMORY_SAMPLE_SECONDS = 30
+# Samples kept for the trend and the exposed history (one hour at 30s)
+MEMORY_HISTORY_SAMPLES = 120
+# Fractions of the limit at which a restart is requested / forced
+SOFT_THRESHOLD = 0.80
+HARD_THRESHOLD = 0.95
+# Restart events kept for diagnostics
+RESTART_HISTORY = 20
+# Samples needed before the trend is trusted
+MIN_TREND_SAMPLES = 4
+
+# Verdicts returned by sample()
+OK = "ok"
+RESTART_REQUESTED = "restart_requested"
+RESTART_DUE = "restart_due"
+
+
+def process_tree(pid: int) -> List[psutil.Process]:
+    try:
+        root = psutil.Process(pid)
+        return [root] + root.children(recursive=True)
+    except psutil.Error:
+        return []
+
+
+def tree_memory_mb(processes: List[psutil.Process], pss: bool = False) -> Optional[float]:
+    """Sum of RSS (or PSS) over processes in MB; None if nothing could be read."""
+    total = 0
+    counted = 0
+    for process in processes:
+        try:
+            if pss:
+                total += process.memory_full_info().pss
+            else:
+                total += process.memory_info().rss
+            counted += 1
+        except (psutil.Error, AttributeError):
+            continue
+    return total / (1024 * 1024) if counted else None
+
+
+class ChromiumMemoryWatchdog:
+    def __init__(self, limit_mb: float, sample_interval: float = MEMORY_SAMPLE_SECONDS):
+        self.limit_mb = limit_mb
+        self.sample_interval = sample_interval
+        self.history = deque(maxlen=MEMORY_HISTORY_SAMPLES)
+        self.restarts = deque(maxlen=RESTART_HISTORY)
+        self.restart_requested = False
+        self._next_sample_at = 0
+        self._pid = None
+
+    def configure(self, limit_mb: float):
+        if limit_mb != self.limit_mb:
+            logger.info(f"Chromium memory limit set to {limit_mb} MB")
+        self.limit_mb = limit_mb
+
+    def seconds_until_sample(self) -> float:
+        return max(0.0, self._next_sample_at - time.time())
+
+    def trend_mb_per_min(self) -> Optional[float]:
+        """Least-squares slope of memory use over the history."""
+        if len(self.history) < MIN_TREND_SAMPLES:
+            return None
+        times = [s["at"] for s in self.history]
+        values = [s["mb"] for s in self.history]
+        mean_t = sum(times) / len(times)
+        mean_v = sum(values) / len(values)
+        variance = sum((t - mean_t) ** 2 for t in times)
+        if variance == 0:
+            return None
+        slope = sum((t - mean_t) * (v - mean_v) for t, v in zip(times, values)) / variance
+        return slope * 60
+
+    def sample(self, pid: Optional[int]) -> Optional[str]:
+        """Sample the tree rooted at pid if a sample is due.
+
+        Returns OK, RESTART_REQUESTED or RESTART_DUE, or None when no
+        sample was taken.
+        """
+        now = time.time()
+        if pid is None or now < self._next_sample_at:
+            return None
+        self._next_sample_at = now + self.sample_interval
+
+        if pid != self._pid:
+            # New browser process: its history says nothing about this one
+            self._pid = pid
+            self.history.clear()
+            self.restart_requested = False
+
+        processes = process_tree(pid)
+        rss_mb = tree_memory_mb(processes)
+        if rss_mb is None:
+            return None
+
+        soft_mb = self.limit_mb * SOFT_THRESHOLD
+        pss_mb = tree_memory_mb(processes, pss=True) if rss_mb >= soft_mb else None
+        usage_mb = pss_mb if pss_mb is not None else rss_mb
+        self.history.append({"at": now, "mb": round(usage_mb, 1), "rss_mb": round(rss_mb, 1),
+                             "pss_mb": round(pss_mb, 1) if pss_mb is not None else None,
+                             "processes": len(processes)})
+
+        trend = self.trend_mb_per_min()
+        projected_mb = usage_mb + (trend or 0) * self.sample_interval / 60
+        if usage_mb >= self.limit_mb * HARD_THRESHOLD or projected_mb >= self.limit_mb:
+            logger.warning(f"Chromium using {usage_mb:.0f} MB of {self.limit_mb} MB, restarting now")
+            return RESTART_DUE
+        if usage_mb >= soft_mb:
+            if not self.restart_requested:
+                logger.info(f"Chromium using {usage_mb:.0f} MB of {self.limit_mb} MB, "
+                            f"restarting at the next target change")
+            self.restart_requested = True
+            return RESTART_REQUESTED
+        return OK
+
+    def record_restart(self, reason: str, target: Optional[str]):
+        usage_mb = self.history[-1]["mb"] if self.history else None
+        self.restarts.append({"at": time.time(), "reason": reason, "mb": usage_mb, "target": target})
+        self.restart_requested = False
+        self.history.clear()
+        self._pid = None
+
+    def status(self) -> Dict[str, Any]:
+        latest = self.history[-1] if self.history else None
+        trend = self.trend_mb_per_min()
+        return {
+            "limit_mb": self.limit_mb,
+            "usage_mb": latest["mb"] if latest else None,
+            "trend_mb_per_min": round(trend, 2) if trend is not None else None,
+            "restart_requested": self.restart_requested,
+            "history": list(self.history),
+            "restarts": list(self.restarts),
+        }
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+
+"""
+Counters, gauges and histograms exported in the Prometheus text format.
+
+Every series owns fixed, preallocated storage: a float for counters and
+gauges, and one bucket array per histogram series, sized when the series
+is first used. Recording an observation is a bisect plus an increment
+under a lock, with no allocation, so it is cheap enough for every request
+and every probe.
+
+Each process has its own REGISTRY. The watcher publishes a snapshot of
+its registry through runtime_status; the server renders that snapshot
+next to its own metrics at /metrics.
+"""
+
+import bisect
+import threading
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+# Seconds; spans a fast API call up to a slow Chromium relaunch
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        if not self.labelnames:
+            self._series[()] = self._new_series()
+
+    def _new_series(self) -> List:
+        return [0.0]
+
+    def labels(self, *labelvalues: str):
+        """The series for labelvalues; callers on hot paths may keep it."""
+        labelvalues = tuple(str(v) for v in labelvalues)
+        child = self._children.get(labelvalues)
+        if child is None:
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                series = self._series.setdefault(labelvalues, self._new_series())
+                child = self._children.setdefault(labelvalues, self._Child(self._lock, series))
+        return child
+
+    def _unlabelled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return self.labels()
+
+    def _snapshot_series(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"labels": list(labels), "value": series[0]} for labels, series in self._series.items()]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"name": self.name, "help": self.help, "type": self.kind,
+                "labelnames": list(self.labelnames), "series": self._snapshot_series()}
+
+
+class _ValueChild:
+    __slots__ = ('_lock', '_series')
+
+    def __init__(self, lock: threading.Lock, series: List):
+        self._lock = lock
+        self._series = series
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._series[0] += amount
+
+    def set(self, value: float):
+        with self._lock:
+            self._series[0] = value
+
+    @property
+    def value(self) -> float:
+        return self._series[0]
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _Child = _ValueChild
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    _Child = _ValueChild
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+
+class _HistogramChild:
+    __slots__ = ('_lock', '_series', '_buckets')
+
+    def __init__(self, lock: threading.Lock, series: List, buckets: Tuple[float, ...]):
+        self._lock = lock
+        self._series = series
+        self._buckets = buckets
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._buckets, value)
+        series = self._series
+        with self._lock:
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @property
+    def count(self) -> int:
+        return self._series[-1]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _Child(self, lock: threading.Lock, series: List) -> _HistogramChild:
+        return _HistogramChild(lock, series, self.buckets)
+
+    def _new_series(self) -> List:
+        # Per-bucket counts (the last one is +Inf), then sum and count
+        return [0] * (len(self.buckets) + 1) + [0.0, 0]
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def _snapshot_series(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"labels": list(labels), "counts": series[:-2], "sum": series[-2], "count": series[-1]}
+                    for labels, series in self._series.items()]
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = super().snapshot()
+        snapshot["buckets"] = list(self.buckets)
+        return snapshot
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Modules may be imported twice (package and script style)
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return [metric.snapshot() for metric in metrics]
+
+    def render(self) -> str:
+        return render_text(self.snapshot())
+
+
+def render_text(snapshot: Iterable[Dict[str, Any]]) -> str:
+    """Prometheus text exposition (version 0.0.4) of a registry snapshot."""
+    lines = []
+    for metric in snapshot:
+        name = metric["name"]
+        labelnames = metric["labelnames"]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for series in metric["series"]:
+            labels = series["labels"]
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(series['value'])}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric["buckets"]) + [float('inf')], series["counts"]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(series['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labelnames, labels)} {series['count']}")
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
@@ -7,7 +7,9 @@ class OfflinePlayer {
         this.videos = [];
         this.currentIndex = 0;
         this.isTransitioning = false;
-        this.pollInterval = 5000; // 5 seconds
+        this.pollInterval = 5000; // 5 seconds, only used when SSE is unavailable
+        this.pollTimer = null;
+        this.eventSource = null;
         
         this.init();
     }
@@ -17,7 +19,7 @@ class OfflinePlayer {
         await this.loadState();
         await this.loadVideos();
         this.setupEventListeners();
-        this.startStatePolling();
+        this.startStateEvents();
         this.hideStatus();
     }
     
@@ -233,11 +235,12 @@ class OfflinePlayer {
         }, 1000);
     }
     
-    async updateFromState(newState) {
+    async updateFromState(newState, changedFields = null) {
         let needsRestart = false;
+        const changed = (field) => changedFields === null || changedFields.includes(field);
         
         // Check volume changes
-        if (newState.volume !== this.volume) {
+        if (changed('volume') && newState.volume !== this.volume) {
             this.volume = newState.volume;
             this.currentVideo.volume = this.muted ? 0 : this.volume / 100;
             this.nextVideo.volume = this.muted ? 0 : this.volume / 100;
@@ -245,7 +248,7 @@ class OfflinePlayer {
         }
         
         // Check mute changes
-        if (newState.muted !== this.muted) {
+        if (changed('muted') && newState.muted !== this.muted) {
             this.muted = newState.muted;
             this.currentVideo.muted = this.muted;
             this.nextVideo.muted = this.muted;
@@ -255,7 +258,7 @@ class OfflinePlayer {
         }
         
         // Check video selection changes
-        if (newState.selected_offline !== this.selectedVideo) {
+        if (changed('selected_offline') && newState.selected_offline !== this.selectedVideo) {
             this.selectedVideo = newState.selected_offline;
             const newIndex = this.videos.findIndex(v => v.filename === this.selectedVideo);
             if (newIndex !== -1 && newIndex !== this.currentIndex) {
@@ -265,8 +268,13 @@ class OfflinePlayer {
             }
         }
         
-        // Check playlist changes
-        if (JSON.stringify(newState.playlists) !== JSON.stringify(this.playlists)) {
+        // Check playlist changes (events only carry playlists when they changed,
+        // so the deep comparison is only needed for snapshots and polling)
+        const playlistsChanged = changedFields !== null
+            ? changedFields.includes('playlists') || changedFields.includes('active_playlist')
+            : JSON.stringify(newState.playlists) !== JSON.stringify(this.playlists) ||
+              (newState.active_playlist || 'default') !== this.activePlaylist;
+        if (playlistsChanged) {
             this.playlists = newState.playlists || { default: [] };
             this.activePlaylist = newState.active_playlist || 'default';
             this.preloadNextVideo(); // Update next video based on new playlist
@@ -292,8 +300,51 @@ class OfflinePlayer {
         this.showStatus(`Switched to: ${this.videos[this.currentIndex].filename}`, 3000);
     }
     
+    startStateEvents() {
+        if (!window.EventSource) {
+            this.startStatePolling();
+            return;
+        }
+        
+        this.state = {};
+        this.eventSource = new EventSource('/api/events');
+        
+        this.eventSource.addEventListener('snapshot', (e) => {
+            const data = JSON.parse(e.data);
+            this.state = data.state;
+            this.stopStatePolling();
+            this.updateFromState(this.state);
+        });
+        
+        this.eventSource.addEventListener('state', (e) => {
+            const data = JSON.parse(e.data);
+            Object.assign(this.state, data.changes);
+            (data.removed || []).forEach(field => delete this.state[field]);
+            this.updateFromState(this.state, Object.keys(data.changes).concat(data.removed || []));
+        });
+        
+        this.eventSource.onerror = () => {
+            // EventSource reconnects on its own; poll until it does so
+            // changes still arrive while the stream is down.
+            console.warn('State event stream interrupted, polling until it reconnects');
+            if (this.eventSource.readyState === EventSource.CLOSED) {
+                this.eventSource = null;
+            }
+            this.startStatePolling();
+        };
+    }
+    
+    stopStatePolling() {
+        if (this.pollTimer !== null) {
+            clearInterval(this.pollTimer);
+            this.pollTimer = null;
+        }
+    }
+    
     startStatePolling() {
-        setInterval(async () => {
+        if (this.pollTimer !== null) return;
+        
+        this.pollTimer = setInterval(async () => {
             try {
                 const response = await fetch('/api/state');
                 const newState = await response.json();
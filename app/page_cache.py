@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+"""
+Cache of rendered pages for conditional GETs.
+
+A page is stored with the key it was rendered for, a tuple of the
+revisions of everything the template reads. While the key is unchanged
+the stored body is served as-is. The ETag is a hash of the body, so it
+stays valid across restarts and when a re-render produces the same HTML.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, Hashable, NamedTuple
+
+
+class CachedPage(NamedTuple):
+    key: Hashable
+    body: bytes
+    etag: str
+    last_modified: float
+
+
+class PageCache:
+    def __init__(self):
+        self._pages: Dict[str, CachedPage] = {}
+        self._lock = threading.Lock()
+        self.render_count = 0
+
+    def get(self, name: str, key: Hashable, render: Callable[[], str]) -> CachedPage:
+        """The page for key, calling render() only if the cached one is out of date."""
+        page = self._pages.get(name)
+        if page is not None and page.key == key:
+            return page
+
+        # One render at a time; concurrent requests for the same key wait for it
+        with self._lock:
+            page = self._pages.get(name)
+            if page is not None and page.key == key:
+                return page
+
+            body = render().encode('utf-8')
+            etag = hashlib.sha1(body).hexdigest()
+            if page is not None and page.etag == etag:
+                last_modified = page.last_modified
+            else:
+                last_modified = time.time()
+            page = CachedPage(key, body, etag, last_modified)
+            self._pages[name] = page
+            self.render_count += 1
+            return page
+
+    def invalidate(self):
+        with self._lock:
+            self._pages.clear()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+"""
+Per-client token-bucket rate limiting for the control API.
+
+Each (client address, route class) pair gets a bucket that refills at the
+policy's ``security.rate_limit_per_minute``. Buckets are kept in an LRU
+map with a fixed capacity, so a flood of distinct clients cannot grow
+memory; the least recently seen client is simply forgotten (which only
+ever makes the limiter more lenient to it).
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+# Route classes, each with its own bucket per client
+READ = "read"
+WRITE = "write"
+
+# Seconds of traffic a full bucket absorbs before limiting starts
+BURST_SECONDS = 15
+# Reads (page loads, polling) are allowed this many times the write rate
+READ_RATE_MULTIPLIER = 10
+# Buckets tracked before the least recently used client is evicted
+MAX_TRACKED_BUCKETS = 1024
+
+# Served as bulk media or long-lived streams rather than API calls
+EXEMPT_PREFIXES = ('/videos/', '/thumbnails/', '/static/', '/api/events')
+# The kiosk's own pages and players must never be locked out
+EXEMPT_CLIENTS = frozenset({'127.0.0.1', '::1'})
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Bucket class for a request, or None if it is not rate limited."""
+    if path.startswith(EXEMPT_PREFIXES):
+        return None
+    if method in ('GET', 'HEAD', 'OPTIONS'):
+        return READ
+    return WRITE
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate_per_minute: float, burst: Optional[float] = None,
+                 max_buckets: int = MAX_TRACKED_BUCKETS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_buckets = max_buckets
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> [tokens, last refill time]
+        self._buckets = OrderedDict()
+        # Refused acquire() calls, counted under _lock
+        self.rejected = 0
+        self.configure(rate_per_minute, burst)
+
+    def configure(self, rate_per_minute: float, burst: Optional[float] = None):
+        """Change the rate; existing buckets keep their tokens (capped to the new burst)."""
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst if burst is not None else max(1.0, self.rate * BURST_SECONDS)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: Hashable) -> float:
+        """Take one token for key. Returns 0 if allowed, else seconds until one is available."""
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [self.burst, now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+                return 0.0
+            self.rejected += 1
+            return (1.0 - bucket[0]) / self.rate
+
+
+class RateLimiter:
+    """Read and write limiters for the Flask app, installed as a before_request hook."""
+
+    def __init__(self, rate_per_minute: float, max_buckets: int = MAX_TRACKED_BUCKETS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.limiters = {
+            READ: TokenBucketLimiter(rate_per_minute * READ_RATE_MULTIPLIER,
+                                     max_buckets=max_buckets, clock=clock),
+            WRITE: TokenBucketLimiter(rate_per_minute, max_buckets=max_buckets, clock=clock),
+        }
+
+    @property
+    def rejected(self) -> int:
+        """Requests refused so far, across both classes."""
+        return sum(limiter.rejected for limiter in self.limiters.values())
+
+    def configure(self, rate_per_minute: float):
+        self.limiters[READ].configure(rate_per_minute * READ_RATE_MULTIPLIER)
+        self.limiters[WRITE].configure(rate_per_minute)
+
+    def check(self, client: Optional[str], method: str, path: str) -> Optional[int]:
+        """None if the request may proceed, else the Retry-After value in seconds."""
+        if client in EXEMPT_CLIENTS:
+            return None
+        klass = route_class(method, path)
+        if klass is None:
+            return None
+        wait = self.limiters[klass].acquire(client)
+        if wait <= 0:
+            return None
+        return max(1, math.ceil(wait))
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+"""
+Per-request component timing and an opt-in sampling profiler.
+
+Components: code wrapped in ``timed('state')`` (or decorated with
+``timed_call``) adds its wall time to the current request's totals.
+Nested or re-entrant sections of the same component count once, so
+StateManager.update_fields() calling load_state() is not double counted.
+Outside a request nothing is recorded.
+
+Profiling: with ``system.profile_sample_every`` set to N, one request in
+N runs under cProfile. Each sample keeps the request's hottest call path
+and its most expensive functions in a bounded ring buffer, which the
+server offers for download, so hot paths can be found on the Pi itself.
+Only one request is profiled at a time; cProfile hooks the thread it is
+enabled on and Python 3.12+ allows a single active profiler.
+"""
+
+import contextvars
+import cProfile
+import itertools
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+# Profiled requests kept for download
+PROFILE_RING_SIZE = 32
+# Functions listed per profiled request
+PROFILE_TOP_FUNCTIONS = 15
+# Longest call path recorded per profiled request
+PROFILE_MAX_DEPTH = 30
+
+# component -> [seconds, nesting depth, started]
+_timings: contextvars.ContextVar = contextvars.ContextVar('request_timings', default=None)
+
+
+def begin_request():
+    _timings.set({})
+
+
+def end_request() -> Dict[str, float]:
+    """Seconds spent per component in the request that is ending."""
+    timings = _timings.get()
+    _timings.set(None)
+    if not timings:
+        return {}
+    return {component: entry[0] for component, entry in timings.items()}
+
+
+def begin(component: str):
+    timings = _timings.get()
+    if timings is None:
+        return
+    entry = timings.get(component)
+    if entry is None:
+        entry = timings[component] = [0.0, 0, 0.0]
+    if entry[1] == 0:
+        entry[2] = time.perf_counter()
+    entry[1] += 1
+
+
+def end(component: str):
+    timings = _timings.get()
+    if timings is None:
+        return
+    entry = timings.get(component)
+    if entry is None or entry[1] == 0:
+        return
+    entry[1] -= 1
+    if entry[1] == 0:
+        entry[0] += time.perf_counter() - entry[2]
+
+
+@contextmanager
+def timed(component: str):
+    begin(component)
+    try:
+        yield
+    finally:
+        end(component)
+
+
+def timed_call(component: str):
+    """Decorator form of timed()."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            begin(component)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                end(component)
+        return wrapper
+    return decorator
+
+
+def _label(func) -> str:
+    filename, line, name = func
+    if filename == '~':
+        return name
+    return f"{filename}:{line}({name})"
+
+
+def hot_path(stats: Dict) -> List[Dict[str, Any]]:
+    """Follow the most expensive callee from the most expensive root down."""
+    callees: Dict[Any, Dict[Any, float]] = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]
+
+    roots = [func for func, entry in stats.items() if not entry[4]]
+    if not roots:
+        return []
+    func = max(roots, key=lambda f: stats[f][3])
+    path = []
+    seen = set()
+    while func is not None and func not in seen and len(path) < PROFILE_MAX_DEPTH:
+        seen.add(func)
+        path.append({"function": _label(func), "cumulative_ms": round(stats[func][3] * 1000, 3)})
+        children = callees.get(func)
+        func = max(children, key=children.get) if children else None
+    return path
+
+
+def top_functions(stats: Dict, limit: int = PROFILE_TOP_FUNCTIONS) -> List[Dict[str, Any]]:
+    ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [{
+        "function": _label(func),
+        "calls": nc,
+        "total_ms": round(tt * 1000, 3),
+        "cumulative_ms": round(ct * 1000, 3)
+    } for func, (_, nc, tt, ct, _) in ranked]
+
+
+class RequestProfiler:
+    def __init__(self, sample_every: int = 0, capacity: int = PROFILE_RING_SIZE):
+        self.sample_every = sample_every
+        self.samples = deque(maxlen=capacity)
+        self._counter = itertools.count(1)
+        self._busy = threading.Lock()
+
+    def configure(self, sample_every: int):
+        self.sample_every = max(0, int(sample_every or 0))
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """A running profiler if this request is sampled, else None."""
+        if not self.sample_every or next(self._counter) % self.sample_every:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (a debugger, coverage) owns the hook
+            self._busy.release()
+            return None
+        return profile
+
+    def finish(self, profile: cProfile.Profile, method: str, route: str, duration: float):
+        try:
+            profile.disable()
+        finally:
+            self._busy.release()
+        stats = pstats.Stats(profile).stats
+        self.samples.append({
+            "at": time.time(),
+            "method": method,
+            "route": route,
+            "duration_ms": round(duration * 1000, 3),
+            "hot_path": hot_path(stats),
+            "top_functions": top_functions(stats)
+        })
+
+    def report(self) -> Dict[str, Any]:
+        return {"sample_every": self.sample_every, "samples": list(self.samples)}
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+"""
+Small status snapshots shared between the watcher and the control server.
+
+The watcher publishes JSON documents (memory history, metrics) into a
+directory on tmpfs; the server reads them on demand. Writes are atomic
+renames, so readers never see a partial document, and nothing touches
+the SD card. /dev/shm is used because fire-web.service runs with
+PrivateTmp, so the two processes do not share /tmp.
+"""
+
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+try:
+    # Try relative import first (when run as module)
+    from .state_cache import write_json_atomic
+except ImportError:
+    # Fall back to direct import (when run as script)
+    from state_cache import write_json_atomic
+
+RUNTIME_DIR = "/dev/shm/fireplace"
+RUNTIME_DIR_DEV = Path(tempfile.gettempdir()) / "fireplace-runtime"
+
+
+def runtime_dir() -> Path:
+    return Path(RUNTIME_DIR if os.path.isdir(os.path.dirname(RUNTIME_DIR)) else RUNTIME_DIR_DEV)
+
+
+def publish(name: str, data: Dict[str, Any], directory=None) -> bool:
+    """Atomically replace the snapshot called name."""
+    path = Path(directory or runtime_dir()) / f"{name}.json"
+    try:
+        write_json_atomic(path, dict(data, published_at=time.time()), indent=None, fsync=False)
+        return True
+    except OSError:
+        return False
+
+
+def read(name: str, directory=None) -> Optional[Dict[str, Any]]:
+    """The latest snapshot called name, or None if none has been published."""
+    path = Path(directory or runtime_dir()) / f"{name}.json"
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -3,17 +3,54 @@
 import json
 import os
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, Response, g, render_template, request, jsonify, send_from_directory, stream_with_context
 import logging
+import tempfile
+import threading
+import time
 from typing import Dict, Any, Optional
 import shutil
 
 try:
     # Try relative import first (when run as module)
-    from .validators import ConfigValidator, URLValidator, FileValidator, validate_volume, validate_mode, FavoritesValidator
+    from .validators import ConfigValidator, FileValidator, parse_youtube_url, validate_volume, validate_mode, FavoritesValidator
+    from .state_cache import write_json_atomic
+    from .state_journal import JournaledStateCache
+    from .events import EventBroker, RESYNC, diff_state, format_sse
+    from .video_library import VideoLibrary
+    from .media_metadata import MediaMetadataCache
+    from .thumbnails import ThumbnailStore
+    from .video_streaming import VideoStreamer
+    from .rate_limit import RateLimiter
+    from .page_cache import PageCache
+    from .config_service import ConfigService
+    from .favorites_store import FavoritesStore, FAVORITES_FILENAME
+    from .bulk_transfer import (ImportReport, NDJSON_MIMETYPE, encode_ndjson, merge_playlists,
+                                read_playlists, read_spool, spool_favorites)
+    from .metrics import REGISTRY, render_text
+    from .request_profiler import RequestProfiler
+    from . import request_profiler
+    from . import runtime_status
 except ImportError:
     # Fall back to direct import (when run as script)
-    from validators import ConfigValidator, URLValidator, FileValidator, validate_volume, validate_mode, FavoritesValidator
+    from validators import ConfigValidator, FileValidator, parse_youtube_url, validate_volume, validate_mode, FavoritesValidator
+    from state_cache import write_json_atomic
+    from state_journal import JournaledStateCache
+    from events import EventBroker, RESYNC, diff_state, format_sse
+    from video_library import VideoLibrary
+    from media_metadata import MediaMetadataCache
+    from thumbnails import ThumbnailStore
+    from video_streaming import VideoStreamer
+    from rate_limit import RateLimiter
+    from page_cache import PageCache
+    from config_service import ConfigService
+    from favorites_store import FavoritesStore, FAVORITES_FILENAME
+    from bulk_transfer import (ImportReport, NDJSON_MIMETYPE, encode_ndjson, merge_playlists,
+                               read_playlists, read_spool, spool_favorites)
+    from metrics import REGISTRY, render_text
+    from request_profiler import RequestProfiler
+    import request_profiler
+    import runtime_status
 
 from urllib.parse import quote
 
@@ -24,50 +61,106 @@ app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'dev-key-change-in-production')
 
 STATE_FILE = "/opt/fireplace/state.json"
-POLICY_FILE = "/opt/fireplace/config/policy.json"
-PRESETS_FILE = "/opt/fireplace/config/presets.json"
 VIDEOS_DIR = "/opt/fireplace/videos"
+CACHE_DIR = "/opt/fireplace/cache"
+
+# Idle SSE connections get a keepalive (and an external-edit check) this often
+SSE_HEARTBEAT_SECONDS = 15
+# Open /api/events streams per process. Each pins a gunicorn thread, so
+# gunicorn.conf.py sizes the threads from this and passes it in.
+SSE_MAX_CLIENTS = int(os.environ.get('FIREPLACE_WEB_SSE_CLIENTS', 6))
+# Seconds a client refused a stream should wait before trying again
+SSE_RETRY_SECONDS = 30
 
 STATE_FILE_DEV = Path(__file__).parent.parent / "config" / "state_default.json"
-POLICY_FILE_DEV = Path(__file__).parent.parent / "config" / "policy.json"
-PRESETS_FILE_DEV = Path(__file__).parent.parent / "config" / "presets.json"
+CACHE_DIR_DEV = Path(tempfile.gettempdir()) / "fireplace-cache"
 
 validator = ConfigValidator()
 
+# Per process: under several gunicorn workers each scrape sees one worker's counts.
+# Routes are labelled by their rule, not the raw path, and methods outside
+# METRIC_METHODS as "other", so clients cannot add series.
+METRIC_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'DELETE', 'OPTIONS', 'PATCH'))
+http_requests = REGISTRY.counter('fireplace_http_requests_total', 'HTTP requests handled',
+                                 ['method', 'route', 'status'])
+http_request_seconds = REGISTRY.histogram('fireplace_http_request_duration_seconds',
+                                          'Time to produce a response (SSE: until streaming starts)',
+                                          ['method', 'route'])
+request_component_seconds = REGISTRY.histogram('fireplace_http_request_component_seconds',
+                                               'Time a request spent in StateManager or template rendering',
+                                               ['method', 'route', 'component'])
+state_write_seconds = REGISTRY.histogram('fireplace_state_write_duration_seconds',
+                                         'Time to write, cache and publish state.json')
+state_write_failures = REGISTRY.counter('fireplace_state_write_failures_total', 'Failed state.json writes')
+sse_clients = REGISTRY.gauge('fireplace_sse_clients', 'Connected /api/events clients')
+page_renders = REGISTRY.counter('fireplace_page_renders_total', 'Control page renders (cache misses)')
+rate_limited = REGISTRY.counter('fireplace_rate_limited_requests_total', 'Requests rejected by the rate limiter')
+watcher_metrics_age = REGISTRY.gauge('fireplace_watcher_metrics_age_seconds',
+                                     'Age of the watcher metrics included in this scrape')
+
 class StateManager:
-    def __init__(self):
+    def __init__(self, journal: bool = False):
         self.state_file = STATE_FILE if os.path.exists(STATE_FILE) else STATE_FILE_DEV
-        self._current_state = None
-    
+        self.events = EventBroker(max_subscribers=SSE_MAX_CLIENTS)
+        # Reads through the journal whether or not this process writes to it
+        self._cache = JournaledStateCache(self.state_file,
+                                          validate=validator.validate_state,
+                                          default_factory=self._load_default_state)
+        # Held across read-modify-write sequences so concurrent requests
+        # cannot interleave; re-entrant so update_fields() can run inside it.
+        self.lock = threading.RLock()
+        self.journal = journal
+    
+    def set_journal(self, enabled: bool):
+        """Journal each commit (system.state_journal) instead of rewriting state.json."""
+        with self.lock:
+            if enabled == self.journal:
+                return
+            self.journal = enabled
+            logger.info(f"State journal {'enabled' if enabled else 'disabled'}")
+    
+    @property
+    def revision(self) -> int:
+        return self._cache.revision
+    
+    @request_profiler.timed_call('state')
     def load_state(self) -> Dict[str, Any]:
-        if self._current_state is None:
-            try:
-                with open(self.state_file, 'r') as f:
-                    self._current_state = json.load(f)
-                    
-                if not validator.validate_state(self._current_state):
-                    logger.warning("State validation failed, using defaults")
-                    self._current_state = self._load_default_state()
-                    
-            except (FileNotFoundError, json.JSONDecodeError) as e:
-                logger.warning(f"Could not load state: {e}, using defaults")
-                self._current_state = self._load_default_state()
-        
-        return self._current_state
+        return self._cache.get()
+    
+    @request_profiler.timed_call('state')
+    def snapshot(self):
+        """(revision, state) pair for callers that cache on the revision."""
+        return self._cache.snapshot()
     
+    @request_profiler.timed_call('state')
     def save_state(self, state: Dict[str, Any]) -> bool:
         if not validator.validate_state(state):
             logger.error("State validation failed, not saving")
             return False
         
+        return self._write_state(state)
+    
+    def _write_state(self, state: Dict[str, Any]) -> bool:
         try:
-            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
-            with open(self.state_file, 'w') as f:
-                json.dump(state, f, indent=2)
-            self._current_state = state.copy()
+            with self.lock:
+                started = time.perf_counter()
+                previous = self.load_state()
+                if self.journal:
+                    self._cache.append(state)
+                else:
+                    if self._cache.has_journal():
+                        # Left by journaled commits; fold it in so it is not replayed over this write
+                        self._cache.compact()
+                    signature = write_json_atomic(self.state_file, state)
+                    self._cache.prime(state.copy(), signature)
+                change = diff_state(previous, state)
+                change["revision"] = self.revision
+                self.events.publish("state", change)
+                state_write_seconds.observe(time.perf_counter() - started)
             logger.info("State saved successfully")
             return True
         except Exception as e:
+            state_write_failures.inc()
             logger.error(f"Failed to save state: {e}")
             return False
     
@@ -85,65 +178,248 @@ class StateManager:
             }
     
     def update_field(self, field: str, value: Any) -> bool:
-        state = self.load_state()
-        state[field] = value
-        return self.save_state(state)
+        return self.update_fields({field: value})
+    
+    @request_profiler.timed_call('state')
+    def update_fields(self, updates: Dict[str, Any]) -> bool:
+        """Apply several field changes as one validated, atomic write."""
+        with self.lock:
+            current = self.load_state()
+            if all(field in current and current[field] == value for field, value in updates.items()):
+                return True
+            
+            # The cached state was validated when it was loaded, so only
+            # the changed fields need checking.
+            if not validator.validate_state_fields(updates):
+                logger.error("State validation failed, not saving")
+                return False
+            
+            state = dict(current)
+            state.update(updates)
+            return self._write_state(state)
 
 state_manager = StateManager()
 
+# Favorites live next to state.json in their own append-only file
+favorites = FavoritesStore(Path(state_manager.state_file).with_name(FAVORITES_FILENAME),
+                           validate=validator.validate_favorite)
+
+def migrate_favorites():
+    """Move favorites still kept in state.json into the favorites store."""
+    legacy = state_manager.load_state().get('user_favorites')
+    if not legacy:
+        return
+    added = favorites.add_many(legacy)
+    # Only cleared once the store has them on disk
+    state_manager.update_fields({'user_favorites': []})
+    logger.info(f"Moved {len(added)} favorites from state.json to {favorites.path.name}")
+    if len(added) < len(legacy):
+        logger.warning(f"Dropped {len(legacy) - len(added)} favorites from state.json that "
+                       f"duplicate another favorite or are invalid")
+
+migrate_favorites()
+
+# policy.json and presets.json, parsed once and reloaded when edited
+config = ConfigService(validator=validator)
+
 def load_policy() -> Dict[str, Any]:
-    policy_file = POLICY_FILE if os.path.exists(POLICY_FILE) else POLICY_FILE_DEV
-    try:
-        with open(policy_file, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Could not load policy: {e}")
-        return {"network": {"check_interval": 5, "check_timeout": 2, "check_endpoints": ["https://8.8.8.8/"]}}
+    return config.policy()
 
 def load_presets() -> Dict[str, Any]:
-    presets_file = PRESETS_FILE if os.path.exists(PRESETS_FILE) else PRESETS_FILE_DEV
-    try:
-        with open(presets_file, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Could not load presets: {e}")
-        return {"presets": []}
+    return config.presets()
+
+video_library = VideoLibrary(VIDEOS_DIR)
+video_streamer = VideoStreamer(video_library)
+
+cache_dir = Path(CACHE_DIR if os.path.isdir(os.path.dirname(CACHE_DIR)) else CACHE_DIR_DEV)
+media_metadata = MediaMetadataCache(cache_dir / "media_metadata.json")
+thumbnails = ThumbnailStore(cache_dir / "thumbnails",
+                            enabled=load_policy().get('system', {}).get('thumbnail_generation', False))
+
+page_cache = PageCache()
+
+rate_limiter = RateLimiter(load_policy().get('security', {}).get('rate_limit_per_minute', 60))
+
+# Off unless policy sets system.profile_sample_every
+profiler = RequestProfiler(load_policy().get('system', {}).get('profile_sample_every', 0))
+
+# Off unless policy sets system.state_journal
+state_manager.set_journal(load_policy().get('system', {}).get('state_journal', False))
+
+def apply_policy(policy: Dict[str, Any]):
+    """Apply an edited policy.json to the running server."""
+    rate_limiter.configure(policy.get('security', {}).get('rate_limit_per_minute', 60))
+    thumbnails.set_enabled(policy.get('system', {}).get('thumbnail_generation', False))
+    profiler.configure(policy.get('system', {}).get('profile_sample_every', 0))
+    state_manager.set_journal(policy.get('system', {}).get('state_journal', False))
+
+config.subscribe_policy(apply_policy)
+
+def request_route() -> str:
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+def request_method() -> str:
+    """request.method, or "other" for methods outside METRIC_METHODS"""
+    return request.method if request.method in METRIC_METHODS else 'other'
+
+@app.before_request
+def start_request_timer():
+    # Registered first so rate-limited requests are timed and counted too
+    g.request_started = time.perf_counter()
+    request_profiler.begin_request()
+    g.profile = profiler.start()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        method = request_method()
+        route = request_route()
+        http_request_seconds.labels(method, route).observe(elapsed)
+        http_requests.labels(method, route, response.status_code).inc()
+        
+        timings = request_profiler.end_request()
+        for component, seconds in timings.items():
+            request_component_seconds.labels(method, route, component).observe(seconds)
+        server_timing = [f"{component};dur={seconds * 1000:.2f}" for component, seconds in timings.items()]
+        server_timing.append(f"total;dur={elapsed * 1000:.2f}")
+        response.headers['Server-Timing'] = ", ".join(server_timing)
+    # Before the body is sent: streamed responses (SSE, exports) only tear
+    # down when they close, which for /api/events is never
+    finish_profile()
+    return response
+
+@app.teardown_request
+def finish_profile(exc=None):
+    # Also runs if after_request did not, so the profiler is always released
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profiler.finish(profile, request_method(), request_route(),
+                        time.perf_counter() - g.request_started)
+
+# Includes loading and compiling the template, which Flask's render signals leave out
+render_template = request_profiler.timed_call('render')(render_template)
+
+@app.before_request
+def enforce_rate_limit():
+    # Cheap when unchanged; applies policy.json edits before the limit is checked
+    config.policy()
+    retry_after = rate_limiter.check(request.remote_addr, request.method, request.path)
+    if retry_after is not None:
+        rate_limited.inc()
+        logger.debug(f"Rate limit exceeded for {request.remote_addr} on {request.method} {request.path}")
+        response = jsonify({"error": "Rate limit exceeded"})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
 
 def get_available_videos() -> list:
-    videos_dir = Path(VIDEOS_DIR)
-    if not videos_dir.exists():
-        return []
-    
-    videos = []
-    for video_file in videos_dir.iterdir():
-        if video_file.is_file() and FileValidator.is_supported_video(video_file.name):
-            videos.append({
-                "filename": video_file.name,
-                "size": video_file.stat().st_size,
-                "path": str(video_file)
-            })
-    
-    return sorted(videos, key=lambda x: x["filename"])
+    return video_library.videos()
 
-@app.route('/')
-def index():
-    state = state_manager.load_state()
+def get_videos_with_metadata() -> list:
+    """Video list with cached metadata and thumbnails; never waits for ffprobe/ffmpeg."""
+    listing = video_library.listing()
+    videos = media_metadata.annotate(listing)
+    for video, (_, file_key) in zip(videos, listing.videos):
+        thumb_id = thumbnails.lookup(video["path"], file_key, video["metadata"].get("duration"))
+        video["thumbnail"] = f"/thumbnails/{thumb_id}" if thumb_id else None
+    return videos
+
+def render_index(state: Dict[str, Any]) -> str:
+    page_renders.inc()
     policy = load_policy()
     presets = load_presets()
-    videos = get_available_videos()
-    favorites = state.get('user_favorites', [])
+    videos = get_videos_with_metadata()
     
     return render_template('index.html', 
                          state=state,
                          policy=policy,
                          presets=presets["presets"],
                          videos=videos,
-                         favorites=favorites)
+                         favorites=favorites.all())
+
+@app.route('/')
+def index():
+    state_revision, state = state_manager.snapshot()
+    load_policy()
+    load_presets()
+    # Everything the page shows; it is only re-rendered when one changes
+    key = (state_revision,
+           favorites.revision,
+           config.revision,
+           video_library.revision,
+           media_metadata.revision,
+           thumbnails.revision)
+    page = page_cache.get('index', key, lambda: render_index(state))
+    
+    response = Response(page.body, mimetype='text/html')
+    response.set_etag(page.etag)
+    response.last_modified = page.last_modified
+    # Cache, but revalidate every time: the page shows live state
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/api/state', methods=['GET'])
 def get_state():
     return jsonify(state_manager.load_state())
 
+@app.route('/api/events', methods=['GET'])
+def state_events():
+    """Server-Sent Events stream of state changes.
+
+    Sends a full ``snapshot`` on connect (and whenever the client must
+    resync), then one compact ``state`` event per commit carrying only the
+    fields that changed.
+    """
+    subscription = state_manager.events.subscribe()
+    if subscription is None:
+        # Every stream left holds a thread; the page polls /api/state instead
+        logger.warning(f"Refusing /api/events from {request.remote_addr}: "
+                       f"{state_manager.events.max_subscribers} streams already open")
+        response = jsonify({"error": "Too many event streams"})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(SSE_RETRY_SECONDS)
+        return response
+    
+    def snapshot():
+        state = state_manager.load_state()
+        revision = state_manager.revision
+        return revision, format_sse('snapshot', {"revision": revision, "state": state}, revision)
+    
+    @stream_with_context
+    def stream():
+        try:
+            last_revision, message = snapshot()
+            yield message
+            
+            while True:
+                event = subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    # Pick up edits made outside this process
+                    state_manager.load_state()
+                    if state_manager.revision != last_revision:
+                        last_revision, message = snapshot()
+                        yield message
+                    else:
+                        yield ": keepalive\n\n"
+                    continue
+                
+                event_type, data = event
+                if event_type == RESYNC:
+                    last_revision, message = snapshot()
+                    yield message
+                elif data.get("revision", 0) > last_revision:
+                    last_revision = data["revision"]
+                    yield format_sse(event_type, data, last_revision)
+        finally:
+            state_manager.events.unsubscribe(subscription)
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/mode', methods=['POST'])
 def set_mode():
     data = request.get_json()
@@ -154,7 +430,7 @@ def set_mode():
     if mode is None:
         return jsonify({"error": "Invalid mode"}), 400
     
-    if state_manager.update_field('mode', mode):
+    if state_manager.update_fields({'mode': mode}):
         logger.info(f"Mode changed to {mode}")
         return jsonify({"success": True, "mode": mode})
     
@@ -167,11 +443,12 @@ def set_url():
         return jsonify({"error": "URL required"}), 400
     
     url = data['url'].strip()
-    if not URLValidator.is_valid_youtube_url(url):
+    parsed = parse_youtube_url(url)
+    if not parsed.valid:
         return jsonify({"error": "Invalid YouTube URL"}), 400
     
-    if state_manager.update_field('last_online_url', url):
-        embed_url = URLValidator.build_youtube_embed(url)
+    if state_manager.update_fields({'last_online_url': url}):
+        embed_url = parsed.embed_url()
         logger.info(f"URL changed to {url}")
         return jsonify({"success": True, "url": url, "embed_url": embed_url})
     
@@ -184,15 +461,12 @@ def set_preset():
         return jsonify({"error": "Preset URL required"}), 400
     
     url = data['url'].strip()
-    if not URLValidator.is_valid_youtube_url(url):
+    parsed = parse_youtube_url(url)
+    if not parsed.valid:
         return jsonify({"error": "Invalid preset YouTube URL"}), 400
     
-    success = state_manager.update_field('last_online_url', url)
-    if success and state_manager.load_state().get('mode') != 'online':
-        success = state_manager.update_field('mode', 'online')
-    
-    if success:
-        embed_url = URLValidator.build_youtube_embed(url)
+    if state_manager.update_fields({'last_online_url': url, 'mode': 'online'}):
+        embed_url = parsed.embed_url()
         logger.info(f"Preset selected: {url}")
         return jsonify({"success": True, "url": url, "embed_url": embed_url, "mode": "online"})
     
@@ -212,7 +486,7 @@ def handle_volume():
     if volume is None:
         return jsonify({"error": "Volume must be 0-100"}), 400
     
-    if state_manager.update_field('volume', volume):
+    if state_manager.update_fields({'volume': volume}):
         logger.info(f"Volume changed to {volume}")
         return jsonify({"success": True, "volume": volume})
     
@@ -226,7 +500,7 @@ def toggle_mute():
     
     muted = bool(data['muted'])
     
-    if state_manager.update_field('muted', muted):
+    if state_manager.update_fields({'muted': muted}):
         logger.info(f"Mute changed to {muted}")
         return jsonify({"success": True, "muted": muted})
     
@@ -239,12 +513,11 @@ def set_offline_video():
         return jsonify({"error": "Filename required"}), 400
     
     filename = data['filename']
-    videos = get_available_videos()
     
-    if not any(v['filename'] == filename for v in videos):
+    if not video_library.contains(filename):
         return jsonify({"error": "Video not found"}), 404
     
-    if state_manager.update_field('selected_offline', filename):
+    if state_manager.update_fields({'selected_offline': filename}):
         logger.info(f"Selected offline video: {filename}")
         return jsonify({"success": True, "filename": filename})
     
@@ -252,14 +525,12 @@ def set_offline_video():
 
 @app.route('/api/videos', methods=['GET'])
 def list_videos():
-    return jsonify({"videos": get_available_videos()})
+    return jsonify({"videos": get_videos_with_metadata()})
 
 @app.route('/api/favorites', methods=['GET'])
 def get_favorites():
     """Get all user favorites"""
-    state = state_manager.load_state()
-    favorites = state.get('user_favorites', [])
-    return jsonify({"favorites": favorites})
+    return jsonify({"favorites": favorites.all()})
 
 @app.route('/api/favorites/add', methods=['POST'])
 def add_favorite():
@@ -272,9 +543,6 @@ def add_favorite():
     state = state_manager.load_state()
     current_mode = state.get('mode')
     
-    # Get current favorites to check for duplicates
-    current_favorites = state.get('user_favorites', [])
-    
     # Create favorite based on current mode
     favorite = None
     if current_mode == 'online':
@@ -283,7 +551,7 @@ def add_favorite():
             return jsonify({"error": "No online URL currently set"}), 400
         
         # Check for duplicate
-        if FavoritesValidator.find_duplicate_favorite(current_favorites, url=current_url):
+        if favorites.find(url=current_url):
             return jsonify({"error": "This video is already in favorites"}), 400
         
         favorite = FavoritesValidator.create_favorite_from_online(name, current_url)
@@ -294,7 +562,7 @@ def add_favorite():
             return jsonify({"error": "No offline video currently selected"}), 400
         
         # Check for duplicate
-        if FavoritesValidator.find_duplicate_favorite(current_favorites, filename=current_filename):
+        if favorites.find(filename=current_filename):
             return jsonify({"error": "This video is already in favorites"}), 400
         
         favorite = FavoritesValidator.create_favorite_from_offline(name, current_filename)
@@ -302,15 +570,18 @@ def add_favorite():
     if not favorite:
         return jsonify({"error": "Could not create favorite"}), 400
     
-    # Add to favorites list
-    current_favorites.append(favorite)
+    try:
+        added = favorites.add(favorite)
+    except OSError as e:
+        logger.error(f"Failed to save favorite: {e}")
+        return jsonify({"error": "Failed to save favorite"}), 500
     
-    # Save state
-    if state_manager.update_field('user_favorites', current_favorites):
-        logger.info(f"Added favorite: {favorite['name']} ({favorite['source']})")
-        return jsonify({"success": True, "favorite": favorite})
+    if not added:
+        # Added from another device since the duplicate check
+        return jsonify({"error": "This video is already in favorites"}), 400
     
-    return jsonify({"error": "Failed to save favorite"}), 500
+    logger.info(f"Added favorite: {favorite['name']} ({favorite['source']})")
+    return jsonify({"success": True, "favorite": favorite})
 
 @app.route('/api/favorites/remove', methods=['DELETE'])
 def remove_favorite():
@@ -323,21 +594,17 @@ def remove_favorite():
     if not FavoritesValidator.validate_favorite_id(favorite_id):
         return jsonify({"error": "Invalid favorite ID"}), 400
     
-    state = state_manager.load_state()
-    current_favorites = state.get('user_favorites', [])
-    
-    # Find and remove the favorite
-    updated_favorites = [fav for fav in current_favorites if fav.get('id') != favorite_id]
+    try:
+        removed = favorites.remove(favorite_id)
+    except OSError as e:
+        logger.error(f"Failed to remove favorite: {e}")
+        return jsonify({"error": "Failed to remove favorite"}), 500
     
-    if len(updated_favorites) == len(current_favorites):
+    if removed is None:
         return jsonify({"error": "Favorite not found"}), 404
     
-    # Save updated state
-    if state_manager.update_field('user_favorites', updated_favorites):
-        logger.info(f"Removed favorite with ID: {favorite_id}")
-        return jsonify({"success": True, "removed_id": favorite_id})
-    
-    return jsonify({"error": "Failed to remove favorite"}), 500
+    logger.info(f"Removed favorite with ID: {favorite_id}")
+    return jsonify({"success": True, "removed_id": favorite_id})
 
 @app.route('/api/favorites/select', methods=['POST'])
 def select_favorite():
@@ -350,16 +617,7 @@ def select_favorite():
     if not FavoritesValidator.validate_favorite_id(favorite_id):
         return jsonify({"error": "Invalid favorite ID"}), 400
     
-    state = state_manager.load_state()
-    current_favorites = state.get('user_favorites', [])
-    
-    # Find the favorite
-    favorite = None
-    for fav in current_favorites:
-        if fav.get('id') == favorite_id:
-            favorite = fav
-            break
-    
+    favorite = favorites.get(favorite_id)
     if not favorite:
         return jsonify({"error": "Favorite not found"}), 404
     
@@ -367,20 +625,15 @@ def select_favorite():
     success = False
     if favorite['source'] == 'online':
         url = favorite.get('url')
-        if url and URLValidator.is_valid_youtube_url(url):
-            success = state_manager.update_field('last_online_url', url)
-            if success and state.get('mode') != 'online':
-                success = state_manager.update_field('mode', 'online')
+        if url and parse_youtube_url(url).valid:
+            success = state_manager.update_fields({'last_online_url': url, 'mode': 'online'})
     
     elif favorite['source'] == 'offline':
         filename = favorite.get('filename')
         if filename:
             # Verify file still exists
-            videos = get_available_videos()
-            if any(v['filename'] == filename for v in videos):
-                success = state_manager.update_field('selected_offline', filename)
-                if success and state.get('mode') != 'offline':
-                    success = state_manager.update_field('mode', 'offline')
+            if video_library.contains(filename):
+                success = state_manager.update_fields({'selected_offline': filename, 'mode': 'offline'})
             else:
                 return jsonify({"error": "Video file no longer exists"}), 404
     
@@ -394,6 +647,53 @@ def select_favorite():
     
     return jsonify({"error": "Failed to select favorite"}), 500
 
+def ndjson_download(lines, filename: str) -> Response:
+    response = Response(stream_with_context(lines), mimetype=NDJSON_MIMETYPE)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@app.route('/api/favorites/export', methods=['GET'])
+def export_favorites():
+    """Stream all favorites as NDJSON, one favorite per line"""
+    return ndjson_download(encode_ndjson(favorites.all()), "fireplace-favorites.ndjson")
+
+@app.route('/api/favorites/import', methods=['POST'])
+def import_favorites():
+    """Add the favorites in an NDJSON body, skipping ones already present"""
+    report = ImportReport()
+    spool, count = spool_favorites(request.stream, report, validate=validator.validate_favorite)
+    with spool:
+        try:
+            report.imported = favorites.import_favorites(read_spool(spool), validated=True)
+        except OSError as e:
+            logger.error(f"Failed to import favorites: {e}")
+            return jsonify({"error": "Failed to import favorites"}), 500
+    report.duplicates = count - report.imported
+    
+    logger.info(f"Imported {report.imported} favorites ({report.duplicates} duplicates, {report.invalid} invalid)")
+    return jsonify(dict(report.to_dict(), success=True))
+
+@app.route('/api/playlists/export', methods=['GET'])
+def export_playlists():
+    """Stream all playlists as NDJSON, one {"name", "videos"} object per line"""
+    playlists = state_manager.load_state().get('playlists', {})
+    records = ({"name": name, "videos": videos} for name, videos in playlists.items())
+    return ndjson_download(encode_ndjson(records), "fireplace-playlists.ndjson")
+
+@app.route('/api/playlists/import', methods=['POST'])
+def import_playlists():
+    """Merge the playlists in an NDJSON body into the existing ones"""
+    report = ImportReport()
+    imported = read_playlists(request.stream, report)
+    # Merged under the lock so a change made while the body was read is kept
+    with state_manager.lock:
+        merged = merge_playlists(state_manager.load_state().get('playlists', {}), imported, report)
+        if report.imported and not state_manager.update_fields({'playlists': merged}):
+            return jsonify({"error": "Failed to import playlists"}), 500
+    
+    logger.info(f"Imported {report.imported} playlist entries ({report.duplicates} duplicates, {report.invalid} invalid)")
+    return jsonify(dict(report.to_dict(), success=True))
+
 @app.route('/offline')
 def offline_player():
     return send_from_directory(Path(__file__).parent / 'offline_player', 'offline.html')
@@ -404,11 +704,12 @@ def youtube_player():
     state = state_manager.load_state()
     url = state.get('last_online_url')
 
-    if not url or not URLValidator.is_valid_youtube_url(url):
+    parsed = parse_youtube_url(url)
+    if not parsed.valid:
         # Fallback to a default video if none set
-        url = "https://www.youtube.com/watch?v=L_LUpnjgPso"
+        parsed = parse_youtube_url("https://www.youtube.com/watch?v=L_LUpnjgPso")
 
-    youtube_url = URLValidator.build_youtube_fullpage_url(url)
+    youtube_url = parsed.fullpage_url()
     return render_template('youtube_player.html', youtube_url=youtube_url)
 
 @app.route('/static/offline/<path:filename>')
@@ -417,47 +718,31 @@ def offline_static(filename):
 
 @app.route('/videos/<path:filename>')
 def serve_video(filename):
-    """Serve video files from the videos directory"""
-    # Sanitize filename to prevent directory traversal
+    """Serve video files from the videos directory, with Range support"""
     if not FileValidator.is_supported_video(filename):
         return "Invalid video format", 400
     
-    # Try production path first, then development path
-    videos_dir = Path(VIDEOS_DIR)
-    if not videos_dir.exists():
-        videos_dir = Path('/opt/fireplace/videos')
-    
-    if not videos_dir.exists():
-        logger.error(f"Videos directory not found: {videos_dir}")
-        return "Videos directory not found", 500
-    
-    video_path = videos_dir / filename
-    
-    # Security check - ensure file is within videos directory
-    try:
-        video_path = video_path.resolve()
-        videos_dir = videos_dir.resolve()
-        if not str(video_path).startswith(str(videos_dir)):
-            return "Access denied", 403
-    except Exception:
-        return "Invalid path", 400
-    
-    if not video_path.is_file():
+    # Only files in the library index are served, so traversal is impossible
+    response = video_streamer.response(filename, request)
+    if response is None:
         logger.warning(f"Video file not found: {filename}")
         return "Video not found", 404
     
-    # Serve with appropriate MIME type
-    mime_type = 'video/mp4'
-    if filename.lower().endswith('.webm'):
-        mime_type = 'video/webm'
-    elif filename.lower().endswith('.mkv'):
-        mime_type = 'video/x-matroska'
-    elif filename.lower().endswith('.avi'):
-        mime_type = 'video/x-msvideo'
-    elif filename.lower().endswith('.mov'):
-        mime_type = 'video/quicktime'
-    
-    return send_from_directory(str(videos_dir), filename, mimetype=mime_type)
+    return response
+
+@app.route('/thumbnails/<thumb_id>')
+def serve_thumbnail(thumb_id):
+    """Serve a generated thumbnail. Ids name immutable content, so cache forever."""
+    thumb_path = thumbnails.path_for(thumb_id)
+    if thumb_path is None:
+        return "Thumbnail not found", 404
+    
+    response = send_from_directory(str(thumb_path.parent), thumb_path.name,
+                                   mimetype='image/jpeg', etag=thumb_id,
+                                   max_age=31536000, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 @app.route('/api/kiosk/stop', methods=['POST'])
 def stop_kiosk():
@@ -534,6 +819,34 @@ def kiosk_status():
         logger.error(f"Error checking kiosk status: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/kiosk/memory', methods=['GET'])
+def kiosk_memory():
+    """Chromium memory history and watchdog restarts, as published by the watcher"""
+    status = runtime_status.read('chromium_memory')
+    if status is None:
+        return jsonify({"success": False, "error": "No memory data published yet"}), 404
+    return jsonify(dict(status, success=True))
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics for this server plus the watcher's latest snapshot"""
+    sse_clients.set(state_manager.events.subscriber_count)
+    
+    watcher = runtime_status.read('watcher_metrics')
+    if watcher is not None:
+        watcher_metrics_age.set(round(max(0.0, time.time() - watcher.get('published_at', 0)), 3))
+    body = REGISTRY.render()
+    if watcher is not None:
+        body += render_text(watcher.get('metrics', []))
+    return Response(body, mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def download_profiles():
+    """Recent profiled requests (hot path and top functions each) as a JSON download"""
+    response = jsonify(profiler.report())
+    response.headers['Content-Disposition'] = 'attachment; filename="fireplace-profiles.json"'
+    return response
+
 @app.route('/api/system/shutdown', methods=['POST'])
 def shutdown_system():
     """Safely shutdown the Raspberry Pi"""
@@ -644,12 +957,15 @@ def set_scheduled_shutdown():
         schedule['weekdays_only'] = data['weekdays_only']
     
     # Get current configuration and update with new values
-    state = state_manager.load_state()
-    current_schedule = state.get('scheduled_shutdown', {})
-    current_schedule.update(schedule)
+    with state_manager.lock:
+        state = state_manager.load_state()
+        current_schedule = dict(state.get('scheduled_shutdown', {}))
+        current_schedule.update(schedule)
+        
+        # Save updated configuration
+        saved = state_manager.update_fields({'scheduled_shutdown': current_schedule})
     
-    # Save updated configuration
-    if state_manager.update_field('scheduled_shutdown', current_schedule):
+    if saved:
         logger.info(f"Scheduled shutdown updated: {current_schedule}")
         
         # Update systemd timer if time changed
@@ -703,4 +1019,6 @@ WantedBy=timers.target
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8080, debug=True)
\ No newline at end of file
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py).
+    # Set FLASK_DEBUG=1 for the reloader and debugger.
+    app.run(host='0.0.0.0', port=8080, debug=os.environ.get('FLASK_DEBUG') == '1', threaded=True)
\ No newline at end of file
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+
+"""
+Shared state.json cache for the control server and the watcher.
+
+The parsed and validated state is kept in memory and only re-read when the
+file on disk actually changes. Change detection uses inotify on Linux and
+falls back to comparing (inode, size, mtime) from a single stat() call.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) constants
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct('iIII')
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE | IN_ATTRIB
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        try:
+            _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        except OSError:
+            _libc = False
+        if _libc and not hasattr(_libc, 'inotify_init1'):
+            _libc = False
+    return _libc
+
+
+def file_signature(path) -> Optional[Tuple[int, int, int]]:
+    """Return (inode, size, mtime_ns) for path, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def fd_signature(fd: int) -> Tuple[int, int, int]:
+    """file_signature() of an open file."""
+    st = os.fstat(fd)
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+@contextmanager
+def atomic_file(path, fsync: bool = True, mode: str = 'w'):
+    """File to write in place of path; it replaces path only if the block succeeds.
+
+    Readers only ever see the old or the new file, never a partial write,
+    even if power is lost part way through. ``fsync=False`` skips the
+    flushes for files on tmpfs, where durability is meaningless.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    if not fsync:
+        return
+    try:
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def write_text_atomic(path, text: str, fsync: bool = True) -> Tuple[int, int, int]:
+    """Write text to a temp file, fsync it and rename it over path.
+
+    Returns the signature of the file written, for StateCache.prime().
+    """
+    with atomic_file(path, fsync) as f:
+        f.write(text)
+        f.flush()
+        # The rename keeps inode, size and mtime, so this is path's signature
+        signature = fd_signature(f.fileno())
+    return signature
+
+
+def write_json_atomic(path, data: Any, indent: Optional[int] = 2, fsync: bool = True) -> Tuple[int, int, int]:
+    """write_text_atomic() for a JSON document."""
+    return write_text_atomic(path, json.dumps(data, indent=indent), fsync)
+
+
+class InotifyWatch:
+    """Non-blocking inotify watch on the directory containing a single file.
+
+    The directory is watched rather than the file itself so that atomic
+    replace-by-rename is seen. Only events naming the file (or one of
+    extra_names in the same directory) are reported.
+    """
+
+    def __init__(self, path, extra_names=()):
+        self.path = Path(path)
+        self.fd = None
+        self._pid = None
+        self._names = {os.fsencode(name) for name in (self.path.name, *extra_names)}
+
+    @staticmethod
+    def available() -> bool:
+        return bool(_load_libc())
+
+    def open(self) -> bool:
+        libc = _load_libc()
+        if not libc:
+            return False
+
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            logger.debug(f"inotify_init1 failed: errno {ctypes.get_errno()}")
+            return False
+
+        wd = libc.inotify_add_watch(fd, os.fsencode(str(self.path.parent)), _WATCH_MASK)
+        if wd < 0:
+            logger.debug(f"inotify_add_watch failed for {self.path.parent}: errno {ctypes.get_errno()}")
+            os.close(fd)
+            return False
+
+        self.fd = fd
+        self._pid = os.getpid()
+        return True
+
+    def is_open(self) -> bool:
+        # A descriptor inherited across fork() would share its event queue
+        # with the parent, so every process needs its own watch.
+        return self.fd is not None and self._pid == os.getpid()
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def read_changed(self) -> bool:
+        """Drain pending events; True if any of them concern the watched file."""
+        changed = False
+        while True:
+            try:
+                data = os.read(self.fd, 4096)
+            except BlockingIOError:
+                return changed
+            except OSError as e:
+                logger.debug(f"inotify read failed: {e}")
+                return True
+
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + name_len].rstrip(b'\0')
+                offset += name_len
+                if mask & IN_Q_OVERFLOW or name in self._names:
+                    changed = True
+
+    def close(self):
+        if self.fd is not None and self._pid == os.getpid():
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+        self.fd = None
+        self._pid = None
+
+
+class StateCache:
+    """Parsed, validated view of a JSON state file with change detection.
+
+    ``get()`` re-reads the file only when its signature changed. With
+    inotify a cache hit costs no stat() at all; without it, one stat().
+    ``revision`` increases every time a different version is loaded or
+    primed, so callers can cheaply tell whether anything changed.
+    """
+
+    def __init__(self, path,
+                 validate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 default_factory: Optional[Callable[[], Dict[str, Any]]] = None,
+                 use_inotify: bool = True):
+        self.path = Path(path)
+        self._validate = validate
+        self._default_factory = default_factory or dict
+        self._watch = InotifyWatch(self.path) if use_inotify else None
+        self._lock = threading.RLock()
+        self._state = None
+        self._signature = None
+        self._revision = 0
+
+    @property
+    def revision(self) -> int:
+        return self._revision
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._watch is not None and self._watch.is_open()
+
+    @property
+    def mtime(self) -> Optional[float]:
+        """Modification time (epoch seconds) of the currently cached version."""
+        if self._signature is None:
+            return None
+        return self._signature[2] / 1e9
+
+    def fileno(self) -> Optional[int]:
+        """inotify descriptor that becomes readable when the file may have changed.
+
+        Lets an event loop block on state changes; ``get()`` drains it.
+        Returns None when only stat() polling is available.
+        """
+        with self._lock:
+            self._ensure_watch()
+            return self._watch.fileno() if self._watch is not None else None
+
+    def _ensure_watch(self):
+        if self._watch is not None and not self._watch.is_open():
+            if not self._watch.open():
+                logger.info("inotify unavailable, falling back to stat() checks for state cache")
+                self._watch = None
+
+    def _is_stale(self) -> bool:
+        if self._watch is not None and not self._watch.is_open():
+            # Events from before the watch existed were missed, so this
+            # check has to fall through to the stat() comparison.
+            self._ensure_watch()
+        elif self._watch is not None and self._state is not None:
+            if not self._watch.read_changed():
+                return False
+
+        if self._state is None:
+            return True
+        return self._read_signature() != self._signature
+
+    def _read_signature(self):
+        """What identifies the version on disk; compared to tell if it changed."""
+        return file_signature(self.path)
+
+    def _written_signature(self, signature):
+        """_read_signature() as it reads right after this process wrote a file with signature."""
+        return signature
+
+    def get(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._is_stale():
+                self._reload()
+            return self._state
+
+    def snapshot(self) -> Tuple[int, Dict[str, Any]]:
+        """Current (revision, state), read together so they always match."""
+        with self._lock:
+            state = self.get()
+            return self._revision, state
+
+    def _reload(self):
+        signature = self._read_signature()
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+            if self._validate is not None and not self._validate(state):
+                logger.warning(f"{self.path.name} failed validation, using defaults")
+                state = self._default_factory()
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not load {self.path.name}: {e}, using defaults")
+            state = self._default_factory()
+
+        self._state = state
+        self._signature = signature
+        self._revision += 1
+
+    def prime(self, state: Dict[str, Any], signature: Optional[Tuple[int, int, int]] = None):
+        """Record a state this process just wrote, avoiding a re-read of its own write.
+
+        signature is the written file's, as returned by write_json_atomic().
+        Another process may replace the file between that write and this
+        call; draining inotify would then hide its change, so if the file
+        on disk is no longer the one written, it is loaded instead.
+        """
+        with self._lock:
+            self._ensure_watch()
+            if self._watch is not None:
+                self._watch.read_changed()
+            self._state = state
+            self._signature = self._read_signature()
+            self._revision += 1
+            if signature is not None and self._signature != self._written_signature(signature):
+                logger.debug(f"{self.path.name} was replaced after this process wrote it, reloading")
+                self._state = None
+                self._reload()
+
+    def invalidate(self):
+        with self._lock:
+            self._state = None
+            self._signature = None
+
+    def close(self):
+        if self._watch is not None:
+            self._watch.close()
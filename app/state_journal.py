@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+
+"""
+Append-only journal of state changes kept beside state.json.
+
+With the journal on, a commit no longer rewrites the whole pretty-printed
+state.json. Only the fields that changed are appended to ``state.journal``
+as one checksummed line, and the write is flushed with a single fdatasync:
+
+    3f1c09a2 {"set":{"muted":true}}
+
+The state is state.json (the snapshot) with the journal replayed over it.
+Replay stops at the first record that is torn or fails its CRC, which is
+where power was lost; the next append truncates whatever follows it. Once
+the journal passes JOURNAL_COMPACT_BYTES, a background thread writes the
+replayed state to state.json atomically and deletes the journal.
+
+Records set fields to absolute values, so replaying a journal over a
+snapshot that already includes it changes nothing. That keeps every crash
+point safe: a compaction interrupted after the snapshot was replaced, but
+before the journal was deleted, replays to the same state.
+
+Readers (the watcher, other gunicorn workers) always read through
+JournaledStateCache, which replays new records incrementally and handles
+a missing journal as an empty one, so the journal can be switched on and
+off at any time.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+try:
+    # Try relative import first (when run as module)
+    from .events import diff_state
+    from .state_cache import InotifyWatch, StateCache, file_signature, write_json_atomic
+except ImportError:
+    # Fall back to direct import (when run as script)
+    from events import diff_state
+    from state_cache import InotifyWatch, StateCache, file_signature, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+# Journal size that triggers a background compaction into state.json
+JOURNAL_COMPACT_BYTES = 64 * 1024
+
+
+def journal_path_for(path) -> Path:
+    """state.json -> state.journal"""
+    path = Path(path)
+    return path.with_name(path.stem + ".journal")
+
+
+def encode_record(changes: Dict[str, Any], removed=()) -> bytes:
+    record = {"set": changes}
+    if removed:
+        record["unset"] = list(removed)
+    payload = json.dumps(record, separators=(',', ':')).encode()
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+
+def decode_record(line: bytes) -> Optional[Dict[str, Any]]:
+    """The record on a journal line (without its newline), or None if it is damaged."""
+    checksum, _, payload = line.partition(b" ")
+    try:
+        if len(checksum) != 8 or int(checksum, 16) != zlib.crc32(payload):
+            return None
+        record = json.loads(payload)
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or not isinstance(record.get("set"), dict):
+        return None
+    return record
+
+
+def apply_record(state: Dict[str, Any], record: Dict[str, Any]) -> Dict[str, Any]:
+    state = dict(state)
+    state.update(record["set"])
+    for key in record.get("unset", ()):
+        state.pop(key, None)
+    return state
+
+
+class JournaledStateCache(StateCache):
+    """StateCache for state.json plus its journal; also the journal's writer.
+
+    ``append()`` commits a new state as a journal record and ``compact()``
+    folds the journal into state.json. Both hold an exclusive flock() on
+    the journal, so several processes can share it.
+    """
+
+    def __init__(self, path,
+                 validate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 default_factory: Optional[Callable[[], Dict[str, Any]]] = None,
+                 use_inotify: bool = True, fsync: bool = True):
+        super().__init__(path, validate=validate, default_factory=default_factory,
+                         use_inotify=use_inotify)
+        self.journal_path = journal_path_for(self.path)
+        if self._watch is not None:
+            self._watch = InotifyWatch(self.path, extra_names=(self.journal_path.name,))
+        self._fsync = fsync
+        # Journal inode and the end of its last valid record, as replayed
+        self._journal_ino = None
+        self._journal_offset = 0
+        self._compact_wanted = threading.Event()
+        self._compactor = None
+        self._compactor_pid = None
+
+    @property
+    def mtime(self) -> Optional[float]:
+        if self._signature is None:
+            return None
+        times = [signature[2] for signature in self._signature if signature is not None]
+        return max(times) / 1e9 if times else None
+
+    @property
+    def journal_bytes(self) -> int:
+        """Size of the journal as last replayed."""
+        return self._journal_offset
+
+    def _read_signature(self):
+        return (file_signature(self.path), file_signature(self.journal_path))
+
+    def _written_signature(self, signature):
+        # state.json is only written directly once the journal is compacted away
+        return (signature, None)
+
+    # Reading
+
+    def _reload(self):
+        signature = self._read_signature()
+        snapshot, journal = signature
+        if (self._state is not None and self._signature is not None
+                and snapshot == self._signature[0] and journal is not None
+                and journal[0] == self._journal_ino and journal[1] >= self._journal_offset):
+            # Only appends since the last read; replay just those
+            state = self._replay(self._state)
+            if state is self._state or self._validate is None or self._validate(state):
+                if state is not self._state:
+                    self._state = state
+                    self._revision += 1
+                # As stat()ed before reading, so anything appended since is read next time
+                self._signature = signature
+                return
+            # Invalid once replayed: reload in full, which falls back to state.json
+            # alone exactly as a reader starting now would
+
+        while True:
+            # Loads and validates state.json alone, and bumps the revision
+            super()._reload()
+            self._journal_ino = journal[0] if journal is not None else None
+            self._journal_offset = 0
+            state = self._replay(self._state) if journal is not None else self._state
+            # state.json was compacted while the journal was read; start again
+            if file_signature(self.path) == snapshot:
+                break
+            signature = self._read_signature()
+            snapshot, journal = signature
+
+        if state is not self._state and self._validate is not None and not self._validate(state):
+            logger.warning(f"{self.journal_path.name} replays to an invalid state, using {self.path.name} alone")
+            state = self._state
+        self._state = state
+        self._signature = signature
+
+    def _replay(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """state with the complete, valid records after _journal_offset applied."""
+        try:
+            with open(self.journal_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_ino != self._journal_ino:
+                    return state
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return state
+
+        offset = 0
+        while True:
+            end = data.find(b"\n", offset)
+            if end < 0:
+                break
+            record = decode_record(data[offset:end])
+            if record is None:
+                logger.warning(f"Damaged record in {self.journal_path.name} at byte "
+                               f"{self._journal_offset + offset}; replay stops there")
+                break
+            state = apply_record(state, record)
+            offset = end + 1
+        self._journal_offset += offset
+        return state
+
+    # Writing
+
+    @contextmanager
+    def _locked_journal(self):
+        """Append descriptor for the current journal, held under an exclusive flock()."""
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            fd = os.open(self.journal_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    current = os.stat(self.journal_path).st_ino
+                except FileNotFoundError:
+                    current = None
+                if current == os.fstat(fd).st_ino:
+                    break
+            except BaseException:
+                os.close(fd)
+                raise
+            # Compacted away by another process while we waited; lock the new one
+            os.close(fd)
+        try:
+            yield fd
+        finally:
+            os.close(fd)
+
+    def _sync(self):
+        """Bring the cached state up to date with disk, whatever inotify says."""
+        if self._state is None or self._read_signature() != self._signature:
+            self._reload()
+
+    def append(self, state: Dict[str, Any]) -> bool:
+        """Commit state by journaling how it differs from the current one.
+
+        Returns False, writing nothing, if nothing changed.
+        """
+        with self._lock, self._locked_journal() as fd:
+            self._sync()
+            st = os.fstat(fd)
+            if st.st_ino != self._journal_ino:
+                # Created by this open
+                self._journal_ino = st.st_ino
+                self._journal_offset = 0
+            if st.st_size > self._journal_offset:
+                logger.warning(f"Dropping {st.st_size - self._journal_offset} bytes after the last valid "
+                               f"record in {self.journal_path.name}")
+                os.ftruncate(fd, self._journal_offset)
+
+            diff = diff_state(self._state, state)
+            if not diff["changes"] and not diff.get("removed"):
+                return False
+            data = encode_record(diff["changes"], diff.get("removed", ()))
+            view = memoryview(data)
+            try:
+                while view:
+                    view = view[os.write(fd, view):]
+                if self._fsync:
+                    os.fdatasync(fd)
+            except OSError:
+                # The file may hold part of the record; the next reader stops before it
+                self.invalidate()
+                raise
+
+            if self._watch is not None and self._watch.is_open():
+                self._watch.read_changed()
+            self._journal_offset += len(data)
+            self._state = dict(state)
+            self._signature = self._read_signature()
+            self._revision += 1
+
+            if self._journal_offset >= JOURNAL_COMPACT_BYTES:
+                self._request_compaction()
+            return True
+
+    def has_journal(self) -> bool:
+        return self.journal_path.exists()
+
+    def compact(self):
+        """Write the replayed state to state.json and delete the journal."""
+        with self._lock:
+            if not self.has_journal():
+                return
+            with self._locked_journal():
+                self._sync()
+                if self._journal_offset == 0 and os.path.getsize(self.journal_path) == 0:
+                    os.unlink(self.journal_path)
+                    return
+                write_json_atomic(self.path, self._state, fsync=self._fsync)
+                # A crash before this unlink just replays the journal onto the same state
+                os.unlink(self.journal_path)
+                size = self._journal_offset
+                if self._watch is not None and self._watch.is_open():
+                    self._watch.read_changed()
+                self._journal_ino = None
+                self._journal_offset = 0
+                self._signature = self._read_signature()
+            logger.info(f"Compacted {size} bytes of {self.journal_path.name} into {self.path.name}")
+
+    def _request_compaction(self):
+        if self._compactor is None or self._compactor_pid != os.getpid() or not self._compactor.is_alive():
+            # A thread inherited across fork() does not run in the child
+            self._compactor = threading.Thread(target=self._compact_loop, name="state-journal-compactor",
+                                               daemon=True)
+            self._compactor_pid = os.getpid()
+            self._compactor.start()
+        self._compact_wanted.set()
+
+    def _compact_loop(self):
+        while True:
+            self._compact_wanted.wait()
+            self._compact_wanted.clear()
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"State journal compaction failed: {e}")
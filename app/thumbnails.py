@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+"""
+Poster-frame thumbnails for local videos, generated lazily with ffmpeg.
+
+Thumbnails are stored on disk under an id derived from the source file's
+identity (inode, size, mtime) and the output size, so a given id always
+names the same image and can be cached by browsers forever. Generation
+runs on a single low-priority worker that is throttled to a CPU budget,
+keeping decode work from competing with playback on the Pi.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple
+
+try:
+    # Try relative import first (when run as module)
+    from .low_priority import find_tool, low_priority_command
+except ImportError:
+    # Fall back to direct import (when run as script)
+    from low_priority import find_tool, low_priority_command
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (320, 180)
+# Fraction of one CPU core thumbnail generation may use on average
+THUMBNAIL_CPU_BUDGET = 0.25
+# ffmpeg runs at the lowest CPU priority
+THUMBNAIL_NICENESS = 19
+# A failed thumbnail (often an ffmpeg timeout on a busy Pi) is retried after this long
+THUMBNAIL_RETRY_SECONDS = 600
+THUMBNAIL_ID_PATTERN = re.compile(r'^[0-9a-f]{40}$')
+
+
+class ThumbnailStore:
+    def __init__(self, thumbnail_dir, enabled: bool = True, ffmpeg: str = "ffmpeg",
+                 max_workers: int = 1, cpu_budget: float = THUMBNAIL_CPU_BUDGET,
+                 timeout: float = 60):
+        self.thumbnail_dir = Path(thumbnail_dir)
+        self.ffmpeg = find_tool(ffmpeg)
+        self.enabled = enabled and self.ffmpeg is not None
+        self._ffmpeg_name = ffmpeg
+        self._warned_missing = False
+        self.max_workers = max_workers
+        self.cpu_budget = cpu_budget
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor = None
+        self._ids = {}
+        self._available = set()
+        self._pending = set()
+        # thumb_id -> time.monotonic() of its last failure
+        self._failed = {}
+        # Increases whenever a new thumbnail becomes available
+        self.revision = 0
+
+        if enabled and self.ffmpeg is None:
+            self._warn_missing()
+        if self.enabled:
+            self._load_existing()
+
+    def _warn_missing(self):
+        # Policy reloads re-apply the setting; say it once
+        if not self._warned_missing:
+            self._warned_missing = True
+            logger.warning(f"{self._ffmpeg_name} not found (set FIREPLACE_FFMPEG), thumbnails disabled")
+
+    def set_enabled(self, enabled: bool):
+        if enabled and self.ffmpeg is None:
+            self._warn_missing()
+        enabled = enabled and self.ffmpeg is not None
+        if enabled and not self.enabled:
+            self._load_existing()
+        self.enabled = enabled
+
+    def _load_existing(self):
+        try:
+            with os.scandir(self.thumbnail_dir) as entries:
+                for entry in entries:
+                    thumb_id, ext = os.path.splitext(entry.name)
+                    if ext == '.jpg' and THUMBNAIL_ID_PATTERN.match(thumb_id):
+                        self._available.add(thumb_id)
+        except FileNotFoundError:
+            pass
+
+    def thumbnail_id(self, file_key: Tuple[int, int, int]) -> str:
+        thumb_id = self._ids.get(file_key)
+        if thumb_id is None:
+            identity = f"{file_key[0]}:{file_key[1]}:{file_key[2]}:{THUMBNAIL_SIZE[0]}x{THUMBNAIL_SIZE[1]}"
+            thumb_id = hashlib.sha1(identity.encode()).hexdigest()
+            self._ids[file_key] = thumb_id
+        return thumb_id
+
+    def path_for(self, thumb_id: str) -> Optional[Path]:
+        """Path of a generated thumbnail, or None for unknown/invalid ids."""
+        if not THUMBNAIL_ID_PATTERN.match(thumb_id) or thumb_id not in self._available:
+            return None
+        return self.thumbnail_dir / f"{thumb_id}.jpg"
+
+    def lookup(self, video_path: str, file_key: Tuple[int, int, int],
+               duration: Optional[float] = None) -> Optional[str]:
+        """Thumbnail id if one exists; otherwise queue generation and return None."""
+        if not self.enabled or file_key is None:
+            return None
+
+        thumb_id = self.thumbnail_id(file_key)
+        if thumb_id in self._available:
+            return thumb_id
+
+        with self._lock:
+            failed_at = self._failed.get(thumb_id)
+            retry = failed_at is None or time.monotonic() - failed_at >= THUMBNAIL_RETRY_SECONDS
+            if thumb_id not in self._pending and retry:
+                self._failed.pop(thumb_id, None)
+                self._pending.add(thumb_id)
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='thumbnail')
+                self._executor.submit(self._generate_worker, video_path, thumb_id, duration)
+        return None
+
+    def _generate(self, video_path: str, output: Path, offset: float) -> Tuple[float, Optional[str]]:
+        """(CPU seconds ffmpeg used, error or None) for one frame grab."""
+        # Decoding stays on the last core; Chromium gets the rest
+        command = low_priority_command([
+            self.ffmpeg, '-nostdin', '-v', 'error', '-threads', '1',
+            '-ss', f"{offset:.2f}", '-i', video_path,
+            '-frames:v', '1',
+            '-vf', f"scale={THUMBNAIL_SIZE[0]}:{THUMBNAIL_SIZE[1]}:force_original_aspect_ratio=decrease",
+            '-q:v', '5', '-f', 'mjpeg', '-y', str(output)
+        ], THUMBNAIL_NICENESS, last_cpu_only=True)
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                       stderr=stderr)
+            # Reaped with wait4() rather than wait() so the CPU time is this
+            # ffmpeg's alone, not every child the server has reaped meanwhile
+            deadline = time.monotonic() + self.timeout
+            timed_out = False
+            while True:
+                pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+                if pid:
+                    break
+                if time.monotonic() >= deadline:
+                    process.kill()
+                    pid, status, usage = os.wait4(process.pid, 0)
+                    timed_out = True
+                    break
+                time.sleep(0.05)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            cpu_used = usage.ru_utime + usage.ru_stime
+
+            if timed_out:
+                return cpu_used, f"ffmpeg timed out after {self.timeout}s"
+            if process.returncode != 0:
+                stderr.seek(0)
+                message = stderr.read().decode(errors='replace').strip()[:200]
+                return cpu_used, message or f"ffmpeg exited with {process.returncode}"
+        return cpu_used, None
+
+    def _generate_worker(self, video_path: str, thumb_id: str, duration: Optional[float]):
+        started = time.monotonic()
+        cpu_used = 0.0
+        output = self.thumbnail_dir / f"{thumb_id}.jpg"
+        tmp_output = self.thumbnail_dir / f".{thumb_id}.tmp"
+        # A frame a little way in is more representative than the first one
+        offset = min(duration * 0.1, 30.0) if duration else 5.0
+
+        try:
+            self.thumbnail_dir.mkdir(parents=True, exist_ok=True)
+            cpu, error = self._generate(video_path, tmp_output, offset)
+            cpu_used += cpu
+            if error is None and (not tmp_output.exists() or tmp_output.stat().st_size == 0):
+                # Shorter than the seek offset; fall back to the first frame
+                cpu, error = self._generate(video_path, tmp_output, 0)
+                cpu_used += cpu
+            if error is not None:
+                raise RuntimeError(error)
+            if not tmp_output.exists() or tmp_output.stat().st_size == 0:
+                raise RuntimeError("ffmpeg produced no frame")
+            os.replace(tmp_output, output)
+            with self._lock:
+                self._available.add(thumb_id)
+                self.revision += 1
+            logger.debug(f"Generated thumbnail for {video_path}")
+        except Exception as e:
+            logger.warning(f"Could not generate thumbnail for {video_path}: {e}")
+            with self._lock:
+                self._failed[thumb_id] = time.monotonic()
+            try:
+                tmp_output.unlink()
+            except OSError:
+                pass
+        finally:
+            with self._lock:
+                self._pending.discard(thumb_id)
+            self._throttle(started, cpu_used)
+
+    def _throttle(self, started: float, cpu_used: float):
+        """Sleep long enough that ffmpeg's CPU use averages out to the budget."""
+        if self.cpu_budget <= 0:
+            return
+        remaining = cpu_used / self.cpu_budget - (time.monotonic() - started)
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -3,14 +3,23 @@ import re
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
 import jsonschema
-from jsonschema import validate, ValidationError
+from jsonschema import Draft7Validator, ValidationError
+
+# Format checkers are immutable once built, so one instance is shared by
+# every compiled validator.
+FORMAT_CHECKER = Draft7Validator.FORMAT_CHECKER
 
 class ConfigValidator:
     def __init__(self, schema_path: str = "/opt/fireplace/config/schema.json"):
         self.schema_path = schema_path
         self._schema = None
+        self._state_validator = None
+        self._policy_validator = None
+        self._state_field_validators = None
+        self._favorite_validator = None
         
     def load_schema(self) -> Dict[str, Any]:
         if self._schema is None:
@@ -23,45 +32,131 @@ class ConfigValidator:
                     self._schema = json.load(f)
         return self._schema
     
+    def _compile(self, definition: str) -> Draft7Validator:
+        schema = self.load_schema()["definitions"][definition]
+        Draft7Validator.check_schema(schema)
+        return Draft7Validator(schema, format_checker=FORMAT_CHECKER)
+    
+    @property
+    def state_validator(self) -> Draft7Validator:
+        if self._state_validator is None:
+            self._state_validator = self._compile("state")
+        return self._state_validator
+    
+    @property
+    def policy_validator(self) -> Draft7Validator:
+        if self._policy_validator is None:
+            self._policy_validator = self._compile("policy")
+        return self._policy_validator
+    
     def validate_state(self, state_data: Dict[str, Any]) -> bool:
-        schema = self.load_schema()
         try:
-            validate(instance=state_data, schema=schema["definitions"]["state"])
+            self.state_validator.validate(state_data)
             return True
         except ValidationError as e:
             print(f"State validation error: {e.message}")
             return False
     
+    def validate_state_fields(self, updates: Dict[str, Any]) -> bool:
+        """Validate only the given top-level fields of a state.
+
+        Fast path for partial updates applied on top of a state that is
+        already known to be valid: each value is checked against its own
+        property schema instead of re-validating the whole document.
+        """
+        if self._state_field_validators is None:
+            properties = self.state_validator.schema.get("properties", {})
+            self._state_field_validators = {
+                field: Draft7Validator(subschema, format_checker=FORMAT_CHECKER)
+                for field, subschema in properties.items()
+            }
+        
+        for field, value in updates.items():
+            field_validator = self._state_field_validators.get(field)
+            if field_validator is None:
+                print(f"State validation error: unknown field '{field}'")
+                return False
+            try:
+                field_validator.validate(value)
+            except ValidationError as e:
+                print(f"State validation error: {field}: {e.message}")
+                return False
+        return True
+    
+    def validate_favorite(self, favorite: Dict[str, Any]) -> bool:
+        """Validate one favorite against the schema for user_favorites items."""
+        if self._favorite_validator is None:
+            items = self.state_validator.schema["properties"]["user_favorites"]["items"]
+            self._favorite_validator = Draft7Validator(items, format_checker=FORMAT_CHECKER)
+        try:
+            self._favorite_validator.validate(favorite)
+            return True
+        except ValidationError as e:
+            print(f"Favorite validation error: {e.message}")
+            return False
+    
     def validate_policy(self, policy_data: Dict[str, Any]) -> bool:
-        schema = self.load_schema()
         try:
-            validate(instance=policy_data, schema=schema["definitions"]["policy"])
+            self.policy_validator.validate(policy_data)
             return True
         except ValidationError as e:
             print(f"Policy validation error: {e.message}")
             return False
+    
+    def validate_presets(self, presets_data: Dict[str, Any]) -> bool:
+        # presets.json has no schema definition; check the fields the UI uses
+        presets = presets_data.get("presets") if isinstance(presets_data, dict) else None
+        if not isinstance(presets, list):
+            print("Presets validation error: 'presets' must be a list")
+            return False
+        for preset in presets:
+            if not isinstance(preset, dict) or not all(
+                    isinstance(preset.get(field), str) for field in ("name", "url")):
+                print(f"Presets validation error: invalid preset {preset!r}")
+                return False
 
-class URLValidator:
-    @staticmethod
-    def extract_youtube_id(url: str) -> Optional[str]:
-        youtube_patterns = [
-            r'(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/)([^&\n?#]+)',
-            r'youtube\.com/shorts/([^&\n?#]+)',
-        ]
-        
-        for pattern in youtube_patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-        return None
+        return True
     
-    @staticmethod
-    def is_valid_youtube_url(url: str) -> bool:
-        return URLValidator.extract_youtube_id(url) is not None
+    def playable_presets(self, presets_data: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """A copy of valid presets_data without presets the player could not play
+        or that repeat an earlier preset's video, and why each was left out."""
+        presets = presets_data["presets"]
+        batch = URLValidator.validate_youtube_urls(preset["url"] for preset in presets)
+        problems = [f"{presets[position]['name']!r}: invalid YouTube URL {url!r}"
+                    for position, url in batch.invalid]
+        problems += [f"{presets[position]['name']!r}: duplicate of an earlier preset"
+                     for position, _ in batch.duplicates]
+        skipped = {position for position, _ in batch.invalid + batch.duplicates}
+        playable = dict(presets_data)
+        playable["presets"] = [preset for position, preset in enumerate(presets) if position not in skipped]
+        return playable, problems
+
+
+# Tried in order; group 1 is the video id
+YOUTUBE_ID_PATTERNS = (
+    re.compile(r'(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/)([^&\n?#]+)'),
+    re.compile(r'youtube\.com/shorts/([^&\n?#]+)'),
+)
+# Distinct URLs remembered by parse_youtube_url(); the UI and watcher reuse a handful
+YOUTUBE_URL_CACHE_SIZE = 256
+
+
+class YouTubeURL(NamedTuple):
+    url: str
+    video_id: Optional[str]
     
-    @staticmethod
-    def build_youtube_embed(url: str, frontend_base: Optional[str] = None) -> Optional[str]:
-        video_id = URLValidator.extract_youtube_id(url)
+    @property
+    def valid(self) -> bool:
+        return self.video_id is not None
+    
+    @property
+    def canonical_url(self) -> Optional[str]:
+        if not self.video_id:
+            return None
+        return f"https://www.youtube.com/watch?v={self.video_id}"
+    
+    def embed_url(self, frontend_base: Optional[str] = None) -> Optional[str]:
+        video_id = self.video_id
         if not video_id:
             return None
 
@@ -70,15 +165,14 @@ class URLValidator:
         else:
             params = "autoplay=1&controls=0&rel=0&mute=1&loop=1&modestbranding=1"
             return f"https://www.youtube.com/embed/{video_id}?{params}&playlist={video_id}"
-
-    @staticmethod
-    def build_youtube_fullpage_url(url: str) -> Optional[str]:
-        """Build a YouTube watch URL with autoplay params for fullpage player.
+    
+    def fullpage_url(self) -> Optional[str]:
+        """YouTube watch URL with autoplay params for the fullpage player.
 
         This is used when embed URLs are blocked (error 153). The fullpage player
         loads the regular YouTube watch page in an iframe with autoplay.
         """
-        video_id = URLValidator.extract_youtube_id(url)
+        video_id = self.video_id
         if not video_id:
             return None
 
@@ -86,13 +180,96 @@ class URLValidator:
         params = "autoplay=1&mute=1&loop=1&playlist=" + video_id
         return f"https://www.youtube.com/watch?v={video_id}&{params}"
 
+
+def _parse_youtube_url(url: Any) -> YouTubeURL:
+    if isinstance(url, str):
+        for pattern in YOUTUBE_ID_PATTERNS:
+            match = pattern.search(url)
+            if match:
+                return YouTubeURL(url, match.group(1))
+    return YouTubeURL(url, None)
+
+
+@lru_cache(maxsize=YOUTUBE_URL_CACHE_SIZE)
+def _parse_cached(url: str) -> YouTubeURL:
+    return _parse_youtube_url(url)
+
+
+def parse_youtube_url(url: Any, cache: bool = True) -> YouTubeURL:
+    """Parse url once; repeated calls with the same URL are cache hits.
+
+    Bulk callers pass ``cache=False`` so one pass over many URLs does not
+    evict the handful that requests keep using.
+    """
+    if not isinstance(url, str) or not cache:
+        return _parse_youtube_url(url)
+    return _parse_cached(url)
+
+
+class URLBatch(NamedTuple):
+    valid: List[YouTubeURL]
+    # (position in the input, value) pairs
+    invalid: List[Tuple[int, Any]]
+    duplicates: List[Tuple[int, Any]]
+
+
+class URLValidator:
+    @staticmethod
+    def extract_youtube_id(url: str) -> Optional[str]:
+        return parse_youtube_url(url).video_id
+    
+    @staticmethod
+    def is_valid_youtube_url(url: str) -> bool:
+        return parse_youtube_url(url).valid
+    
+    @staticmethod
+    def build_youtube_embed(url: str, frontend_base: Optional[str] = None) -> Optional[str]:
+        return parse_youtube_url(url).embed_url(frontend_base)
+
+    @staticmethod
+    def build_youtube_fullpage_url(url: str) -> Optional[str]:
+        """Build a YouTube watch URL with autoplay params for fullpage player."""
+        return parse_youtube_url(url).fullpage_url()
+    
+    @staticmethod
+    def validate_youtube_urls(urls: Iterable[Any], dedupe: bool = True) -> URLBatch:
+        """Validate and normalize a list of URLs (a preset catalog, an import) in one pass.
+
+        Surrounding whitespace is stripped, and with dedupe a later URL for a
+        video already seen is reported as a duplicate. Bypasses the parse
+        cache so a large batch does not evict the URLs requests keep using.
+        """
+        valid, invalid, duplicates = [], [], []
+        seen = set()
+        for position, url in enumerate(urls):
+            parsed = parse_youtube_url(url.strip() if isinstance(url, str) else url, cache=False)
+            if not parsed.valid:
+                invalid.append((position, url))
+            elif dedupe and parsed.video_id in seen:
+                duplicates.append((position, url))
+            else:
+                seen.add(parsed.video_id)
+                valid.append(parsed)
+        return URLBatch(valid, invalid, duplicates)
+
 class FileValidator:
     SUPPORTED_FORMATS = ['.mp4', '.webm', '.mkv', '.avi', '.mov']
+    MIME_TYPES = {
+        '.mp4': 'video/mp4',
+        '.webm': 'video/webm',
+        '.mkv': 'video/x-matroska',
+        '.avi': 'video/x-msvideo',
+        '.mov': 'video/quicktime'
+    }
     
     @staticmethod
     def is_supported_video(filename: str) -> bool:
         return any(filename.lower().endswith(fmt) for fmt in FileValidator.SUPPORTED_FORMATS)
     
+    @staticmethod
+    def mime_type(filename: str) -> str:
+        return FileValidator.MIME_TYPES.get(Path(filename).suffix.lower(), 'video/mp4')
+    
     @staticmethod
     def sanitize_filename(filename: str) -> str:
         safe_chars = re.sub(r'[^a-zA-Z0-9._-]', '_', filename)
@@ -144,7 +321,7 @@ class FavoritesValidator:
         if not validated_name:
             return None
         
-        if not URLValidator.is_valid_youtube_url(url):
+        if not parse_youtube_url(url).valid:
             return None
         
         return {
@@ -180,14 +357,4 @@ class FavoritesValidator:
         """Validate favorite ID format"""
         if not isinstance(favorite_id, str):
             return False
-        return bool(re.match(r'^fav_[a-f0-9]{8}$', favorite_id))
-    
-    @staticmethod
-    def find_duplicate_favorite(favorites: list, url: str = None, filename: str = None) -> Optional[Dict[str, Any]]:
-        """Find if a duplicate favorite already exists"""
-        for fav in favorites:
-            if url and fav.get("source") == "online" and fav.get("url") == url:
-                return fav
-            elif filename and fav.get("source") == "offline" and fav.get("filename") == filename:
-                return fav
-        return None
\ No newline at end of file
+        return bool(re.match(r'^fav_[a-f0-9]{8}$', favorite_id))
\ No newline at end of file
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+"""
+Indexed view of the local videos directory.
+
+The directory is scanned once and kept as a dict keyed by filename. It is
+rescanned only when the directory's own mtime changes (files added,
+removed or renamed), and concurrent callers share a single rescan.
+"""
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+
+try:
+    # Try relative import first (when run as module)
+    from .validators import FileValidator
+except ImportError:
+    # Fall back to direct import (when run as script)
+    from validators import FileValidator
+
+logger = logging.getLogger(__name__)
+
+# A directory modified this recently may still change within the same
+# mtime tick, so a scan taken then is not trusted on the next lookup.
+MTIME_SETTLE_SECONDS = 1.0
+
+
+class Listing(NamedTuple):
+    """One scan's videos, sorted by filename, each paired with its file key.
+
+    Taken in one call so per-video work (metadata, thumbnails) needs no
+    further lookups, and so the keys always match the entries.
+    """
+    revision: int
+    videos: List[Tuple[Dict[str, Any], Tuple[int, int, int]]]
+
+
+class VideoLibrary:
+    def __init__(self, videos_dir):
+        self.videos_dir = Path(videos_dir)
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._file_keys: Dict[str, Tuple[int, int, int]] = {}
+        self._sorted: List[Dict[str, Any]] = []
+        self._listing = Listing(0, [])
+        self._signature: Optional[Tuple[int, int]] = None
+        self._settled = False
+        self._scan_lock = threading.Lock()
+        self._revision = 0
+        self.scan_count = 0
+
+    @property
+    def revision(self) -> int:
+        """Increases every time the set of videos changes."""
+        self._refresh()
+        return self._revision
+
+    def _dir_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.videos_dir)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns)
+
+    def _is_stale(self, signature) -> bool:
+        return not self._settled or signature != self._signature
+
+    def _refresh(self):
+        signature = self._dir_signature()
+        if not self._is_stale(signature):
+            return
+
+        with self._scan_lock:
+            # Another thread may have finished the same rescan while we waited
+            signature = self._dir_signature()
+            if self._is_stale(signature):
+                self._scan(signature)
+
+    def _scan(self, signature):
+        index = {}
+        file_keys = {}
+        if signature is not None:
+            try:
+                with os.scandir(self.videos_dir) as entries:
+                    for entry in entries:
+                        if not FileValidator.is_supported_video(entry.name):
+                            continue
+                        try:
+                            if not entry.is_file():
+                                continue
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        index[entry.name] = {
+                            "filename": entry.name,
+                            "size": st.st_size,
+                            "path": entry.path
+                        }
+                        file_keys[entry.name] = (st.st_ino, st.st_size, st.st_mtime_ns)
+            except OSError as e:
+                logger.warning(f"Could not scan videos directory {self.videos_dir}: {e}")
+
+        self.scan_count += 1
+        self._settled = (signature is None or
+                         time.time() - signature[1] / 1e9 > MTIME_SETTLE_SECONDS)
+        self._signature = signature
+        if file_keys != self._file_keys:
+            self._revision += 1
+        self._index = index
+        self._file_keys = file_keys
+        self._sorted = [index[name] for name in sorted(index)]
+        self._listing = Listing(self._revision, [(video, file_keys[video["filename"]]) for video in self._sorted])
+
+    def videos(self) -> List[Dict[str, Any]]:
+        """All videos sorted by filename. The list is shared; do not modify it."""
+        self._refresh()
+        return self._sorted
+
+    def listing(self) -> Listing:
+        """All videos with their file keys, from a single scan. Shared; do not modify it."""
+        self._refresh()
+        return self._listing
+
+    def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        self._refresh()
+        return self._index.get(filename)
+
+    def file_key(self, filename: str) -> Optional[Tuple[int, int, int]]:
+        """(inode, size, mtime_ns) of a video as of the last scan."""
+        self._refresh()
+        return self._file_keys.get(filename)
+
+    def contains(self, filename: str) -> bool:
+        self._refresh()
+        return filename in self._index
+
+    def invalidate(self):
+        with self._scan_lock:
+            self._signature = None
+            self._settled = False
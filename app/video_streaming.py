@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+"""
+Range-aware video responses for the offline player.
+
+Chromium fetches looping videos as many byte-range requests, so the
+per-file work (path resolution, containment check, MIME type, ETag) is
+done once and cached against the file's identity in the VideoLibrary.
+Open-ended ranges are handed to the WSGI server's ``file_wrapper`` so
+servers that support it (gunicorn, waitress) can use sendfile().
+"""
+
+import os
+import threading
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, Optional, Tuple, NamedTuple
+
+from flask import Response
+from werkzeug.wsgi import FileWrapper
+
+try:
+    # Try relative import first (when run as module)
+    from .validators import FileValidator
+except ImportError:
+    # Fall back to direct import (when run as script)
+    from validators import FileValidator
+
+STREAM_CHUNK_SIZE = 256 * 1024
+
+
+class VideoFileInfo(NamedTuple):
+    file_key: Tuple[int, int, int]
+    path: str
+    mime_type: str
+    size: int
+    etag: str
+    last_modified: str
+
+
+class VideoStreamer:
+    def __init__(self, library):
+        self.library = library
+        self._info: Dict[str, Optional[VideoFileInfo]] = {}
+        self._lock = threading.Lock()
+
+    def file_info(self, filename: str) -> Optional[VideoFileInfo]:
+        """Cached serving details for a video, or None if it is not servable.
+
+        Only names present in the library index are accepted, which rules
+        out path separators and traversal without touching the filesystem.
+        """
+        file_key = self.library.file_key(filename)
+        if file_key is None:
+            return None
+
+        info = self._info.get(filename)
+        if info is not None and info.file_key == file_key:
+            return info
+
+        video = self.library.get(filename)
+        if video is None:
+            return None
+
+        # Symlinks must not lead outside the videos directory
+        resolved = Path(video["path"]).resolve()
+        if not resolved.is_relative_to(self.library.videos_dir.resolve()):
+            return None
+
+        inode, size, mtime_ns = file_key
+        info = VideoFileInfo(
+            file_key=file_key,
+            path=str(resolved),
+            mime_type=FileValidator.mime_type(filename),
+            size=size,
+            etag=f"{inode:x}-{size:x}-{mtime_ns:x}",
+            last_modified=formatdate(mtime_ns / 1e9, usegmt=True)
+        )
+        with self._lock:
+            self._info[filename] = info
+        return info
+
+    @staticmethod
+    def _open_current(info: VideoFileInfo):
+        """Open the file if it is still the version described by info, else None."""
+        try:
+            f = open(info.path, 'rb')
+        except OSError:
+            return None
+        st = os.fstat(f.fileno())
+        if (st.st_ino, st.st_size, st.st_mtime_ns) != info.file_key:
+            f.close()
+            return None
+        return f
+
+    @staticmethod
+    def _if_range_matches(request, info: VideoFileInfo) -> bool:
+        if_range = request.if_range
+        if if_range.etag is not None:
+            return if_range.etag == info.etag
+        if if_range.date is not None:
+            return int(if_range.date.timestamp()) >= int(info.file_key[2] / 1e9)
+        return True
+
+    def response(self, filename: str, request, _retry: bool = True) -> Optional[Response]:
+        """Build the response for a GET/HEAD of filename, or None if not found."""
+        info = self.file_info(filename)
+        if info is None:
+            return None
+
+        headers = {
+            'Accept-Ranges': 'bytes',
+            'ETag': f'"{info.etag}"',
+            'Last-Modified': info.last_modified,
+            'Cache-Control': 'no-cache'
+        }
+
+        if request.if_none_match.contains(info.etag):
+            return Response(status=304, headers=headers)
+
+        start, stop, status = 0, info.size, 200
+        byte_range = request.range
+        if byte_range is not None and len(byte_range.ranges) == 1 and self._if_range_matches(request, info):
+            span = byte_range.range_for_length(info.size)
+            if span is None:
+                headers['Content-Range'] = f"bytes */{info.size}"
+                return Response(status=416, headers=headers)
+            start, stop = span
+            status = 206
+            headers['Content-Range'] = f"bytes {start}-{stop - 1}/{info.size}"
+
+        headers['Content-Length'] = str(stop - start)
+        if request.method == 'HEAD':
+            return Response(status=status, headers=headers, mimetype=info.mime_type)
+
+        f = self._open_current(info)
+        if f is None:
+            # Replaced or rewritten in place since the last directory scan
+            self.library.invalidate()
+            return self.response(filename, request, _retry=False) if _retry else None
+        f.seek(start)
+
+        file_wrapper = request.environ.get('wsgi.file_wrapper')
+        if stop == info.size and file_wrapper is not None and file_wrapper is not FileWrapper:
+            # Reads to EOF, so any server's wrapper is correct; native ones
+            # (gunicorn, waitress) turn this into sendfile().
+            body = file_wrapper(f, STREAM_CHUNK_SIZE)
+        else:
+            body = self._iter_range(f, stop - start)
+
+        response = Response(body, status=status, headers=headers,
+                            mimetype=info.mime_type, direct_passthrough=True)
+        response.call_on_close(f.close)
+        return response
+
+    @staticmethod
+    def _iter_range(f, length: int):
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
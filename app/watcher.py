@@ -3,10 +3,14 @@
 import json
 import os
 import time
+import selectors
 import subprocess
 import signal
 import sys
 import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
 from typing import Dict, Any, Optional
 import requests
@@ -14,10 +18,22 @@ import psutil
 
 try:
     # Try relative import first (when run as module)
-    from .validators import ConfigValidator, URLValidator
+    from .validators import ConfigValidator, parse_youtube_url
+    from .state_journal import JournaledStateCache
+    from .config_service import ConfigService
+    from .cdp import CDPClient, CDPError, DEFAULT_CDP_PORT
+    from .memory_watchdog import ChromiumMemoryWatchdog, RESTART_DUE
+    from .metrics import REGISTRY
+    from . import runtime_status
 except ImportError:
     # Fall back to direct import (when run as script)
-    from validators import ConfigValidator, URLValidator
+    from validators import ConfigValidator, parse_youtube_url
+    from state_journal import JournaledStateCache
+    from config_service import ConfigService
+    from cdp import CDPClient, CDPError, DEFAULT_CDP_PORT
+    from memory_watchdog import ChromiumMemoryWatchdog, RESTART_DUE
+    from metrics import REGISTRY
+    import runtime_status
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,49 +41,264 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# How often state.json is stat()ed when inotify is unavailable
+STATE_POLL_FALLBACK_SECONDS = 1.0
+# Delay before retrying a failed Chromium launch
+LAUNCH_RETRY_SECONDS = 10
+# Extra time a connectivity check waits beyond check_timeout for probe threads
+PROBE_GRACE_SECONDS = 0.5
+# Status codes that count as a successful probe (generate_204 answers 204)
+PROBE_OK_STATUS = (200, 204)
+# Probes run at the fast interval this many times after an online/offline transition
+TRANSITION_FAST_PROBES = 3
+# A launching browser is up once DevTools answers; one that is still running
+# this long after spawning is treated as up even if DevTools never does
+LAUNCH_SETTLE_SECONDS = 2
+# How often a launching browser is checked for a DevTools endpoint
+LAUNCH_POLL_SECONDS = 0.25
+# Minimum gap between metrics snapshots published for the server's /metrics
+METRICS_PUBLISH_SECONDS = 5
+
+# ChromiumManager phases
+PHASE_IDLE = 'idle'
+PHASE_LAUNCHING = 'launching'
+PHASE_READY = 'ready'
+PHASE_AUTOMATING = 'automating'
+PHASE_PLAYING = 'playing'
+PHASE_FAILED = 'failed'
+
+# Starts YouTube playback in fullscreen: (seconds to wait first, xdotool args, description)
+YOUTUBE_AUTOMATION_STEPS = (
+    (5.0, ['mousemove', '--screen', '0', '960', '540', 'click', '1'], "focus player"),
+    (0.5, ['key', 'k'], "play"),
+    (0.5, ['key', 't'], "exit theatre mode"),
+    (5.0, ['key', 'f'], "fullscreen"),
+    (0.5, ['mousemove', '--screen', '0', '0', '0'], "hide cursor"),
+)
+
+# Published to runtime_status as 'watcher_metrics' and served by the server at /metrics
+probe_seconds = REGISTRY.histogram('fireplace_network_probe_duration_seconds',
+                                   'Connectivity probe latency', ['endpoint', 'result'])
+connectivity_check_seconds = REGISTRY.histogram('fireplace_network_check_duration_seconds',
+                                                'Time for a connectivity check across all endpoints')
+network_online = REGISTRY.gauge('fireplace_network_online', '1 if the last connectivity check succeeded')
+chromium_switches = REGISTRY.counter('fireplace_chromium_switches_total',
+                                     'Target changes applied to Chromium', ['method'])
+chromium_start_seconds = REGISTRY.histogram('fireplace_chromium_start_duration_seconds',
+                                            'Time from spawning Chromium until it is up')
+cdp_navigate_seconds = REGISTRY.histogram('fireplace_chromium_cdp_navigate_duration_seconds',
+                                          'Time to navigate the running browser over DevTools')
+chromium_launch_failures = REGISTRY.counter('fireplace_chromium_launch_failures_total',
+                                            'Chromium launches that failed')
+chromium_restarts = REGISTRY.counter('fireplace_chromium_restarts_total',
+                                     'Chromium restarts requested by the memory watchdog', ['reason'])
+chromium_memory_mb = REGISTRY.gauge('fireplace_chromium_memory_mb', 'Latest Chromium memory sample')
+state_switch_seconds = REGISTRY.histogram('fireplace_state_switch_duration_seconds',
+                                          'Time from a state.json write until the new target is up',
+                                          ['method'])
+watcher_cycle_seconds = REGISTRY.histogram('fireplace_watcher_cycle_duration_seconds',
+                                           'Time spent in one watcher cycle')
+
 class NetworkMonitor:
     def __init__(self, config: Dict[str, Any]):
+        self.is_online = None
+        self._last_check = 0
+        self._next_check_at = 0
+        self.last_check_duration = None
+        
+        # Adaptive schedule
+        self._backoff_step = 0
+        self._fast_probes_remaining = 0
+        self._last_transition_at = None
+        
+        self._executor = None
+        self._executor_size = 0
+        self._stats_lock = threading.Lock()
+        self._endpoint_stats = {}
+        self.configure(config)
+    
+    def configure(self, config: Dict[str, Any]):
+        """Apply the network section of a (re)loaded policy."""
         self.config = config.get('network', {})
         self.check_interval = self.config.get('check_interval', 5)
         self.check_timeout = self.config.get('check_timeout', 2)
         self.endpoints = self.config.get('check_endpoints', ['https://8.8.8.8/'])
-        self.is_online = None
-        self._last_check = 0
+        self.exponential_backoff = self.config.get('exponential_backoff', False)
+        self.max_backoff = max(self.check_interval, self.config.get('max_backoff', 60))
+        # Right after a transition the link is often flapping, so look again soon
+        self.fast_interval = max(1.0, self.check_interval / 2)
+        self.current_interval = self.check_interval
+        
+        # Probes that lost the race keep running until their own timeout,
+        # so leave room for one straggling round next to the current one.
+        executor_size = 2 * max(1, len(self.endpoints))
+        if executor_size > self._executor_size:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(max_workers=executor_size,
+                                                thread_name_prefix='probe')
+            self._executor_size = executor_size
+        
+        if self._last_check:
+            # Re-plan the pending check with the new intervals
+            self._backoff_step = 0
+            self._schedule_next(bool(self.is_online), transitioned=False)
+    
+    def seconds_until_next_check(self) -> float:
+        return max(0.0, self._next_check_at - time.time())
+    
+    @property
+    def schedule(self) -> Dict[str, Any]:
+        """Current probe schedule, for logging and diagnostics."""
+        return {
+            "is_online": self.is_online,
+            "interval": self.current_interval,
+            "next_check_in": self.seconds_until_next_check(),
+            "backoff_enabled": self.exponential_backoff,
+            "backoff_step": self._backoff_step,
+            "max_backoff": self.max_backoff,
+            "fast_probes_remaining": self._fast_probes_remaining,
+            "last_transition_at": self._last_transition_at,
+        }
     
-    def check_connectivity(self) -> bool:
-        if time.time() - self._last_check < self.check_interval:
+    def _schedule_next(self, online: bool, transitioned: bool):
+        if transitioned:
+            self._fast_probes_remaining = TRANSITION_FAST_PROBES
+            self._last_transition_at = time.time()
+        if online:
+            self._backoff_step = 0
+        
+        if self._fast_probes_remaining > 0:
+            self._fast_probes_remaining -= 1
+            interval = self.fast_interval
+        elif not online and self.exponential_backoff:
+            interval = min(self.check_interval * (2 ** self._backoff_step), self.max_backoff)
+            self._backoff_step += 1
+        else:
+            interval = self.check_interval
+        
+        self.current_interval = interval
+        self._next_check_at = self._last_check + interval
+    
+    @property
+    def endpoint_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-endpoint success/failure counts and probe latencies."""
+        with self._stats_lock:
+            return {endpoint: dict(stats) for endpoint, stats in self._endpoint_stats.items()}
+    
+    def _record_probe(self, endpoint: str, success: bool, latency: float):
+        with self._stats_lock:
+            stats = self._endpoint_stats.setdefault(endpoint, {
+                "successes": 0,
+                "failures": 0,
+                "last_latency_ms": None,
+                "avg_latency_ms": None
+            })
+            stats["successes" if success else "failures"] += 1
+            probe_seconds.labels(endpoint, "success" if success else "failure").observe(latency)
+            latency_ms = latency * 1000
+            stats["last_latency_ms"] = latency_ms
+            if stats["avg_latency_ms"] is None:
+                stats["avg_latency_ms"] = latency_ms
+            else:
+                stats["avg_latency_ms"] = 0.8 * stats["avg_latency_ms"] + 0.2 * latency_ms
+    
+    def _probe(self, endpoint: str, abandoned: threading.Event) -> bool:
+        if abandoned.is_set():
+            # Another endpoint already answered before this probe started
+            return False
+        
+        started = time.monotonic()
+        try:
+            response = requests.get(
+                endpoint,
+                timeout=self.check_timeout,
+                headers={'User-Agent': 'FireplaceNetworkCheck/1.0'}
+            )
+            success = response.status_code in PROBE_OK_STATUS
+        except (requests.RequestException, Exception) as e:
+            logger.debug(f"Endpoint {endpoint} failed: {e}")
+            success = False
+        
+        self._record_probe(endpoint, success, time.monotonic() - started)
+        return success
+    
+    def _probe_endpoints(self) -> bool:
+        """Probe all endpoints concurrently; True as soon as any one succeeds."""
+        abandoned = threading.Event()
+        pending = {self._executor.submit(self._probe, endpoint, abandoned) for endpoint in self.endpoints}
+        deadline = time.monotonic() + self.check_timeout + PROBE_GRACE_SECONDS
+        online = False
+        
+        while pending and not online:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            online = any(future.result() for future in done)
+        
+        abandoned.set()
+        for future in pending:
+            future.cancel()
+        return online
+    
+    def check_connectivity(self, force: bool = False) -> bool:
+        if not force and time.time() < self._next_check_at:
             return self.is_online
         
-        for endpoint in self.endpoints:
-            try:
-                response = requests.get(
-                    endpoint,
-                    timeout=self.check_timeout,
-                    headers={'User-Agent': 'FireplaceNetworkCheck/1.0'}
-                )
-                if response.status_code == 200:
-                    if self.is_online is False:
-                        logger.info("Network connectivity restored")
-                    self.is_online = True
-                    self._last_check = time.time()
-                    return True
-            except (requests.RequestException, Exception) as e:
-                logger.debug(f"Endpoint {endpoint} failed: {e}")
-                continue
-        
-        if self.is_online is True:
-            logger.warning("Network connectivity lost")
-        self.is_online = False
+        started = time.monotonic()
+        online = self._probe_endpoints()
+        self.last_check_duration = time.monotonic() - started
+        connectivity_check_seconds.observe(self.last_check_duration)
+        network_online.set(1 if online else 0)
+        
+        transitioned = self.is_online is not None and online != self.is_online
+        if transitioned:
+            if online:
+                logger.info("Network connectivity restored")
+            else:
+                logger.warning("Network connectivity lost")
+        
+        self.is_online = online
         self._last_check = time.time()
-        return False
+        self._schedule_next(online, transitioned)
+        if not online and self.current_interval > self.check_interval:
+            logger.debug(f"Offline, next connectivity check in {self.current_interval:.0f}s")
+        return online
+    
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
 class ChromiumManager:
-    def __init__(self):
+    """Runs the kiosk browser as a non-blocking state machine.
+
+    ``launch()`` only spawns the process; ``step()`` advances it through
+    LAUNCHING → READY → (AUTOMATING →) PLAYING and is called from the
+    watcher's loop, which sleeps until ``seconds_until_step()``. Calling
+    ``launch()`` with a new target at any point preempts whatever the
+    previous one was doing, including a YouTube automation in progress.
+
+    When the browser is already up, a new target is loaded in the existing
+    tab over the DevTools protocol; the process is only killed and
+    restarted when that fails.
+    """
+    
+    def __init__(self, cdp_port: int = DEFAULT_CDP_PORT):
+        self.cdp = CDPClient(cdp_port)
+        # "cdp" or "relaunch": how the current target was loaded
+        self.last_switch_method = None
+        self._launched_at = None
         self.process = None
         self.current_target = None
         self.profile_dir = "/opt/fireplace/chromium-profile"
         self.user_data_dir = Path(self.profile_dir)
         self.is_youtube_url = False
+        self.phase = PHASE_IDLE
+        # When the current target finished launching (time.time()), or None
+        self.ready_at = None
+        self._env = None
+        self._next_step_at = None
+        self._automation_step = 0
 
     def get_chromium_flags(self) -> list:
         flags = [
@@ -85,16 +316,45 @@ class ChromiumManager:
             '--no-sandbox',
             '--disable-dev-shm-usage',
             '--disable-web-security',
-            '--disable-default-apps'
+            '--disable-default-apps',
+            f'--remote-debugging-port={self.cdp.port}'
         ]
 
         return flags
     
+    def _display_env(self) -> dict:
+        # Add environment variables for display access
+        env = os.environ.copy()
+        env['DISPLAY'] = ':0'
+        # Try to detect the correct user's home directory
+        # This will work for both 'pi' and 'will' users
+        import pwd
+        try:
+            user_home = pwd.getpwuid(os.getuid()).pw_dir
+            env['XAUTHORITY'] = f'{user_home}/.Xauthority'
+        except:
+            # Fallback to common locations
+            if os.path.exists('/home/will/.Xauthority'):
+                env['XAUTHORITY'] = '/home/will/.Xauthority'
+            elif os.path.exists('/home/pi/.Xauthority'):
+                env['XAUTHORITY'] = '/home/pi/.Xauthority'
+            else:
+                env['XAUTHORITY'] = os.path.expanduser('~/.Xauthority')
+
+        logger.debug(f"Using XAUTHORITY: {env.get('XAUTHORITY')}")
+        return env
+    
     def launch(self, target_url: str) -> bool:
+        """Start Chromium on target_url without waiting for it; see step()."""
         if self.is_running() and self.current_target == target_url:
             logger.debug(f"Chromium already running with target: {target_url}")
             return True
         
+        if self._navigate(target_url):
+            return True
+        
+        if self.phase == PHASE_AUTOMATING:
+            logger.info("Abandoning YouTube automation for new target")
         self.stop()
         
         flags = self.get_chromium_flags()
@@ -102,62 +362,105 @@ class ChromiumManager:
         
         try:
             logger.info(f"Launching Chromium with target: {target_url}")
-
-            # Add environment variables for display access
-            env = os.environ.copy()
-            env['DISPLAY'] = ':0'
-            # Try to detect the correct user's home directory
-            # This will work for both 'pi' and 'will' users
-            import pwd
-            try:
-                user_home = pwd.getpwuid(os.getuid()).pw_dir
-                env['XAUTHORITY'] = f'{user_home}/.Xauthority'
-            except:
-                # Fallback to common locations
-                if os.path.exists('/home/will/.Xauthority'):
-                    env['XAUTHORITY'] = '/home/will/.Xauthority'
-                elif os.path.exists('/home/pi/.Xauthority'):
-                    env['XAUTHORITY'] = '/home/pi/.Xauthority'
-                else:
-                    env['XAUTHORITY'] = os.path.expanduser('~/.Xauthority')
-
-            logger.debug(f"Using XAUTHORITY: {env.get('XAUTHORITY')}")
-
+            self._env = self._display_env()
+            # Chromium runs for days; unread pipes would fill and block it.
+            # Its stderr goes to the watcher's own, which is the journal.
             self.process = subprocess.Popen(
                 flags,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                env=env,
-                preexec_fn=os.setsid if hasattr(os, 'setsid') else None
+                stdout=subprocess.DEVNULL,
+                env=self._env,
+                # Own process group for killpg(); preexec_fn is unsafe with the probe threads running
+                start_new_session=True
             )
-            self.current_target = target_url
-            self.is_youtube_url = 'youtube.com' in target_url
-            time.sleep(2)  # Give Chromium time to start
-
-            if self.is_running():
-                logger.info(f"Chromium started successfully (PID: {self.process.pid})")
-
-                # If YouTube, automate play and fullscreen using xdotool
-                if self.is_youtube_url:
-                    self._automate_youtube_playback(env)
-
-                return True
-            else:
-                # Try to capture any error output
-                try:
-                    stdout, stderr = self.process.communicate(timeout=0.5)
-                    if stderr:
-                        logger.error(f"Chromium failed to start. Stderr: {stderr.decode()[:500]}")
-                    if stdout:
-                        logger.debug(f"Chromium stdout: {stdout.decode()[:500]}")
-                except:
-                    pass
-                logger.error("Chromium failed to start")
-                return False
-                
         except Exception as e:
             logger.error(f"Failed to launch Chromium: {e}")
+            self._set_phase(PHASE_FAILED)
             return False
+        
+        self.current_target = target_url
+        self.is_youtube_url = 'youtube.com' in target_url
+        self.last_switch_method = 'relaunch'
+        chromium_switches.labels('relaunch').inc()
+        self.ready_at = None
+        self._launched_at = time.time()
+        self._set_phase(PHASE_LAUNCHING, delay=LAUNCH_POLL_SECONDS)
+        return True
+    
+    def _navigate(self, target_url: str) -> bool:
+        """Load target_url in the running browser over CDP; False if a relaunch is needed."""
+        if not self.is_running() or self.phase not in (PHASE_READY, PHASE_AUTOMATING, PHASE_PLAYING):
+            return False
+        
+        started = time.time()
+        try:
+            self.cdp.navigate(target_url)
+        except CDPError as e:
+            logger.warning(f"CDP navigation failed, relaunching Chromium: {e}")
+            return False
+        
+        if self.phase == PHASE_AUTOMATING:
+            logger.info("Abandoning YouTube automation for new target")
+        self.current_target = target_url
+        self.is_youtube_url = 'youtube.com' in target_url
+        self.last_switch_method = 'cdp'
+        self.ready_at = time.time()
+        chromium_switches.labels('cdp').inc()
+        cdp_navigate_seconds.observe(self.ready_at - started)
+        self._set_phase(PHASE_READY, delay=0)
+        logger.info(f"Navigated to {target_url} over CDP in {(self.ready_at - started) * 1000:.0f} ms")
+        return True
+    
+    def _set_phase(self, phase: str, delay: Optional[float] = None):
+        self.phase = phase
+        self._next_step_at = time.time() + delay if delay is not None else None
+    
+    def seconds_until_step(self) -> Optional[float]:
+        """Seconds until step() has work to do, or None while nothing is pending."""
+        if self._next_step_at is None:
+            return None
+        return max(0.0, self._next_step_at - time.time())
+    
+    def step(self) -> str:
+        """Advance the launch/automation sequence as far as it is due; returns the phase."""
+        while self._next_step_at is not None and time.time() >= self._next_step_at:
+            if self.phase == PHASE_LAUNCHING:
+                self._check_launch()
+            elif self.phase == PHASE_READY:
+                if self.is_youtube_url:
+                    # Wait for the YouTube page to load before automating it
+                    logger.info("Waiting for YouTube to load before automation...")
+                    self._automation_step = 0
+                    self._set_phase(PHASE_AUTOMATING, delay=YOUTUBE_AUTOMATION_STEPS[0][0])
+                else:
+                    self._set_phase(PHASE_PLAYING)
+            elif self.phase == PHASE_AUTOMATING:
+                self._run_automation_step()
+            else:
+                self._next_step_at = None
+        return self.phase
+    
+    def _check_launch(self):
+        if self.is_running():
+            if self.cdp.version(timeout=LAUNCH_POLL_SECONDS) is not None:
+                logger.info(f"Chromium started successfully (PID: {self.process.pid})")
+            elif time.time() - self._launched_at >= LAUNCH_SETTLE_SECONDS:
+                logger.info(f"Chromium started (PID: {self.process.pid}), DevTools not answering yet")
+            else:
+                self._set_phase(PHASE_LAUNCHING, delay=LAUNCH_POLL_SECONDS)
+                return
+            self.ready_at = time.time()
+            chromium_start_seconds.observe(self.ready_at - self._launched_at)
+            self._set_phase(PHASE_READY, delay=0)
+            return
+        
+        logger.error(f"Chromium failed to start (exit code {self.process.poll()}); "
+                     f"its error output is in the watcher's log")
+        self._set_phase(PHASE_FAILED)
+    
+    @property
+    def pid(self) -> Optional[int]:
+        """PID of the running browser's root process, or None."""
+        return self.process.pid if self.is_running() else None
     
     def is_running(self) -> bool:
         if self.process is None:
@@ -187,123 +490,99 @@ class ChromiumManager:
                     else:
                         self.process.kill()
                 
-                self.process = None
-                self.current_target = None
                 logger.info("Chromium stopped")
                 
             except Exception as e:
                 logger.error(f"Error stopping Chromium: {e}")
+        
+        self.process = None
+        self.current_target = None
+        self.ready_at = None
+        self._set_phase(PHASE_IDLE)
     
     def restart(self):
         target = self.current_target
         self.stop()
         if target:
-            time.sleep(1)
             return self.launch(target)
         return False
 
-    def _automate_youtube_playback(self, env: dict):
-        """Use xdotool to automate YouTube play and fullscreen."""
+    def _run_automation_step(self):
+        """Run the next xdotool action to start YouTube playback in fullscreen."""
+        _, args, description = YOUTUBE_AUTOMATION_STEPS[self._automation_step]
         try:
-            # Wait for YouTube page to fully load
-            logger.info("Waiting for YouTube to load before automation...")
-            time.sleep(5)
-
-            # Click in the center of the screen to focus the video player
-            # Then press 'k' to play and 'f' for fullscreen
-            xdotool_env = env.copy()
-
-            # First, click to dismiss any popups and focus the player
-            subprocess.run(
-                ['xdotool', 'mousemove', '--screen', '0', '960', '540', 'click', '1'],
-                env=xdotool_env,
-                timeout=5
-            )
-            time.sleep(0.5)
-
-            # Press 'k' to play/pause (starts playback)
-            subprocess.run(
-                ['xdotool', 'key', 'k'],
-                env=xdotool_env,
-                timeout=5
-            )
-            time.sleep(0.5)
-
-            # Press 't' to exit theatre mode
-            subprocess.run(
-                ['xdotool', 'key', 't'],
-                env=xdotool_env,
-                timeout=5
-            )
-            time.sleep(5)
-
-            # Press 'f' to enter fullscreen
-            subprocess.run(
-                ['xdotool', 'key', 'f'],
-                env=xdotool_env,
-                timeout=5
-            )
-            time.sleep(0.5)
-
-            # Move mouse to corner to hide it
-            subprocess.run(
-                ['xdotool', 'mousemove', '--screen', '0', '0', '0'],
-                env=xdotool_env,
-                timeout=5
-            )
-
-            logger.info("YouTube automation completed (play + fullscreen)")
-
+            subprocess.run(['xdotool'] + args, env=self._env, timeout=5)
         except subprocess.TimeoutExpired:
-            logger.warning("xdotool command timed out")
+            logger.warning(f"xdotool timed out ({description})")
         except FileNotFoundError:
             logger.error("xdotool not installed - run: sudo apt install xdotool")
+            self._set_phase(PHASE_PLAYING)
+            return
         except Exception as e:
             logger.error(f"YouTube automation failed: {e}")
+            self._set_phase(PHASE_PLAYING)
+            return
+        
+        self._automation_step += 1
+        if self._automation_step < len(YOUTUBE_AUTOMATION_STEPS):
+            self._set_phase(PHASE_AUTOMATING, delay=YOUTUBE_AUTOMATION_STEPS[self._automation_step][0])
+        else:
+            logger.info("YouTube automation completed (play + fullscreen)")
+            self._set_phase(PHASE_PLAYING)
 
 class FireplaceWatcher:
     def __init__(self):
         self.state_file = "/opt/fireplace/state.json"
-        self.policy_file = "/opt/fireplace/config/policy.json"
         self.offline_url = "http://localhost:8080/offline"
         self.youtube_url = "http://localhost:8080/youtube"
         
         # Development paths
         if not Path(self.state_file).exists():
             self.state_file = Path(__file__).parent.parent / "config" / "state_default.json"
-        if not Path(self.policy_file).exists():
-            self.policy_file = Path(__file__).parent.parent / "config" / "policy.json"
         
         self.validator = ConfigValidator()
+        # state.json plus the server's state journal, if it keeps one
+        self.state_cache = JournaledStateCache(self.state_file,
+                                               validate=self.validator.validate_state,
+                                               default_factory=self._default_state)
+        self.config_service = ConfigService(validator=self.validator)
         self.load_config()
         
         self.network_monitor = NetworkMonitor(self.config)
+        self.config_service.subscribe_policy(self.apply_policy)
         self.chromium_manager = ChromiumManager()
+        self.memory_watchdog = ChromiumMemoryWatchdog(self._memory_limit_mb(self.config))
         
         self.current_state = {}
+        self._state_revision = 0
         self.running = False
+        self._launch_retry_at = 0
+        # reacted_at of a state-driven launch that has not finished yet
+        self._pending_switch = None
+        self._wakeup_r = None
+        self._wakeup_w = None
+        
+        # Recent state-write → target-switch timings, newest last
+        self.switch_latencies = deque(maxlen=50)
+        self._metrics_published_at = 0
         
     def load_config(self):
-        try:
-            with open(self.policy_file, 'r') as f:
-                self.config = json.load(f)
-            logger.info("Configuration loaded")
-        except Exception as e:
-            logger.error(f"Failed to load configuration: {e}")
-            self.config = {"network": {"check_interval": 5, "check_timeout": 2, "check_endpoints": ["https://8.8.8.8/"]}}
+        self.config = self.config_service.policy()
+        logger.info("Configuration loaded")
+    
+    def apply_policy(self, policy: Dict[str, Any]):
+        """Called by the config service when policy.json has been edited."""
+        self.config = policy
+        self.network_monitor.configure(policy)
+        self.memory_watchdog.configure(self._memory_limit_mb(policy))
+        logger.info(f"Policy reloaded, checking connectivity every {self.network_monitor.check_interval}s")
+    
+    @staticmethod
+    def _memory_limit_mb(policy: Dict[str, Any]) -> int:
+        return policy.get('system', {}).get('max_chromium_memory_mb', 1024)
     
     def load_state(self) -> Dict[str, Any]:
-        try:
-            with open(self.state_file, 'r') as f:
-                state = json.load(f)
-                if self.validator.validate_state(state):
-                    return state
-                else:
-                    logger.warning("State validation failed, using defaults")
-                    return self._default_state()
-        except Exception as e:
-            logger.warning(f"Failed to load state: {e}")
-            return self._default_state()
+        return self.state_cache.get()
     
     def _default_state(self) -> Dict[str, Any]:
         return {
@@ -318,7 +597,7 @@ class FireplaceWatcher:
 
         if mode == 'online' and state.get('last_online_url'):
             # Load YouTube directly (not in iframe) to bypass embed restrictions
-            youtube_url = URLValidator.build_youtube_fullpage_url(state['last_online_url'])
+            youtube_url = parse_youtube_url(state["last_online_url"]).fullpage_url()
             if youtube_url:
                 return youtube_url
 
@@ -348,7 +627,25 @@ class FireplaceWatcher:
         return False
     
     def run_cycle(self):
+        started = time.perf_counter()
+        try:
+            self._run_cycle()
+        finally:
+            watcher_cycle_seconds.observe(time.perf_counter() - started)
+            self._publish_metrics()
+    
+    def _run_cycle(self):
+        # Picks up policy.json edits; subscribers run from here
+        self.config_service.policy()
+        
+        # Advance any launch or YouTube automation that is due
+        if self.chromium_manager.step() == PHASE_FAILED:
+            self._launch_failed()
+        self._check_switch_completed()
+        self._check_memory()
+        
         state = self.load_state()
+        state_changed = self.state_cache.revision != self._state_revision
         is_online = self.network_monitor.check_connectivity()
         
         # Determine target URL based on current conditions
@@ -369,17 +666,127 @@ class FireplaceWatcher:
         
         # Check if Chromium is running with the correct target
         if not self.chromium_manager.is_running() or self.chromium_manager.current_target != target_url:
+            if time.time() < self._launch_retry_at:
+                return
+            self._launch_retry_at = 0
+            
             logger.info(f"Starting/restarting Chromium with target: {target_url}")
-            success = self.chromium_manager.launch(target_url)
-            if not success:
-                logger.error("Failed to launch Chromium, retrying in 10 seconds")
-                time.sleep(10)
+            reacted_at = time.time()
+            if self.memory_watchdog.restart_requested and self.chromium_manager.is_running():
+                # The screen changes anyway, so a fresh browser costs nothing visible
+                logger.info("Restarting Chromium at target change to reclaim memory")
+                self.memory_watchdog.record_restart("transition", target_url)
+                chromium_restarts.labels("transition").inc()
+                self.chromium_manager.stop()
+                self._publish_memory_status()
+            if not self.chromium_manager.launch(target_url):
+                self._launch_failed()
                 return
+            
+            # Completed once the new target is up, possibly several cycles later
+            self._pending_switch = reacted_at if state_changed else None
+            self._check_switch_completed()
         
         # Check if state changed significantly
-        if state != self.current_state:
+        if state_changed:
             logger.info("State changed, updating current state")
             self.current_state = state.copy()
+            self._state_revision = self.state_cache.revision
+    
+    def _check_memory(self):
+        if self.chromium_manager.phase != PHASE_PLAYING:
+            return
+        verdict = self.memory_watchdog.sample(self.chromium_manager.pid)
+        if verdict is None:
+            return
+        if self.memory_watchdog.history:
+            chromium_memory_mb.set(self.memory_watchdog.history[-1]["mb"])
+        if verdict == RESTART_DUE:
+            target = self.chromium_manager.current_target
+            self.memory_watchdog.record_restart("memory_limit", target)
+            chromium_restarts.labels("memory_limit").inc()
+            self.chromium_manager.restart()
+        self._publish_memory_status()
+    
+    def _publish_memory_status(self):
+        runtime_status.publish('chromium_memory', self.memory_watchdog.status())
+    
+    def _publish_metrics(self, force: bool = False):
+        now = time.time()
+        if not force and now - self._metrics_published_at < METRICS_PUBLISH_SECONDS:
+            return
+        self._metrics_published_at = now
+        runtime_status.publish('watcher_metrics', {"metrics": REGISTRY.snapshot()})
+    
+    def _launch_failed(self):
+        chromium_launch_failures.inc()
+        logger.error(f"Failed to launch Chromium, retrying in {LAUNCH_RETRY_SECONDS} seconds")
+        self._launch_retry_at = time.time() + LAUNCH_RETRY_SECONDS
+        self._pending_switch = None
+        self.chromium_manager.stop()
+    
+    def _check_switch_completed(self):
+        if self._pending_switch is not None and self.chromium_manager.ready_at is not None:
+            self._record_switch_latency(self._pending_switch, self.chromium_manager.ready_at)
+            self._pending_switch = None
+    
+    def _record_switch_latency(self, reacted_at: float, switched_at: float):
+        written_at = self.state_cache.mtime
+        if written_at is None:
+            return
+        
+        sample = {
+            "reaction_ms": max(0.0, (reacted_at - written_at) * 1000),
+            "switch_ms": max(0.0, (switched_at - written_at) * 1000),
+            "target": self.chromium_manager.current_target,
+            "method": self.chromium_manager.last_switch_method,
+        }
+        self.switch_latencies.append(sample)
+        state_switch_seconds.labels(sample["method"]).observe(sample["switch_ms"] / 1000)
+        logger.info(f"State change applied: write→reaction {sample['reaction_ms']:.0f} ms, "
+                    f"write→target switch {sample['switch_ms']:.0f} ms ({sample['method']})")
+    
+    def next_wakeup_timeout(self, state_fd_available: bool) -> float:
+        """Seconds until the loop must run a cycle even without a state change.
+        
+        Bounded by the next network probe, a pending launch retry, the next
+        launch/automation step, the next memory sample, and the Chromium
+        liveness check (check_interval).
+        """
+        timeout = min(self.network_monitor.seconds_until_next_check(),
+                      self.network_monitor.check_interval)
+        chromium_step = self.chromium_manager.seconds_until_step()
+        if chromium_step is not None:
+            timeout = min(timeout, chromium_step)
+        if self.chromium_manager.is_running():
+            timeout = min(timeout, self.memory_watchdog.seconds_until_sample())
+        if self._launch_retry_at > time.time():
+            timeout = min(timeout, self._launch_retry_at - time.time())
+        if not state_fd_available:
+            timeout = min(timeout, STATE_POLL_FALLBACK_SECONDS)
+        return timeout
+    
+    def _open_wakeup_pipe(self):
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+    
+    def _close_wakeup_pipe(self):
+        for fd in (self._wakeup_r, self._wakeup_w):
+            if fd is not None:
+                os.close(fd)
+        self._wakeup_r = self._wakeup_w = None
+    
+    def wait_for_event(self, selector: selectors.BaseSelector, state_fd_available: bool):
+        """Block until state.json or policy.json changes, a timer is due, or shutdown is requested."""
+        for key, _ in selector.select(self.next_wakeup_timeout(state_fd_available)):
+            if key.data == 'shutdown':
+                try:
+                    while os.read(self._wakeup_r, 512):
+                        pass
+                except BlockingIOError:
+                    pass
+            # State and policy events are drained by their caches on the next read
     
     def run(self):
         self.running = True
@@ -387,29 +794,54 @@ class FireplaceWatcher:
         
         # Initial launch
         state = self.load_state()
+        self._state_revision = self.state_cache.revision
+        self.current_state = state.copy()
         target_url = self.get_target_url(state)
         self.chromium_manager.launch(target_url)
         
+        selector = selectors.DefaultSelector()
+        self._open_wakeup_pipe()
+        selector.register(self._wakeup_r, selectors.EVENT_READ, 'shutdown')
+        state_fd = self.state_cache.fileno()
+        if state_fd is not None:
+            selector.register(state_fd, selectors.EVENT_READ, 'state')
+        else:
+            logger.info(f"inotify unavailable, checking state every {STATE_POLL_FALLBACK_SECONDS}s")
+        policy_fd = self.config_service.policy_file.fileno()
+        if policy_fd is not None:
+            selector.register(policy_fd, selectors.EVENT_READ, 'policy')
+        
         try:
             while self.running:
                 self.run_cycle()
-                time.sleep(self.config.get('network', {}).get('check_interval', 5))
+                if self.running:
+                    self.wait_for_event(selector, state_fd is not None)
                 
         except KeyboardInterrupt:
             logger.info("Shutting down watcher...")
         except Exception as e:
             logger.error(f"Watcher error: {e}")
         finally:
+            selector.close()
+            self._close_wakeup_pipe()
             self.cleanup()
     
     def cleanup(self):
         logger.info("Cleaning up...")
         self.chromium_manager.stop()
+        self.network_monitor.close()
+        self.state_cache.close()
+        self.config_service.close()
         self.running = False
     
     def signal_handler(self, signum, frame):
         logger.info(f"Received signal {signum}")
         self.running = False
+        if self._wakeup_w is not None:
+            try:
+                os.write(self._wakeup_w, b'\0')
+            except OSError:
+                pass
 
 def main():
     watcher = FireplaceWatcher()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+"""
+Control API round trips through the Flask test client.
+
+Drives app/server.py in-process against a scratch state file and video
+directory: state and volume reads/writes, the favorites endpoints, and
+64 KiB range reads from /videos. Reports per-request latency percentiles,
+so the numbers exclude the network and the WSGI server. Finally times one
+NDJSON import of --imports favorites and exports of the result.
+
+Usage: python benchmarks/bench_api.py [--requests N] [--favorites N] [--imports N]
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import server
+from video_library import VideoLibrary
+from video_streaming import VideoStreamer
+
+from bench_validators import make_state
+
+VIDEO_SIZE = 16 * 1024 * 1024
+RANGE_BYTES = 64 * 1024
+
+
+def summarize(samples: list) -> dict:
+    """Latency percentiles (µs) and throughput of per-request timings in seconds."""
+    samples = sorted(samples)
+    total = sum(samples)
+    return {
+        "p50_us": samples[len(samples) // 2] * 1e6,
+        "p95_us": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1e6,
+        "mean_us": total / len(samples) * 1e6,
+        "req_per_sec": len(samples) / total,
+    }
+
+
+def latency(func, count: int) -> dict:
+    """summarize() over count calls to func(i), after one warm-up call."""
+    func(0)
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def prepare(root: Path, favorites: int, requests: int):
+    """Point the server module at a scratch state file and video directory."""
+    videos_dir = root / "videos"
+    videos_dir.mkdir()
+    with open(videos_dir / "fire.mp4", 'wb') as f:
+        f.truncate(VIDEO_SIZE)
+    for i in range(0, favorites, 2):
+        (videos_dir / f"fire_{i}.mp4").touch()
+    for i in range(requests + 1):
+        (videos_dir / f"extra_{i:05d}.mp4").touch()
+    past = time.time() - 10
+    os.utime(videos_dir, (past, past))
+
+    state = make_state(favorites)
+    state["selected_offline"] = "fire.mp4"
+    favorite_list = state.pop("user_favorites")
+    state_file = root / "state.json"
+    state_file.write_text(json.dumps(state))
+
+    server.STATE_FILE = str(state_file)
+    server.state_manager = server.StateManager()
+    server.favorites = server.FavoritesStore(root / "favorites.ndjson",
+                                             validate=server.validator.validate_favorite)
+    server.favorites.add_many(favorite_list)
+    server.video_library = VideoLibrary(videos_dir)
+    server.video_streamer = VideoStreamer(server.video_library)
+    server.page_cache = server.PageCache()
+    return favorite_list
+
+
+def run(requests: int = 300, favorites: int = 100, imports: int = 5000) -> dict:
+    # Request logging would dominate the in-process numbers
+    logging.disable(logging.INFO)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            favorite_list = prepare(Path(tmp), favorites, requests)
+            client = server.app.test_client()
+            offline_ids = [f["id"] for f in favorite_list if f["source"] == "offline"]
+            rng = random.Random(42)
+            offsets = [rng.randrange(0, VIDEO_SIZE - RANGE_BYTES) for _ in range(requests + 1)]
+            added = []
+
+            def add_favorite(i):
+                client.post('/api/offline-video', json={"filename": f"extra_{i:05d}.mp4"})
+                start = time.perf_counter()
+                response = client.post('/api/favorites/add', json={"name": f"Bench {i}"})
+                add_favorite.elapsed.append(time.perf_counter() - start)
+                added.append(response.get_json()["favorite"]["id"])
+            add_favorite.elapsed = []
+
+            def read_range(i):
+                offset = offsets[i]
+                response = client.get('/videos/fire.mp4',
+                                      headers={"Range": f"bytes={offset}-{offset + RANGE_BYTES - 1}"})
+                assert response.status_code == 206
+
+            results = {
+                "get_state": latency(lambda i: client.get('/api/state'), requests),
+                "get_volume": latency(lambda i: client.get('/api/volume'), requests),
+                "post_volume": latency(
+                    lambda i: client.post('/api/volume', json={"volume": i % 100}), requests),
+                "get_favorites": latency(lambda i: client.get('/api/favorites'), requests),
+                "select_favorite": latency(
+                    lambda i: client.post('/api/favorites/select',
+                                          json={"id": offline_ids[i % len(offline_ids)]}),
+                    requests) if offline_ids else None,
+                "video_range_64k": latency(read_range, requests),
+            }
+
+            # Adds need a fresh selection each time, which is not part of the timing
+            for i in range(requests):
+                add_favorite(i)
+            results["add_favorite"] = summarize(add_favorite.elapsed)
+            results["remove_favorite"] = latency(
+                lambda i: client.delete('/api/favorites/remove', json={"id": added.pop()}),
+                requests - 1)
+
+            body = "".join(json.dumps({"name": f"Imported {i}", "url": f"https://youtu.be/imp{i:08d}"}) + "\n"
+                           for i in range(imports)).encode()
+            start = time.perf_counter()
+            response = client.post('/api/favorites/import', data=body)
+            elapsed = time.perf_counter() - start
+            assert response.get_json()["imported"] == imports
+            results["import_favorites"] = {"elapsed_ms": elapsed * 1000, "records_per_sec": imports / elapsed}
+            results["export_favorites"] = latency(
+                lambda i: client.get('/api/favorites/export').get_data(), 10)
+            return {name: numbers for name, numbers in results.items() if numbers is not None}
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--favorites', type=int, default=100)
+    parser.add_argument('--imports', type=int, default=5000)
+    args = parser.parse_args()
+
+    results = run(args.requests, args.favorites, args.imports)
+    imported = results.pop("import_favorites")
+    print(f"{'request':18s} {'p50 µs':>10s} {'p95 µs':>10s} {'req/s':>10s}")
+    for name, numbers in results.items():
+        print(f"{name:18s} {numbers['p50_us']:10.0f} {numbers['p95_us']:10.0f} {numbers['req_per_sec']:10.0f}")
+    print(f"import_favorites   {imported['elapsed_ms']:.0f} ms, {imported['records_per_sec']:.0f} records/s")
+
+
+if __name__ == '__main__':
+    main()
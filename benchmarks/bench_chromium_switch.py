@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+"""
+Target-switch latency: CDP navigation vs killing and relaunching Chromium.
+
+Uses tests/fake_cdp.py as the browser, so the relaunch figure is a lower
+bound (process start until DevTools answers); a real Chromium cold start
+on a Pi adds several seconds of black screen on top.
+
+Usage: python benchmarks/bench_chromium_switch.py [--switches N]
+"""
+
+import argparse
+import socket
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import watcher
+
+FAKE_BROWSER = Path(__file__).parent.parent / "tests" / "fake_cdp.py"
+TARGETS = ("http://localhost:8080/offline", "http://localhost:8080/youtube")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(manager: watcher.ChromiumManager, timeout: float = 10) -> None:
+    deadline = time.time() + timeout
+    while manager.ready_at is None and time.time() < deadline:
+        manager.step()
+        time.sleep(manager.seconds_until_step() or 0.005)
+    if manager.ready_at is None:
+        raise RuntimeError("browser never became ready")
+
+
+def switch(manager: watcher.ChromiumManager, target: str, relaunch: bool) -> float:
+    started = time.time()
+    if relaunch:
+        manager.stop()
+    manager.launch(target)
+    wait_ready(manager)
+    return (manager.ready_at - started) * 1000
+
+
+def run(switches: int = 20) -> dict:
+    port = free_port()
+    manager = watcher.ChromiumManager(cdp_port=port)
+    manager.get_chromium_flags = lambda: [sys.executable, str(FAKE_BROWSER),
+                                          f'--remote-debugging-port={port}']
+    results = {}
+    try:
+        manager.launch(TARGETS[0])
+        wait_ready(manager)
+        for method, relaunch in (("cdp", False), ("relaunch", True)):
+            samples = [switch(manager, TARGETS[(i + 1) % 2], relaunch) for i in range(switches)]
+            results[method] = {
+                "p50_ms": statistics.median(samples),
+                "max_ms": max(samples),
+                "method_used": manager.last_switch_method,
+            }
+    finally:
+        manager.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--switches', type=int, default=20)
+    args = parser.parse_args()
+
+    for method, numbers in run(args.switches).items():
+        print(f"{method:9s} p50 {numbers['p50_ms']:8.1f} ms  max {numbers['max_ms']:8.1f} ms  "
+              f"(loaded via {numbers['method_used']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+"""
+Latency and throughput of the control server: Flask dev server vs gunicorn.
+
+Starts each server on a local port, drives it with concurrent keep-alive
+clients (the way several phones plus the kiosk would) and reports
+requests/s and p50/p95 latency for the API and the control page.
+
+Usage: python benchmarks/bench_serving.py [--clients N] [--requests N]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+APP_DIR = Path(__file__).parent.parent / "app"
+
+PATHS = ["/api/state", "/api/videos", "/"]
+
+# The old fire-web.service command: dev server with the debugger on
+DEV_SERVER = ("import server; "
+              "server.app.run(host='127.0.0.1', port={port}, debug=True, use_reloader=False)")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind: str, port: int, workers: int, threads: int) -> subprocess.Popen:
+    env = dict(os.environ, PYTHONPATH=str(APP_DIR))
+    if kind == "dev":
+        command = [sys.executable, "-c", DEV_SERVER.format(port=port)]
+    else:
+        env.update(FIREPLACE_WEB_BIND=f"127.0.0.1:{port}",
+                   FIREPLACE_WEB_WORKERS=str(workers),
+                   FIREPLACE_WEB_THREADS=str(threads))
+        command = [sys.executable, "-m", "gunicorn", "--config", str(APP_DIR / "gunicorn.conf.py")]
+    process = subprocess.Popen(command, cwd=APP_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/state", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{kind} server did not start")
+
+
+def drive(base_url: str, path: str, clients: int, requests_per_client: int) -> dict:
+    def client(_):
+        latencies = []
+        with requests.Session() as session:
+            for _ in range(requests_per_client):
+                start = time.perf_counter()
+                session.get(base_url + path).raise_for_status()
+                latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = [l for batch in pool.map(client, range(clients)) for l in batch]
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "req_per_sec": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def run(clients: int = 8, requests_per_client: int = 50, workers: int = 1, threads: int = 8) -> dict:
+    results = {}
+    for kind in ("dev", "gunicorn"):
+        port = free_port()
+        process = start_server(kind, port, workers, threads)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            results[kind] = {path: drive(base_url, path, clients, requests_per_client) for path in PATHS}
+        finally:
+            process.terminate()
+            process.wait(timeout=15)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=50, help="requests per client per path")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    results = run(args.clients, args.requests, args.workers, args.threads)
+    for kind, paths in results.items():
+        print(kind)
+        for path, numbers in paths.items():
+            print(f"  {path:12s} {numbers['req_per_sec']:8.0f} req/s  "
+                  f"p50 {numbers['p50_ms']:6.1f} ms  p95 {numbers['p95_ms']:6.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+"""
+StateManager write and read throughput.
+
+Measures full ``save_state`` commits (validate, atomic write with fsync,
+cache prime, event publish), single-field ``update_fields`` commits, and
+cached ``load_state`` reads, for states with a growing favorites list.
+Single-field commits are measured again with the state journal on, as
+latency percentiles and bytes written per change (including any journal
+compactions that ran meanwhile).
+
+Usage: python benchmarks/bench_state_store.py [--favorites N ...] [--changes N]
+"""
+
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import server
+
+from bench_api import summarize
+from bench_validators import make_state, rate
+
+
+def bytes_written() -> int:
+    """Bytes this process has passed to write() so far (Linux), else 0."""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def change_cost(manager, changes: int) -> dict:
+    """Latency and bytes written per single-field commit."""
+    samples = []
+    before = bytes_written()
+    for i in range(changes):
+        start = time.perf_counter()
+        manager.update_fields({"muted": bool(i % 2)})
+        samples.append(time.perf_counter() - start)
+    numbers = summarize(samples)
+    del numbers["mean_us"]
+    numbers["written_per_change_bytes"] = (bytes_written() - before) / changes
+    return numbers
+
+
+def run(favorite_counts=(0, 100, 500), min_seconds: float = 0.5, changes: int = 2000) -> dict:
+    # Every commit logs at INFO; keep the console and the numbers clean
+    logging.disable(logging.INFO)
+    results = {}
+    try:
+        for count in favorite_counts:
+            with tempfile.TemporaryDirectory() as tmp:
+                state = make_state(count)
+                state_file = Path(tmp) / "state.json"
+                state_file.write_text(json.dumps(state))
+                server.STATE_FILE = str(state_file)
+                manager = server.StateManager()
+
+                volumes = iter(range(10 ** 9))
+                results[f"favorites_{count}"] = {
+                    "save_state_per_sec": rate(
+                        lambda: manager.save_state(dict(state, volume=next(volumes) % 100)), min_seconds),
+                    "update_field_per_sec": rate(
+                        lambda: manager.update_fields({"volume": next(volumes) % 100}), min_seconds),
+                    "load_state_per_sec": rate(manager.load_state, min_seconds),
+                    "state_bytes": state_file.stat().st_size,
+                    "update_field": change_cost(manager, changes),
+                }
+                manager.set_journal(True)
+                results[f"favorites_{count}"]["journal_update_field"] = change_cost(manager, changes)
+                manager.set_journal(False)
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--favorites', type=int, nargs='*', default=[0, 100, 500])
+    parser.add_argument('--seconds', type=float, default=0.5)
+    parser.add_argument('--changes', type=int, default=2000)
+    args = parser.parse_args()
+
+    for case, numbers in run(args.favorites, args.seconds, args.changes).items():
+        print(case)
+        for name, value in numbers.items():
+            if isinstance(value, dict):
+                print(f"  {name}")
+                for metric, number in value.items():
+                    print(f"    {metric:24s} {number:10.0f}")
+            else:
+                print(f"  {name:24s} {value:12.0f}")
+
+
+if __name__ == '__main__':
+    main()
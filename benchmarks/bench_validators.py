@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""
+Validation throughput for realistic states.
+
+Compares the old per-call ``jsonschema.validate`` against the precompiled
+``ConfigValidator`` and its partial-update fast path, and the old
+uncompiled YouTube URL matching against the cached parser.
+
+Usage: python benchmarks/bench_validators.py [--favorites N]
+"""
+
+import argparse
+import re
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import jsonschema
+from validators import ConfigValidator, URLValidator, parse_youtube_url
+
+SCHEMA_FILE = Path(__file__).parent.parent / "config" / "schema.json"
+
+
+def make_state(favorite_count: int) -> dict:
+    favorites = []
+    for i in range(favorite_count):
+        fav_id = f"fav_{uuid.uuid4().hex[:8]}"
+        if i % 2:
+            favorites.append({
+                "id": fav_id, "name": f"Online {i}", "type": "favorite",
+                "url": f"https://www.youtube.com/watch?v=vid{i:08d}",
+                "created_date": "2025-08-16T12:00:00Z", "source": "online",
+            })
+        else:
+            favorites.append({
+                "id": fav_id, "name": f"Offline {i}", "type": "favorite",
+                "filename": f"fire_{i}.mp4",
+                "created_date": "2025-08-16T12:00:00Z", "source": "offline",
+            })
+
+    return {
+        "mode": "offline",
+        "last_online_url": "https://www.youtube.com/watch?v=L_LUpnjgPso",
+        "selected_offline": "fireplace.mp4",
+        "volume": 60,
+        "muted": True,
+        "stick_offline_until_manual": False,
+        "playlists": {"default": [f"fire_{i}.mp4" for i in range(0, favorite_count, 2)]},
+        "active_playlist": "default",
+        "show_status_overlay": False,
+        "user_favorites": favorites,
+        "scheduled_shutdown": {"enabled": False, "time": "02:00", "weekdays_only": False},
+        "version": "1.0",
+    }
+
+
+def rate(func, min_seconds: float = 0.5) -> float:
+    """Calls per second of func, measured over at least min_seconds."""
+    func()  # warm-up
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return calls / elapsed
+
+
+def legacy_youtube_id(url: str):
+    """extract_youtube_id() as it was: the pattern strings searched on every call."""
+    patterns = [
+        r'(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/)([^&\n?#]+)',
+        r'youtube\.com/shorts/([^&\n?#]+)',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    return None
+
+
+def run(favorite_counts=(0, 100, 500), min_seconds: float = 0.5) -> dict:
+    validator = ConfigValidator(str(SCHEMA_FILE))
+    state_schema = validator.load_schema()["definitions"]["state"]
+    results = {}
+
+    for count in favorite_counts:
+        state = make_state(count)
+        assert validator.validate_state(state)
+
+        results[f"favorites_{count}"] = {
+            "jsonschema_validate_per_sec": rate(
+                lambda: jsonschema.validate(instance=state, schema=state_schema), min_seconds),
+            "compiled_full_per_sec": rate(lambda: validator.validate_state(state), min_seconds),
+            "partial_volume_per_sec": rate(
+                lambda: validator.validate_state_fields({"volume": 42}), min_seconds),
+        }
+
+    url = "https://www.youtube.com/watch?v=L_LUpnjgPso&t=42"
+    urls = [f"https://youtu.be/vid{i:08d}" for i in range(1000)]
+    results["youtube_urls"] = {
+        # A /api/url request: validate, then build the embed URL
+        "legacy_validate_and_embed_per_sec": rate(
+            lambda: legacy_youtube_id(url) and legacy_youtube_id(url), min_seconds),
+        "cached_validate_and_embed_per_sec": rate(
+            lambda: parse_youtube_url(url).valid and parse_youtube_url(url).embed_url(), min_seconds),
+        "batch_1000_per_sec": rate(lambda: URLValidator.validate_youtube_urls(urls), min_seconds),
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--favorites', type=int, nargs='*', default=[0, 100, 500])
+    parser.add_argument('--seconds', type=float, default=0.5)
+    args = parser.parse_args()
+
+    for case, numbers in run(args.favorites, args.seconds).items():
+        print(case)
+        for name, value in numbers.items():
+            print(f"  {name:32s} {value:12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""
+Video listing and lookup cost for large video directories.
+
+Compares the old per-request directory scan against the cached
+``VideoLibrary`` index for listing and single-file membership checks.
+
+Usage: python benchmarks/bench_video_library.py [--files N ...]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from validators import FileValidator
+from video_library import VideoLibrary
+
+
+def scan_directory(videos_dir: Path) -> list:
+    """The pre-index implementation of get_available_videos()."""
+    if not videos_dir.exists():
+        return []
+
+    videos = []
+    for video_file in videos_dir.iterdir():
+        if video_file.is_file() and FileValidator.is_supported_video(video_file.name):
+            videos.append({
+                "filename": video_file.name,
+                "size": video_file.stat().st_size,
+                "path": str(video_file)
+            })
+
+    return sorted(videos, key=lambda x: x["filename"])
+
+
+def populate(videos_dir: Path, count: int):
+    for i in range(count):
+        (videos_dir / f"fire_{i:05d}.mp4").touch()
+    past = time.time() - 10
+    os.utime(videos_dir, (past, past))
+
+
+def timed(func, repeat: int) -> float:
+    """Mean seconds per call over repeat calls."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(file_counts=(100, 1000, 10000), repeat: int = 20) -> dict:
+    results = {}
+    for count in file_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            videos_dir = Path(tmp)
+            populate(videos_dir, count)
+            target = f"fire_{count - 1:05d}.mp4"
+
+            library = VideoLibrary(videos_dir)
+            cold_start = time.perf_counter()
+            library.videos()
+            cold_scan = time.perf_counter() - cold_start
+
+            results[f"files_{count}"] = {
+                "old_list_ms": timed(lambda: scan_directory(videos_dir), max(1, repeat // 4)) * 1000,
+                "old_contains_ms": timed(
+                    lambda: any(v["filename"] == target for v in scan_directory(videos_dir)),
+                    max(1, repeat // 4)) * 1000,
+                "index_cold_scan_ms": cold_scan * 1000,
+                "index_list_us": timed(library.videos, repeat * 50) * 1e6,
+                "index_contains_us": timed(lambda: library.contains(target), repeat * 50) * 1e6,
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, nargs='*', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    for case, numbers in run(args.files, args.repeat).items():
+        print(case)
+        for name, value in numbers.items():
+            print(f"  {name:24s} {value:12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+"""
+Byte-range request throughput for /videos/<filename>.
+
+Compares the previous ``send_from_directory`` handler (path resolution,
+prefix check and MIME if-chain on every request) with ``VideoStreamer``.
+Each request reads a 64 KiB range, the way Chromium walks a looping video.
+
+Usage: python benchmarks/bench_video_streaming.py [--size-mb N] [--requests N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from flask import Flask, request, send_from_directory
+from validators import FileValidator
+from video_library import VideoLibrary
+from video_streaming import VideoStreamer
+
+RANGE_BYTES = 64 * 1024
+
+
+def legacy_app(videos_dir: Path) -> Flask:
+    """The pre-VideoStreamer serve_video handler."""
+    app = Flask(__name__)
+
+    @app.route('/videos/<path:filename>')
+    def serve_video(filename):
+        if not FileValidator.is_supported_video(filename):
+            return "Invalid video format", 400
+
+        base_dir = Path(videos_dir)
+        if not base_dir.exists():
+            return "Videos directory not found", 500
+
+        video_path = base_dir / filename
+        try:
+            video_path = video_path.resolve()
+            base_dir = base_dir.resolve()
+            if not str(video_path).startswith(str(base_dir)):
+                return "Access denied", 403
+        except Exception:
+            return "Invalid path", 400
+
+        if not video_path.is_file():
+            return "Video not found", 404
+
+        mime_type = 'video/mp4'
+        if filename.lower().endswith('.webm'):
+            mime_type = 'video/webm'
+        elif filename.lower().endswith('.mkv'):
+            mime_type = 'video/x-matroska'
+        elif filename.lower().endswith('.avi'):
+            mime_type = 'video/x-msvideo'
+        elif filename.lower().endswith('.mov'):
+            mime_type = 'video/quicktime'
+
+        return send_from_directory(str(base_dir), filename, mimetype=mime_type)
+
+    return app
+
+
+def streamer_app(videos_dir: Path) -> Flask:
+    app = Flask(__name__)
+    streamer = VideoStreamer(VideoLibrary(videos_dir))
+
+    @app.route('/videos/<path:filename>')
+    def serve_video(filename):
+        if not FileValidator.is_supported_video(filename):
+            return "Invalid video format", 400
+        return streamer.response(filename, request) or ("Video not found", 404)
+
+    return app
+
+
+def measure(app: Flask, size: int, requests: int, open_ended: bool) -> float:
+    """Requests per second for random 64 KiB (or open-ended) range reads."""
+    client = app.test_client()
+    rng = random.Random(42)
+    offsets = [rng.randrange(0, size - RANGE_BYTES) for _ in range(requests)]
+
+    start = time.perf_counter()
+    for offset in offsets:
+        if open_ended:
+            # Read one chunk and drop the connection, as a seeking player does
+            response = client.get('/videos/fire.mp4', headers={"Range": f"bytes={offset}-"},
+                                  buffered=False)
+            next(iter(response.response), None)
+            response.close()
+        else:
+            response = client.get('/videos/fire.mp4',
+                                  headers={"Range": f"bytes={offset}-{offset + RANGE_BYTES - 1}"})
+            assert response.status_code == 206 and len(response.data) == RANGE_BYTES
+    return requests / (time.perf_counter() - start)
+
+
+def run(size_mb: int = 64, requests: int = 500) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        videos_dir = Path(tmp)
+        size = size_mb * 1024 * 1024
+        with open(videos_dir / "fire.mp4", 'wb') as f:
+            f.truncate(size)
+        past = time.time() - 10
+        os.utime(videos_dir, (past, past))
+
+        results = {}
+        for name, app in (("legacy", legacy_app(videos_dir)), ("streamer", streamer_app(videos_dir))):
+            results[name] = {
+                "range_64k_req_per_sec": measure(app, size, requests, open_ended=False),
+                "open_ended_req_per_sec": measure(app, size, requests, open_ended=True),
+            }
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    for handler, numbers in run(args.size_mb, args.requests).items():
+        print(handler)
+        for name, value in numbers.items():
+            print(f"  {name:26s} {value:10.0f}")
+
+
+if __name__ == '__main__':
+    main()
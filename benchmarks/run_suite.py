@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+"""
+Run the benchmark suite and store the results as JSON.
+
+Each benchmark module's run() is called in-process and its numbers are
+written, with the commit, Python version and machine they came from, to
+benchmarks/results/ (or --output). Pass an earlier file as --compare to
+see what changed between releases; metrics that got worse by more than
+--threshold percent are flagged.
+
+Benchmarks that spawn processes (serving, chromium_switch) only run when
+named with --only.
+
+Usage: python benchmarks/run_suite.py [--quick] [--only NAME ...] [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import datetime
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).parent
+RESULTS_DIR = BENCH_DIR / "results"
+
+# name -> (run() keyword arguments for --quick, included by default)
+SUITE = {
+    "api": ({"requests": 50, "imports": 1000}, True),
+    "state_store": ({"min_seconds": 0.1, "changes": 300}, True),
+    "video_library": ({"repeat": 4}, True),
+    "validators": ({"min_seconds": 0.1}, True),
+    "rate_limit": ({"iterations": 500, "rounds": 2}, True),
+    "video_streaming": ({"size_mb": 16, "requests": 100}, True),
+    "serving": ({"requests_per_client": 10}, False),
+    "chromium_switch": ({"switches": 5}, False),
+}
+
+# A metric is better when it goes down if its name ends like this
+LOWER_IS_BETTER = ("_ms", "_us", "_seconds", "_bytes", "_mb")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def environment() -> dict:
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run_suite(names, quick: bool = False) -> dict:
+    sys.path.insert(0, str(BENCH_DIR))
+    report = {"environment": environment(), "quick": quick, "results": {}, "durations_s": {}}
+    for name in names:
+        quick_kwargs, _ = SUITE[name]
+        module = importlib.import_module(f"bench_{name}")
+        print(f"Running {name}...", file=sys.stderr)
+        start = time.perf_counter()
+        report["results"][name] = module.run(**(quick_kwargs if quick else {}))
+        report["durations_s"][name] = round(time.perf_counter() - start, 2)
+    return report
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """{"api": {"get_state": {"p50_us": 1}}} -> {"api.get_state.p50_us": 1}"""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """(metric, baseline, current, percent change, regressed) for metrics in both reports."""
+    old = flatten(baseline["results"])
+    new = flatten(current["results"])
+    rows = []
+    for metric in sorted(old.keys() & new.keys()):
+        before, after = old[metric], new[metric]
+        if not before:
+            continue
+        change = (after - before) / abs(before) * 100
+        worse = change if metric.endswith(LOWER_IS_BETTER) else -change
+        rows.append((metric, before, after, change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help="smaller workloads, for a smoke run")
+    parser.add_argument('--only', nargs='*', choices=sorted(SUITE), help="benchmarks to run")
+    parser.add_argument('--output', type=Path, help="results file (default: benchmarks/results/)")
+    parser.add_argument('--compare', type=Path, help="earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="percent change that counts as a regression")
+    args = parser.parse_args()
+
+    names = args.only or [name for name, (_, default) in SUITE.items() if default]
+    report = run_suite(names, args.quick)
+
+    output = args.output
+    if output is None:
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        output = RESULTS_DIR / f"{stamp}-{report['environment']['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    print(f"Results written to {output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        rows = compare(baseline, report, args.threshold)
+        print(f"\nCompared with {baseline['environment']['commit']} ({baseline['environment']['timestamp']})")
+        for metric, before, after, change, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"  {metric:60s} {before:14.2f} {after:14.2f} {change:+8.1f}%{flag}")
+        regressions = sum(1 for row in rows if row[4])
+        print(f"{regressions} regression(s) beyond {args.threshold:.0f}%")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -23,11 +23,11 @@ fi
 # Install system dependencies
 echo "Installing system dependencies..."
 apt update
-apt install -y python3 python3-pip python3-venv chromium-browser avahi-daemon
+apt install -y python3 python3-pip python3-venv chromium-browser avahi-daemon ffmpeg
 
 # Create directories
 echo "Creating directories..."
-mkdir -p "$FIREPLACE_DIR"/{config,videos,logs,chromium-profile}
+mkdir -p "$FIREPLACE_DIR"/{config,videos,logs,cache,chromium-profile}
 mkdir -p "$LOG_DIR"
 
 # Copy application files
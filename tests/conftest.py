@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+
+import sys
+import shutil
+from pathlib import Path
+
+import pytest
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import runtime_status
+import server
+
+CONFIG_DIR = Path(__file__).parent.parent / "config"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Flask test client backed by a scratch copy of the default state"""
+    state_file = tmp_path / "state.json"
+    shutil.copy(CONFIG_DIR / "state_default.json", state_file)
+    monkeypatch.setattr(server, "STATE_FILE", str(state_file))
+    monkeypatch.setattr(server, "state_manager", server.StateManager())
+    monkeypatch.setattr(server, "favorites", server.FavoritesStore(tmp_path / "favorites.ndjson"))
+    monkeypatch.setattr(server, "page_cache", server.PageCache())
+    monkeypatch.setattr(runtime_status, "RUNTIME_DIR", str(tmp_path / "runtime"))
+    return server.app.test_client()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+"""
+Fake Chrome DevTools endpoint for tests and benchmarks.
+
+Serves /json/version and /json/list for a single page target and answers
+Page.navigate over the target's WebSocket. Run as a script it stands in
+for the browser itself: it accepts Chromium's command line, listens on
+--remote-debugging-port and serves until killed.
+"""
+
+import json
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from cdp import ws_accept_key, ws_recv, ws_send
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request_line = self.rfile.readline().decode('latin-1').strip()
+        if not request_line:
+            return
+        headers = {}
+        while True:
+            line = self.rfile.readline().decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        path = request_line.split()[1]
+        fake = self.server.fake
+        if headers.get('upgrade', '').lower() == 'websocket':
+            self._websocket(fake, headers['sec-websocket-key'])
+        elif path == '/json/version':
+            self._json({"Browser": "FakeChrome/1.0", "Protocol-Version": "1.3"})
+        elif path == '/json/list':
+            self._json([{
+                "id": "page-1",
+                "type": "page",
+                "url": fake.current_url,
+                "webSocketDebuggerUrl": f"ws://127.0.0.1:{fake.port}/devtools/page/page-1"
+            }])
+        else:
+            self.wfile.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+
+    def _json(self, data):
+        body = json.dumps(data).encode()
+        self.wfile.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+
+    def _websocket(self, fake, key):
+        self.wfile.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {ws_accept_key(key)}\r\n\r\n"
+        ).encode())
+        self.wfile.flush()
+        sock = self.connection
+        # Like Chromium, reply frames are not held back by Nagle's algorithm
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            try:
+                opcode, payload = ws_recv(sock)
+            except Exception:
+                return
+            if opcode == 0x8:
+                return
+            message = json.loads(payload)
+            fake.commands.append((message["method"], message.get("params", {})))
+            if message["method"] == "Page.navigate":
+                time.sleep(fake.navigate_delay)
+                if fake.fail_navigation:
+                    reply = {"id": message["id"], "error": {"code": -32000, "message": "Cannot navigate"}}
+                else:
+                    fake.current_url = message["params"]["url"]
+                    # Chromium interleaves events with replies
+                    ws_send(sock, 0x1, json.dumps({"method": "Page.frameStartedLoading",
+                                                   "params": {"frameId": "1"}}).encode(), mask=False)
+                    reply = {"id": message["id"], "result": {"frameId": "1", "loaderId": "1"}}
+            else:
+                reply = {"id": message["id"], "result": {}}
+            ws_send(sock, 0x1, json.dumps(reply).encode(), mask=False)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeCDPServer:
+    def __init__(self, port: int = 0, initial_url: str = "about:blank"):
+        self._server = _Server(('127.0.0.1', port), _Handler)
+        self._server.fake = self
+        self.port = self._server.server_address[1]
+        self.current_url = initial_url
+        self.commands = []
+        self.navigate_delay = 0.0
+        self.fail_navigation = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    """Stand in for chromium-browser: serve DevTools on --remote-debugging-port."""
+    port = 0
+    url = "about:blank"
+    for arg in sys.argv[1:]:
+        if arg.startswith('--remote-debugging-port='):
+            port = int(arg.split('=', 1)[1])
+        elif not arg.startswith('--'):
+            url = arg
+    FakeCDPServer(port, initial_url=url).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+import io
+import json
+import sys
+from pathlib import Path
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import bulk_transfer
+from bulk_transfer import ImportReport, encode_ndjson, iter_ndjson, read_lines
+
+
+def test_read_lines_drops_overlong_lines(monkeypatch):
+    monkeypatch.setattr(bulk_transfer, "READ_CHUNK_BYTES", 4)
+    monkeypatch.setattr(bulk_transfer, "MAX_LINE_BYTES", 8)
+    stream = io.BytesIO(b"one\n" + b"x" * 30 + b"\ntwo\nthree")
+    assert list(read_lines(stream)) == [b"one", None, b"two", b"three"]
+
+
+def test_errors_are_counted_but_only_the_first_are_listed(monkeypatch):
+    monkeypatch.setattr(bulk_transfer, "MAX_REPORTED_ERRORS", 2)
+    report = ImportReport()
+    body = b'{"a": 1}\n[1]\n\nnope\n{"b": 2}\n"x"\n'
+    assert [number for number, _ in iter_ndjson(io.BytesIO(body), report)] == [1, 5]
+    assert report.invalid == 3
+    assert [error["line"] for error in report.errors] == [2, 4]
+
+
+def test_export_is_chunked(monkeypatch):
+    monkeypatch.setattr(bulk_transfer, "EXPORT_CHUNK_RECORDS", 2)
+    chunks = list(encode_ndjson({"n": n} for n in range(5)))
+    assert len(chunks) == 3
+    assert [json.loads(line)["n"] for line in "".join(chunks).splitlines()] == list(range(5))
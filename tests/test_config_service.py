@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import watcher
+from config_service import ConfigService
+
+CONFIG_DIR = Path(__file__).parent.parent / "config"
+
+
+def write_json(path, data):
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    shutil.copy(CONFIG_DIR / "policy.json", tmp_path / "policy.json")
+    shutil.copy(CONFIG_DIR / "presets.json", tmp_path / "presets.json")
+    return tmp_path
+
+
+@pytest.fixture(params=[True, False], ids=["inotify", "stat"])
+def service(config_dir, request):
+    service = ConfigService(config_dir / "policy.json", config_dir / "presets.json",
+                            use_inotify=request.param)
+    yield service
+    service.close()
+
+
+def test_parsed_once_and_reloaded_on_change(service, config_dir):
+    policy = service.policy()
+    assert service.policy() is policy
+    revision = service.revision
+
+    edited = json.loads((config_dir / "policy.json").read_text())
+    edited["network"]["check_interval"] = 30
+    write_json(config_dir / "policy.json", edited)
+
+    assert service.policy()["network"]["check_interval"] == 30
+    assert service.revision != revision
+
+
+def test_invalid_edit_keeps_last_good(service, config_dir):
+    """A policy that fails schema validation is ignored, not replaced by defaults"""
+    policy = service.policy()
+    presets = service.presets()
+    write_json(config_dir / "policy.json", {"network": {"check_interval": "soon"}})
+    assert service.policy() is policy
+
+    (config_dir / "presets.json").write_text("{ not json")
+    assert service.presets() is presets
+
+    write_json(config_dir / "presets.json", {"presets": [{"name": "Only"}]})
+    assert len(service.presets()["presets"]) == 3
+
+
+def test_unplayable_presets_are_skipped_once_per_version(service, config_dir, caplog):
+    write_json(config_dir / "presets.json", {"presets": [
+        {"name": "Fire", "url": "https://youtu.be/abc"},
+        {"name": "Broken", "url": "https://example.com"},
+    ]})
+    presets = service.presets()
+    assert [preset["name"] for preset in presets["presets"]] == ["Fire"]
+    assert service.presets() is presets
+    assert sum("Skipping preset 'Broken'" in r.message for r in caplog.records) == 1
+
+
+def test_subscribers_see_valid_changes_only(service, config_dir):
+    received = []
+    service.subscribe_policy(received.append)
+    service.policy()
+    assert received == []
+
+    write_json(config_dir / "policy.json", {"network": {"check_interval": "soon"}})
+    service.policy()
+    assert received == []
+
+    edited = json.loads((CONFIG_DIR / "policy.json").read_text())
+    edited["network"]["check_endpoints"] = ["https://example.com/"]
+    write_json(config_dir / "policy.json", edited)
+    service.policy()
+    assert [p["network"]["check_endpoints"] for p in received] == [["https://example.com/"]]
+
+
+def test_network_monitor_applies_new_policy():
+    monitor = watcher.NetworkMonitor({"network": {
+        "check_interval": 5, "check_timeout": 1, "check_endpoints": ["https://a.example/"]}})
+    monitor.configure({"network": {
+        "check_interval": 20,
+        "check_timeout": 3,
+        "check_endpoints": ["https://a.example/", "https://b.example/", "https://c.example/"],
+        "exponential_backoff": True,
+        "max_backoff": 120
+    }})
+    assert monitor.check_interval == 20
+    assert monitor.check_timeout == 3
+    assert len(monitor.endpoints) == 3
+    assert monitor.max_backoff == 120
+    assert monitor._executor_size == 6
+    monitor.close()
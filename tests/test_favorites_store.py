@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import favorites_store
+from favorites_store import FavoritesStore
+from validators import ConfigValidator
+
+
+def online(n, url=None):
+    return {"id": f"fav_{n:08x}", "name": f"Online {n}", "type": "favorite", "source": "online",
+            "url": url or f"https://www.youtube.com/watch?v=video{n:05d}",
+            "created_date": "2025-08-16T12:00:00Z"}
+
+
+def offline(n):
+    return {"id": f"fav_{n:08x}", "name": f"Offline {n}", "type": "favorite", "source": "offline",
+            "filename": f"fire_{n}.mp4", "created_date": "2025-08-16T12:00:00Z"}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "favorites.ndjson"
+
+
+def test_lookups_and_stable_order(path):
+    store = FavoritesStore(path, validate=ConfigValidator().validate_favorite)
+    for n in range(6):
+        assert store.add(online(n) if n % 2 else offline(n))
+
+    assert [f["id"] for f in store.all()] == [f"fav_{n:08x}" for n in range(6)]
+    assert store.get("fav_00000003")["name"] == "Online 3"
+    assert store.find(filename="fire_4.mp4")["id"] == "fav_00000004"
+    # Same video under another URL form
+    assert store.find(url="https://youtu.be/video00001")["id"] == "fav_00000001"
+
+    assert store.remove("fav_00000002")["filename"] == "fire_2.mp4"
+    assert store.remove("fav_00000002") is None
+    assert store.find(filename="fire_2.mp4") is None
+    assert [f["id"] for f in store.all()][:3] == ["fav_00000000", "fav_00000001", "fav_00000003"]
+
+
+def test_duplicates_and_invalid_favorites_are_rejected(path):
+    store = FavoritesStore(path, validate=ConfigValidator().validate_favorite)
+    assert store.add(online(1))
+    assert not store.add(online(2, url="https://www.youtube.com/watch?v=video00001&t=30"))
+    assert not store.add(dict(offline(3), name=""))
+    assert len(store) == 1
+
+
+def test_changes_are_appended_and_replayed(path):
+    store = FavoritesStore(path)
+    store.add(offline(1))
+    store.add(offline(2))
+    store.remove("fav_00000001")
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["op"] for r in records] == ["add", "add", "remove"]
+    assert [f["id"] for f in FavoritesStore(path).all()] == ["fav_00000002"]
+
+
+def test_other_processes_changes_are_seen(path):
+    first = FavoritesStore(path)
+    second = FavoritesStore(path)
+    revision = second.revision
+    first.add(offline(1))
+    assert second.revision != revision
+    assert second.get("fav_00000001") is not None
+    assert not second.add(offline(1))
+
+
+def test_torn_record_is_ignored_and_dropped(path):
+    store = FavoritesStore(path)
+    store.add(offline(1))
+    with open(path, 'a') as f:
+        f.write('{"op":"add","favorite":{"id":"fav_')
+
+    reopened = FavoritesStore(path)
+    assert len(reopened) == 1
+    assert reopened.add(offline(2))
+    assert [f["id"] for f in FavoritesStore(path).all()] == ["fav_00000001", "fav_00000002"]
+
+
+def test_log_is_compacted_once_mostly_dead(path, monkeypatch):
+    monkeypatch.setattr(favorites_store, "COMPACT_MIN_DEAD", 4)
+    store = FavoritesStore(path)
+    store.add(offline(0))
+    for n in range(1, 4):
+        store.add(offline(n))
+        store.remove(f"fav_{n:08x}")
+
+    assert len(path.read_text().splitlines()) < 7
+    assert [f["id"] for f in FavoritesStore(path).all()] == ["fav_00000000"]
+    # A store that read the old file follows the compaction
+    assert store.add(offline(9))
+    assert len(FavoritesStore(path)) == 2
+
+
+def test_add_many_is_one_commit(path):
+    store = FavoritesStore(path)
+    added = store.add_many([offline(1), offline(1), online(2)])
+    assert [f["id"] for f in added] == ["fav_00000001", "fav_00000002"]
+    assert len(path.read_text().splitlines()) == 2
+
+
+def test_import_is_one_atomic_replace(path):
+    store = FavoritesStore(path)
+    store.add(online(1))
+    store.remove(online(1)["id"])
+    store.add(offline(2))
+    other = FavoritesStore(path)
+    inode = path.stat().st_ino
+
+    added = store.import_favorites(iter([offline(2), online(3), online(4, url="https://youtu.be/video00003")]))
+    assert added == 1
+    assert path.stat().st_ino != inode
+    # Rewritten as just the live favorites plus the new one
+    assert len(path.read_text().splitlines()) == 2
+    assert [f["id"] for f in other.all()] == ["fav_00000002", "fav_00000003"]
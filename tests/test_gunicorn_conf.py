@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import runpy
+from pathlib import Path
+
+CONF = str(Path(__file__).parent.parent / "app" / "gunicorn.conf.py")
+
+
+def test_defaults(monkeypatch):
+    for name in ("FIREPLACE_WEB_BIND", "FIREPLACE_WEB_WORKERS", "FIREPLACE_WEB_THREADS", "FIREPLACE_WEB_MEMORY_MB",
+                 "FIREPLACE_WEB_SSE_CLIENTS"):
+        monkeypatch.delenv(name, raising=False)
+    conf = runpy.run_path(CONF)
+    assert conf["bind"] == "0.0.0.0:8080"
+    assert conf["worker_class"] == "gthread"
+    assert conf["workers"] == 1
+    assert conf["threads"] == 6 + conf["REQUEST_THREADS"]
+    assert conf["raw_env"] == ["FIREPLACE_WEB_SSE_CLIENTS=6"]
+    assert conf["preload_app"] is False
+    # A single worker is never recycled; its SSE streams would stall the restart
+    assert conf["max_requests"] == 0
+
+
+def test_workers_clamped_to_memory_budget(monkeypatch):
+    """Asking for more workers than fit under MemoryMax is capped"""
+    monkeypatch.setenv("FIREPLACE_WEB_WORKERS", "16")
+    conf = runpy.run_path(CONF)
+    assert conf["workers"] == conf["max_workers_for"](256)
+    assert conf["ARBITER_MEMORY_MB"] + conf["workers"] * conf["WORKER_MEMORY_MB"] <= 256
+
+    assert conf["max_requests"] > 0
+
+    monkeypatch.setenv("FIREPLACE_WEB_MEMORY_MB", "64")
+    assert runpy.run_path(CONF)["workers"] == 1
+
+    monkeypatch.setenv("FIREPLACE_WEB_WORKERS", "bogus")
+    assert runpy.run_path(CONF)["workers"] == 1
+
+
+def test_threads_leave_room_beside_sse_streams(monkeypatch):
+    """Open SSE streams can never hold every thread"""
+    monkeypatch.delenv("FIREPLACE_WEB_THREADS", raising=False)
+    monkeypatch.setenv("FIREPLACE_WEB_SSE_CLIENTS", "12")
+    conf = runpy.run_path(CONF)
+    assert conf["threads"] == 12 + conf["REQUEST_THREADS"]
+
+    monkeypatch.setenv("FIREPLACE_WEB_THREADS", "6")
+    conf = runpy.run_path(CONF)
+    assert conf["threads"] == 6
+    assert conf["raw_env"] == [f"FIREPLACE_WEB_SSE_CLIENTS={6 - conf['REQUEST_THREADS']}"]
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+import subprocess
+import sys
+from pathlib import Path
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import low_priority
+from low_priority import low_priority_command
+
+
+def test_command_runs_at_the_requested_niceness():
+    if not low_priority.NICE:
+        return
+    command = low_priority_command([sys.executable, '-c', 'import os; print(os.nice(0))'], 7)
+    before = int(subprocess.run([sys.executable, '-c', 'import os; print(os.nice(0))'],
+                                capture_output=True, text=True).stdout)
+    assert int(subprocess.run(command, capture_output=True, text=True).stdout) == min(19, before + 7)
+
+
+def test_missing_tools_leave_the_command_alone(monkeypatch):
+    monkeypatch.setattr(low_priority, "NICE", None)
+    monkeypatch.setattr(low_priority, "TASKSET", None)
+    assert low_priority_command(['ffprobe', 'x.mp4'], 10, last_cpu_only=True) == ['ffprobe', 'x.mp4']
+
+
+def test_tools_are_found_outside_path(monkeypatch, tmp_path):
+    """A service PATH without /usr/bin still finds tools, and FIREPLACE_<NAME> overrides"""
+    monkeypatch.setenv("PATH", str(tmp_path))
+    monkeypatch.delenv("FIREPLACE_SH", raising=False)
+    assert low_priority.find_tool("sh") in ("/usr/local/bin/sh", "/usr/bin/sh", "/bin/sh")
+
+    tool = tmp_path / "my-sh"
+    tool.write_text("#!/bin/sh\n")
+    tool.chmod(0o755)
+    monkeypatch.setenv("FIREPLACE_SH", str(tool))
+    assert low_priority.find_tool("sh") == str(tool)
+    assert low_priority.find_tool("no-such-tool") is None
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import os
+import time
+from pathlib import Path
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from media_metadata import MediaMetadataCache, parse_ffprobe_output
+from video_library import VideoLibrary
+
+FFPROBE_OUTPUT = {
+    "format": {"duration": "3600.5"},
+    "streams": [
+        {"codec_type": "video", "codec_name": "h264", "width": 1920, "height": 1080},
+        {"codec_type": "audio", "codec_name": "aac"}
+    ]
+}
+
+
+def make_fake_ffprobe(tmp_path):
+    """Executable that prints canned ffprobe JSON and counts its invocations"""
+    calls = tmp_path / "calls"
+    script = tmp_path / "ffprobe"
+    script.write_text(
+        "#!/bin/sh\n"
+        f"echo x >> '{calls}'\n"
+        f"cat <<'EOF'\n{json.dumps(FFPROBE_OUTPUT)}\nEOF\n"
+    )
+    script.chmod(0o755)
+    return script, calls
+
+
+def wait_ready(cache, library, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        videos = cache.annotate(library.listing())
+        if all(v["metadata"]["status"] != "pending" for v in videos):
+            return videos
+        time.sleep(0.02)
+    raise AssertionError("metadata never became ready")
+
+
+def test_parse_ffprobe_output():
+    metadata = parse_ffprobe_output(json.dumps(FFPROBE_OUTPUT))
+    assert metadata == {"status": "ready", "duration": 3600.5, "video_codec": "h264",
+                        "audio_codec": "aac", "width": 1920, "height": 1080}
+
+
+def test_pending_then_ready_and_persisted(tmp_path):
+    """Unknown files report pending, get probed once, and survive a restart"""
+    videos_dir = tmp_path / "videos"
+    videos_dir.mkdir()
+    (videos_dir / "fire.mp4").write_bytes(b"not really a video")
+    past = time.time() - 10
+    os.utime(videos_dir, (past, past))
+
+    ffprobe, calls = make_fake_ffprobe(tmp_path)
+    cache_file = tmp_path / "cache" / "media_metadata.json"
+    library = VideoLibrary(videos_dir)
+
+    cache = MediaMetadataCache(cache_file, ffprobe=str(ffprobe))
+    assert cache.annotate(library.listing())[0]["metadata"] == {"status": "pending"}
+    videos = wait_ready(cache, library)
+    assert videos[0]["metadata"]["duration"] == 3600.5
+    assert "metadata" not in library.videos()[0]
+    cache.close()
+
+    restarted = MediaMetadataCache(cache_file, ffprobe=str(ffprobe))
+    assert restarted.annotate(library.listing())[0]["metadata"]["status"] == "ready"
+    assert len(calls.read_text().split()) == 1
+    restarted.close()
+
+
+def test_missing_ffprobe(tmp_path):
+    cache = MediaMetadataCache(tmp_path / "cache.json", ffprobe="definitely-not-ffprobe")
+    assert cache.lookup("/nowhere.mp4", (1, 2, 3)) == {"status": "unavailable"}
+
+
+def test_annotate_uses_only_the_listing(tmp_path):
+    """Keys come from the listing's scan, so nothing is looked up per video"""
+    videos_dir = tmp_path / "videos"
+    videos_dir.mkdir()
+    (videos_dir / "fire.mp4").write_bytes(b"not really a video")
+    library = VideoLibrary(videos_dir)
+    listing = library.listing()
+    (videos_dir / "fire.mp4").unlink()
+
+    cache = MediaMetadataCache(tmp_path / "cache.json", ffprobe=str(make_fake_ffprobe(tmp_path)[0]))
+    videos = cache.annotate(listing)
+    assert [v["filename"] for v in videos] == ["fire.mp4"]
+    assert videos[0]["metadata"] == {"status": "pending"}
+    assert library.scan_count == 1
+    cache.close()
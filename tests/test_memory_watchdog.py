@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import memory_watchdog
+import runtime_status
+import server
+import watcher
+from memory_watchdog import ChromiumMemoryWatchdog, OK, RESTART_DUE, RESTART_REQUESTED
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(memory_watchdog, "time", clock)
+    return clock
+
+
+def feed(monkeypatch, rss_mb, pss_mb=None):
+    monkeypatch.setattr(memory_watchdog, "process_tree", lambda pid: ["root", "renderer"])
+    monkeypatch.setattr(memory_watchdog, "tree_memory_mb",
+                        lambda processes, pss=False: pss_mb if pss else rss_mb)
+
+
+def test_samples_real_process_tree():
+    process = subprocess.Popen(["sh", "-c", "sleep 30 & sleep 30"])
+    try:
+        time.sleep(0.1)
+        tree = memory_watchdog.process_tree(process.pid)
+        assert len(tree) >= 2
+        assert memory_watchdog.tree_memory_mb(tree) > 0
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_thresholds(clock, monkeypatch):
+    """RSS below the soft threshold is fine; above it PSS decides"""
+    dog = ChromiumMemoryWatchdog(1000)
+    feed(monkeypatch, rss_mb=500)
+    assert dog.sample(42) == OK
+    # Not due again until the interval has passed
+    assert dog.sample(42) is None
+
+    # Shared pages inflate RSS; PSS shows there is no real pressure
+    clock.now += 30
+    feed(monkeypatch, rss_mb=1200, pss_mb=600)
+    assert dog.sample(42) == OK
+
+    clock.now += 30
+    feed(monkeypatch, rss_mb=1200, pss_mb=850)
+    assert dog.sample(42) == RESTART_REQUESTED
+    assert dog.restart_requested
+
+    clock.now += 30
+    feed(monkeypatch, rss_mb=1200, pss_mb=960)
+    assert dog.sample(42) == RESTART_DUE
+
+
+def test_trend_predicts_limit(clock, monkeypatch):
+    """Fast growth forces a restart before the hard threshold is crossed"""
+    dog = ChromiumMemoryWatchdog(1000)
+    for mb in (300, 450, 600, 750):
+        feed(monkeypatch, rss_mb=mb)
+        verdict = dog.sample(42)
+        clock.now += 30
+    assert dog.trend_mb_per_min() == pytest.approx(300)
+    assert verdict == OK
+
+    feed(monkeypatch, rss_mb=1100, pss_mb=900)
+    assert dog.sample(42) == RESTART_DUE
+
+    dog.record_restart("memory_limit", "http://localhost:8080/offline")
+    status = dog.status()
+    assert status["restarts"][0]["reason"] == "memory_limit"
+    assert status["restarts"][0]["mb"] == 900
+    assert status["history"] == []
+
+
+class FakeChromium:
+    phase = watcher.PHASE_PLAYING
+    pid = 4242
+    current_target = "https://www.youtube.com/watch?v=L_LUpnjgPso"
+
+    def __init__(self):
+        self.restarts = 0
+
+    def restart(self):
+        self.restarts += 1
+
+
+def test_watcher_restarts_and_publishes(tmp_path, monkeypatch):
+    monkeypatch.setattr(runtime_status, "RUNTIME_DIR", str(tmp_path / "fireplace"))
+    fw = watcher.FireplaceWatcher()
+    fw.chromium_manager = FakeChromium()
+    monkeypatch.setattr(fw.memory_watchdog, "sample", lambda pid: RESTART_DUE)
+
+    fw._check_memory()
+    assert fw.chromium_manager.restarts == 1
+
+    response = server.app.test_client().get('/api/kiosk/memory')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["limit_mb"] == 1024
+    assert data["restarts"][0]["reason"] == "memory_limit"
+    assert data["restarts"][0]["target"] == FakeChromium.current_target
+
+    fw.network_monitor.close()
+    fw.state_cache.close()
+    fw.config_service.close()
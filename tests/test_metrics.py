@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import runtime_status
+import server
+from metrics import Registry, render_text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.histogram('demo_seconds', 'Demo latency', ['route'], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.labels('/api/state').observe(value)
+
+    text = registry.render()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{route="/api/state",le="0.1"} 2' in text
+    assert 'demo_seconds_bucket{route="/api/state",le="1"} 3' in text
+    assert 'demo_seconds_bucket{route="/api/state",le="+Inf"} 4' in text
+    assert 'demo_seconds_sum{route="/api/state"} 3.65' in text
+    assert 'demo_seconds_count{route="/api/state"} 4' in text
+
+
+def test_counters_gauges_and_label_escaping():
+    registry = Registry()
+    requests = registry.counter('demo_total', 'Demo requests', ['path'])
+    requests.labels('say "hi"\n').inc()
+    requests.labels('say "hi"\n').inc(2)
+    online = registry.gauge('demo_online', 'Demo gauge')
+    online.set(1)
+
+    text = registry.render()
+    assert 'demo_total{path="say \\"hi\\"\\n"} 3' in text
+    assert 'demo_online 1' in text
+    with pytest.raises(ValueError):
+        requests.inc()
+
+
+def test_registering_twice_returns_the_same_metric():
+    registry = Registry()
+    first = registry.counter('demo_total', 'Demo')
+    assert registry.counter('demo_total', 'Demo') is first
+
+
+def test_snapshot_renders_like_the_registry():
+    registry = Registry()
+    registry.histogram('demo_seconds', 'Demo').observe(0.2)
+    registry.counter('demo_total', 'Demo', ['kind']).labels('a').inc()
+    assert render_text(registry.snapshot()) == registry.render()
+
+
+def test_metrics_endpoint_reports_requests_and_state_writes(client):
+    """Requests are counted per route rule and state writes are timed"""
+    client.post('/api/volume', json={"volume": 33})
+    client.get('/videos/does-not-exist.mp4')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'fireplace_http_requests_total{method="POST",route="/api/volume",status="200"}' in text
+    assert 'route="/videos/<path:filename>",status="404"' in text
+    assert 'fireplace_http_request_duration_seconds_bucket{method="POST",route="/api/volume",le="+Inf"}' in text
+    assert 'fireplace_state_write_duration_seconds_count' in text
+    assert 'fireplace_watcher_metrics_age_seconds' in text
+
+
+def test_unknown_methods_do_not_add_series(client):
+    """Client-chosen methods share one "other" series"""
+    client.open('/api/state', method='X0')
+    counts = [len(metric._series) for metric in
+              (server.http_requests, server.http_request_seconds, server.request_component_seconds)]
+    for method in ('X1', 'X2', 'BREW'):
+        client.open('/api/state', method=method)
+    assert [len(metric._series) for metric in
+            (server.http_requests, server.http_request_seconds, server.request_component_seconds)] == counts
+    assert 'fireplace_http_requests_total{method="other",route="unmatched",status="405"}' in \
+        client.get('/metrics').get_data(as_text=True)
+
+
+def test_running_totals_are_counters(client):
+    """Totals since start are exported as counters, so rate() works on them"""
+    client.get('/')
+    text = client.get('/metrics').get_data(as_text=True)
+    assert '# TYPE fireplace_page_renders_total counter' in text
+    assert '# TYPE fireplace_rate_limited_requests_total counter' in text
+    assert '# TYPE fireplace_sse_clients gauge' in text
+
+
+def test_metrics_endpoint_includes_watcher_snapshot(client):
+    watcher_registry = Registry()
+    watcher_registry.histogram('fireplace_demo_cycle_seconds', 'Cycle').observe(0.002)
+    runtime_status.publish('watcher_metrics', {"metrics": watcher_registry.snapshot()})
+
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'fireplace_demo_cycle_seconds_count 1' in text
+    assert text.count('# TYPE fireplace_demo_cycle_seconds histogram') == 1
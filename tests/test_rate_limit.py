@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import server
+from rate_limit import READ, WRITE, RateLimiter, TokenBucketLimiter, route_class
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_refills_at_rate():
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(60, burst=3, clock=clock)
+    assert [limiter.acquire("phone") for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("phone") == pytest.approx(1.0)
+
+    clock.now += 0.5
+    assert limiter.acquire("phone") == pytest.approx(0.5)
+    clock.now += 0.5
+    assert limiter.acquire("phone") == 0
+
+    # Idle time never banks more than the burst
+    clock.now += 3600
+    assert [limiter.acquire("phone") for _ in range(4)][-1] > 0
+
+    # Other clients have their own bucket
+    assert limiter.acquire("laptop") == 0
+
+
+def test_lru_eviction_bounds_memory():
+    limiter = TokenBucketLimiter(60, max_buckets=3, clock=FakeClock())
+    for client in ("a", "b", "c"):
+        limiter.acquire(client)
+    limiter.acquire("a")
+    limiter.acquire("d")
+    assert len(limiter) == 3
+    assert "b" not in limiter._buckets
+    assert "a" in limiter._buckets
+
+
+def test_rejections_are_counted_exactly_under_contention():
+    limiter = RateLimiter(60, clock=FakeClock())
+    results = []
+
+    def hammer():
+        results.extend(limiter.check("192.168.1.50", "POST", "/api/volume") for _ in range(2000))
+
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert limiter.rejected == sum(1 for result in results if result is not None) > 0
+
+
+def test_route_classes():
+    assert route_class("POST", "/api/volume") == WRITE
+    assert route_class("DELETE", "/api/favorites/remove") == WRITE
+    assert route_class("GET", "/api/state") == READ
+    assert route_class("GET", "/videos/fire.mp4") is None
+    assert route_class("GET", "/api/events") is None
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, "rate_limiter", RateLimiter(2, clock=FakeClock()))
+    monkeypatch.setattr(server.state_manager, "update_fields", lambda updates: True)
+    return server.app.test_client()
+
+
+def test_rate_limited_writes_get_429(client):
+    """Remote clients are limited per route class; the kiosk itself is not"""
+    remote = {"REMOTE_ADDR": "192.168.1.50"}
+    statuses = [client.post('/api/volume', json={"volume": 40}, environ_base=remote).status_code
+                for _ in range(4)]
+    assert statuses[:1] == [200]
+    assert statuses[-1] == 429
+
+    response = client.post('/api/volume', json={"volume": 40}, environ_base=remote)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.get_json() == {"error": "Rate limit exceeded"}
+
+    # Reads use a separate, larger bucket
+    assert client.get('/api/state', environ_base=remote).status_code == 200
+    # Loopback (the kiosk browser) is exempt
+    assert client.post('/api/volume', json={"volume": 40}).status_code == 200
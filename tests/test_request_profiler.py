@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import request_profiler
+import server
+from request_profiler import RequestProfiler
+
+
+def test_nested_components_count_once():
+    @request_profiler.timed_call('state')
+    def inner():
+        return 1
+
+    @request_profiler.timed_call('state')
+    def outer():
+        with request_profiler.timed('render'):
+            pass
+        return inner() + inner()
+
+    request_profiler.begin_request()
+    assert outer() == 2
+    timings = request_profiler.end_request()
+    assert set(timings) == {'state', 'render'}
+    assert timings['state'] >= timings['render'] >= 0
+
+
+def test_nothing_is_recorded_outside_a_request():
+    with request_profiler.timed('state'):
+        pass
+    assert request_profiler.end_request() == {}
+
+
+def work(n):
+    return sum(i * i for i in range(n))
+
+
+def test_profiler_samples_one_in_n_into_a_ring():
+    profiler = RequestProfiler(sample_every=2, capacity=3)
+    sampled = 0
+    for _ in range(10):
+        profile = profiler.start()
+        if profile is None:
+            continue
+        sampled += 1
+        work(2000)
+        profiler.finish(profile, 'GET', '/api/state', 0.01)
+
+    assert sampled == 5
+    assert len(profiler.samples) == 3
+    sample = profiler.samples[-1]
+    assert sample["route"] == '/api/state'
+    assert any('work' in step["function"] for step in sample["hot_path"])
+    assert sample["top_functions"]
+
+
+def test_profiler_is_off_by_default():
+    profiler = RequestProfiler()
+    assert all(profiler.start() is None for _ in range(10))
+
+
+@pytest.fixture
+def client(client, monkeypatch):
+    """The shared test client with every request profiled"""
+    monkeypatch.setattr(server, "profiler", RequestProfiler(sample_every=1))
+    return client
+
+
+def test_requests_report_component_timings(client):
+    """State and render time show up in Server-Timing and the component histogram"""
+    timing = client.get('/').headers["Server-Timing"]
+    assert "state;dur=" in timing
+    assert "render;dur=" in timing
+    assert "total;dur=" in timing
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'fireplace_http_request_component_seconds_count{method="GET",route="/",component="render"}' in text
+
+
+def test_profiles_are_downloadable(client):
+    client.post('/api/volume', json={"volume": 21})
+    response = client.get('/api/admin/profiles')
+    assert response.status_code == 200
+    assert "attachment" in response.headers["Content-Disposition"]
+    report = response.get_json()
+    assert report["sample_every"] == 1
+    routes = [sample["route"] for sample in report["samples"]]
+    assert '/api/volume' in routes
+    assert all(sample["hot_path"] for sample in report["samples"])
+
+
+def test_streaming_request_does_not_hold_the_profiler(client):
+    """A sampled SSE request is finished before streaming, so the next request is sampled too"""
+    events = client.get('/api/events', buffered=False)
+    next(events.response)
+    client.get('/api/volume')
+    routes = [sample["route"] for sample in server.profiler.report()["samples"]]
+    assert routes == ['/api/events', '/api/volume']
+    events.close()
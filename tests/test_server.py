@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+from pathlib import Path
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import server
+
+
+def read_state_file():
+    with open(server.state_manager.state_file) as f:
+        return json.load(f)
+
+
+def test_update_fields_writes_once(client, monkeypatch):
+    """Multi-field updates are validated and written as one commit"""
+    writes = []
+    original = server.write_json_atomic
+    monkeypatch.setattr(server, "write_json_atomic",
+                        lambda path, data: (writes.append(data), original(path, data))[1])
+
+    response = client.post('/api/preset', json={"url": "https://www.youtube.com/watch?v=mSX3OyW9Rao"})
+    assert response.status_code == 200
+    assert len(writes) == 1
+
+    on_disk = read_state_file()
+    assert on_disk["mode"] == "online"
+    assert on_disk["last_online_url"] == "https://www.youtube.com/watch?v=mSX3OyW9Rao"
+
+
+def test_update_fields_rejects_invalid_state(client):
+    """An invalid update leaves both the file and the cache untouched"""
+    before = read_state_file()
+    assert not server.state_manager.update_fields({"volume": 60, "mode": "sideways"})
+    assert read_state_file() == before
+    assert server.state_manager.load_state()["mode"] == before["mode"]
+
+
+def test_unchanged_update_skips_write(client):
+    """Setting a field to its current value does not touch the disk"""
+    volume = server.state_manager.load_state()["volume"]
+    revision = server.state_manager.revision
+    response = client.post('/api/volume', json={"volume": volume})
+    assert response.status_code == 200
+    assert server.state_manager.revision == revision
+
+
+def test_favorite_add_and_remove(client):
+    """Favorites round-trip through the API without mutating cached state"""
+    client.post('/api/mode', json={"mode": "online"})
+    response = client.post('/api/favorites/add', json={"name": "Cozy"})
+    assert response.status_code == 200
+    favorite_id = response.get_json()["favorite"]["id"]
+
+    duplicate = client.post('/api/favorites/add', json={"name": "Cozy again"})
+    assert duplicate.status_code == 400
+
+    response = client.delete('/api/favorites/remove', json={"id": favorite_id})
+    assert response.status_code == 200
+    assert client.get('/api/favorites').get_json() == {"favorites": []}
+    assert client.delete('/api/favorites/remove', json={"id": favorite_id}).status_code == 404
+
+
+def test_legacy_favorites_move_out_of_state(client):
+    """Favorites saved in state.json by older versions are moved into the store once"""
+    favorite = {"id": "fav_0123abcd", "name": "Old", "type": "favorite", "source": "offline",
+                "filename": "fire.mp4", "created_date": "2025-08-16T12:00:00Z"}
+    server.state_manager.update_fields({"user_favorites": [favorite]})
+
+    server.migrate_favorites()
+    server.migrate_favorites()
+    assert read_state_file()["user_favorites"] == []
+    assert server.favorites.all() == [favorite]
+
+
+def test_duplicate_legacy_favorites_are_reported(client, caplog):
+    favorite = {"id": "fav_0123abcd", "name": "Old", "type": "favorite", "source": "offline",
+                "filename": "fire.mp4", "created_date": "2025-08-16T12:00:00Z"}
+    again = dict(favorite, id="fav_4567cdef")
+    server.state_manager.update_fields({"user_favorites": [favorite, again]})
+
+    server.migrate_favorites()
+    assert server.favorites.all() == [favorite]
+    assert any("Dropped 1 favorites" in r.message for r in caplog.records)
+
+
+def test_favorites_export_and_import(client):
+    """Favorites stream out as NDJSON and back in, skipping ones already present"""
+    client.post('/api/mode', json={"mode": "online"})
+    client.post('/api/favorites/add', json={"name": "Cozy"})
+    export = client.get('/api/favorites/export')
+    assert export.mimetype == "application/x-ndjson"
+    lines = export.get_data(as_text=True).splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["Cozy"]
+
+    body = "\n".join(lines + [
+        '{"name": "Logs", "filename": "logs.mp4"}',
+        '',
+        'not json',
+        '{"name": "Traversal", "filename": "../etc/passwd.mp4"}',
+        '{"name": "Other form", "url": "https://youtu.be/L_LUpnjgPso"}',
+    ])
+    response = client.post('/api/favorites/import', data=body)
+    report = response.get_json()
+    assert response.status_code == 200
+    assert (report["imported"], report["duplicates"], report["invalid"]) == (1, 2, 2)
+    assert [error["line"] for error in report["errors"]] == [4, 5]
+    assert [f["name"] for f in server.favorites.all()] == ["Cozy", "Logs"]
+
+
+def test_playlists_export_and_import(client):
+    """Imported playlists are merged into existing ones in a single state write"""
+    server.state_manager.update_fields({"playlists": {"default": ["a.mp4"]}})
+    revision = server.state_manager.revision
+    body = "\n".join([
+        '{"name": "default", "videos": ["a.mp4", "b.mp4"]}',
+        '{"name": "evening", "videos": ["c.mp4", "c.mp4"]}',
+        '{"name": "bad name!", "videos": []}',
+    ])
+    report = client.post('/api/playlists/import', data=body).get_json()
+    assert (report["imported"], report["duplicates"], report["invalid"]) == (2, 2, 1)
+    assert server.state_manager.revision == revision + 1
+
+    export = client.get('/api/playlists/export').get_data(as_text=True)
+    assert [json.loads(line) for line in export.splitlines()] == [
+        {"name": "default", "videos": ["a.mp4", "b.mp4"]},
+        {"name": "evening", "videos": ["c.mp4"]},
+    ]
+
+
+def test_state_journal_can_be_switched_on_and_off(client):
+    """Journaled commits leave state.json alone until the journal is folded back in"""
+    before = read_state_file()
+    server.state_manager.set_journal(True)
+    assert client.post('/api/volume', json={"volume": 33}).status_code == 200
+    assert read_state_file() == before
+    assert client.get('/api/volume').get_json()["volume"] == 33
+
+    server.state_manager.set_journal(False)
+    client.post('/api/mute', json={"muted": not before["muted"]})
+    assert not server.state_manager._cache.has_journal()
+    on_disk = read_state_file()
+    assert on_disk["volume"] == 33
+    assert on_disk["muted"] != before["muted"]
+
+
+def test_event_stream_pushes_changed_fields(client):
+    """/api/events sends a snapshot, then only the fields that changed"""
+    response = client.get('/api/events', buffered=False)
+    chunks = iter(response.response)
+
+    snapshot = next(chunks).decode()
+    assert snapshot.startswith("id: ")
+    assert "event: snapshot" in snapshot
+
+    client.post('/api/volume', json={"volume": 12})
+    event = next(chunks).decode()
+    assert "event: state" in event
+    data = json.loads(event.split("data: ", 1)[1])
+    assert data["changes"] == {"volume": 12}
+    assert data["revision"] == server.state_manager.revision
+    response.close()
+    assert server.state_manager.events.subscriber_count == 0
+
+
+def test_event_streams_beyond_the_cap_are_refused(client, monkeypatch):
+    """Streams pin a thread each, so extra clients are told to come back later"""
+    monkeypatch.setattr(server.state_manager.events, "max_subscribers", 1)
+    first = client.get('/api/events', buffered=False)
+    next(iter(first.response))
+
+    refused = client.get('/api/events')
+    assert refused.status_code == 503
+    assert refused.headers["Retry-After"] == str(server.SSE_RETRY_SECONDS)
+    assert client.get('/api/volume').status_code == 200
+
+    first.close()
+    second = client.get('/api/events', buffered=False)
+    assert second.status_code == 200
+    second.close()
+
+
+def test_index_is_cached_and_conditional(client):
+    """The control page is rendered once per input change and revalidates with 304"""
+    response = client.get('/')
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert response.headers["Last-Modified"]
+    assert "no-cache" in response.headers["Cache-Control"]
+    assert server.page_cache.render_count == 1
+
+    response = client.get('/', headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert server.page_cache.render_count == 1
+
+    client.post('/api/volume', json={"volume": 17})
+    response = client.get('/', headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert b"17%" in response.data
+    assert server.page_cache.render_count == 2
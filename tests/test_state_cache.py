@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import os
+from pathlib import Path
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from state_cache import StateCache, InotifyWatch, file_signature, write_json_atomic
+
+
+def write_state(path, state):
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+
+def test_cache_hit_does_not_reparse(tmp_path):
+    """Repeated reads return the same object and revision"""
+    state_file = tmp_path / "state.json"
+    write_state(state_file, {"mode": "offline", "volume": 60})
+
+    for use_inotify in (True, False):
+        cache = StateCache(state_file, use_inotify=use_inotify)
+        first = cache.get()
+        assert cache.get() is first
+        assert cache.revision == 1
+        cache.close()
+
+
+def test_external_write_invalidates(tmp_path):
+    """A write from another process is picked up on the next read"""
+    state_file = tmp_path / "state.json"
+    write_state(state_file, {"volume": 60})
+
+    for use_inotify in (True, False):
+        cache = StateCache(state_file, use_inotify=use_inotify)
+        assert cache.get()["volume"] == 60
+        write_state(state_file, {"volume": 35})
+        assert cache.get()["volume"] == 35
+        assert cache.revision == 2
+        write_state(state_file, {"volume": 60})
+        cache.close()
+
+
+def test_prime_skips_reload(tmp_path):
+    """Priming after a local write avoids re-reading our own file"""
+    state_file = tmp_path / "state.json"
+    write_state(state_file, {"volume": 60})
+
+    cache = StateCache(state_file)
+    cache.get()
+    new_state = {"volume": 10}
+    write_state(state_file, new_state)
+    cache.prime(new_state)
+    assert cache.get() is new_state
+    assert cache.revision == 2
+    cache.close()
+
+
+def test_prime_notices_a_write_that_raced_ours(tmp_path):
+    """Another process replacing the file before prime() is not hidden by it"""
+    state_file = tmp_path / "state.json"
+    write_state(state_file, {"volume": 60})
+
+    for use_inotify in (True, False):
+        cache = StateCache(state_file, use_inotify=use_inotify)
+        cache.get()
+        ours = {"volume": 10}
+        signature = write_json_atomic(state_file, ours)
+        assert signature == file_signature(state_file)
+        write_state(state_file, {"volume": 20})
+        cache.prime(ours, signature)
+        assert cache.get() == {"volume": 20}
+        cache.close()
+
+
+def test_invalid_state_uses_defaults(tmp_path):
+    """Validation failures and missing files fall back to the default factory"""
+    state_file = tmp_path / "state.json"
+    write_state(state_file, {"volume": "loud"})
+
+    cache = StateCache(state_file,
+                       validate=lambda s: isinstance(s.get("volume"), int),
+                       default_factory=lambda: {"volume": 60})
+    assert cache.get() == {"volume": 60}
+
+    state_file.unlink()
+    cache.invalidate()
+    assert cache.get() == {"volume": 60}
+    cache.close()
+
+
+def test_inotify_ignores_other_files(tmp_path):
+    """Only events for the watched file count as changes"""
+    if not InotifyWatch.available():
+        return
+    watch = InotifyWatch(tmp_path / "state.json")
+    assert watch.open()
+    (tmp_path / "other.json").write_text("{}")
+    assert not watch.read_changed()
+    (tmp_path / "state.json").write_text("{}")
+    assert watch.read_changed()
+    watch.close()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import state_journal
+from state_journal import JournaledStateCache, encode_record
+
+
+@pytest.fixture
+def state_file(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text(json.dumps({"mode": "offline", "volume": 60, "muted": True}))
+    return path
+
+
+def test_changes_are_appended_not_rewritten(state_file):
+    """Only the changed fields are journaled, and other readers replay them"""
+    writer = JournaledStateCache(state_file, fsync=False)
+    reader = JournaledStateCache(state_file, use_inotify=False)
+    snapshot = state_file.read_text()
+    assert reader.get()["volume"] == 60
+
+    assert writer.append(dict(writer.get(), volume=40))
+    assert writer.append(dict(writer.get(), muted=False))
+    assert not writer.append(dict(writer.get()))
+
+    assert state_file.read_text() == snapshot
+    assert writer.journal_path.read_bytes() == (encode_record({"volume": 40}) + encode_record({"muted": False}))
+    assert reader.get() == {"mode": "offline", "volume": 40, "muted": False}
+    assert reader.get() is reader.get()
+
+
+def test_replay_stops_at_the_last_valid_record(state_file):
+    """A torn or corrupted record and everything after it is ignored, then dropped"""
+    journal = state_journal.journal_path_for(state_file)
+    good = encode_record({"volume": 10})
+    corrupt = encode_record({"volume": 20}).replace(b"20", b"21")
+    journal.write_bytes(good + corrupt + encode_record({"volume": 30}) + b'0badc0de {"set":')
+
+    cache = JournaledStateCache(state_file, fsync=False)
+    assert cache.get()["volume"] == 10
+    assert cache.append(dict(cache.get(), mode="online"))
+    assert journal.read_bytes() == good + encode_record({"mode": "online"})
+
+
+def test_compaction_folds_the_journal_into_state_json(state_file):
+    writer = JournaledStateCache(state_file, fsync=False)
+    reader = JournaledStateCache(state_file, use_inotify=False)
+    writer.append(dict(writer.get(), volume=25))
+    reader.get()
+
+    writer.compact()
+    assert not writer.has_journal()
+    assert json.loads(state_file.read_text())["volume"] == 25
+    assert reader.get()["volume"] == 25
+    writer.append(dict(writer.get(), volume=35))
+    assert reader.get()["volume"] == 35
+
+
+def test_interrupted_compaction_replays_to_the_same_state(state_file):
+    """A journal left behind after state.json was rewritten changes nothing"""
+    writer = JournaledStateCache(state_file, fsync=False)
+    writer.append(dict(writer.get(), volume=25))
+    writer.append(dict(writer.get(), volume=45, mode="online"))
+    state_file.write_text(json.dumps(writer.get()))
+
+    assert JournaledStateCache(state_file).get() == {"mode": "online", "volume": 45, "muted": True}
+
+
+def test_large_journal_is_compacted_in_the_background(state_file, monkeypatch):
+    monkeypatch.setattr(state_journal, "JOURNAL_COMPACT_BYTES", 200)
+    cache = JournaledStateCache(state_file, fsync=False)
+    for volume in range(20):
+        cache.append(dict(cache.get(), volume=volume))
+
+    deadline = time.time() + 5
+    while cache.has_journal() and time.time() < deadline:
+        time.sleep(0.01)
+    assert not cache.has_journal() or cache.journal_bytes < 200
+    assert JournaledStateCache(state_file).get()["volume"] == 19
+
+
+def test_prime_after_a_direct_write_sees_a_racing_append(state_file):
+    """A journal started by another process between our write and prime() is replayed"""
+    cache = JournaledStateCache(state_file, fsync=False)
+    cache.get()
+    ours = dict(cache.get(), volume=30)
+    signature = state_journal.write_json_atomic(state_file, ours, fsync=False)
+    other = JournaledStateCache(state_file, fsync=False)
+    other.append(dict(other.get(), muted=False))
+
+    cache.prime(ours, signature)
+    assert cache.get() == {"mode": "offline", "volume": 30, "muted": False}
+
+
+def test_incremental_and_full_readers_reject_the_same_invalid_record(state_file):
+    """A reader replaying only new records validates them like one replaying the whole journal"""
+    valid = lambda state: 0 <= state.get("volume", 0) <= 100
+    writer = JournaledStateCache(state_file, fsync=False)
+    incremental = JournaledStateCache(state_file, validate=valid, use_inotify=False)
+    writer.append(dict(writer.get(), volume=40))
+    assert incremental.get()["volume"] == 40
+
+    writer.append(dict(writer.get(), volume=500))
+    full = JournaledStateCache(state_file, validate=valid, use_inotify=False)
+    assert incremental.get() == full.get() == {"mode": "offline", "volume": 60, "muted": True}
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+import resource
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import server
+import thumbnails
+from thumbnails import ThumbnailStore
+
+
+def make_fake_ffmpeg(tmp_path):
+    """Executable that writes a fake JPEG to its last argument"""
+    script = tmp_path / "ffmpeg"
+    script.write_text('#!/bin/sh\nfor last; do :; done\nprintf "\\377\\330jpeg" > "$last"\n')
+    script.chmod(0o755)
+    return script
+
+
+def wait_for_thumbnail(store, video_path, file_key, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        thumb_id = store.lookup(video_path, file_key)
+        if thumb_id:
+            return thumb_id
+        time.sleep(0.02)
+    raise AssertionError("thumbnail was never generated")
+
+
+def test_lazy_generation_and_stable_ids(tmp_path):
+    """Missing thumbnails are queued, then served under a stable id"""
+    store = ThumbnailStore(tmp_path / "thumbs", ffmpeg=str(make_fake_ffmpeg(tmp_path)), cpu_budget=0)
+    file_key = (1234, 5678, 9)
+    assert store.lookup("/videos/fire.mp4", file_key) is None
+
+    thumb_id = wait_for_thumbnail(store, "/videos/fire.mp4", file_key)
+    assert thumb_id == store.thumbnail_id(file_key)
+    assert store.thumbnail_id((1234, 5678, 10)) != thumb_id
+    assert store.path_for(thumb_id).read_bytes().startswith(b"\xff\xd8")
+    store.close()
+
+    # Existing thumbnails are found again after a restart without regenerating
+    restarted = ThumbnailStore(tmp_path / "thumbs", ffmpeg=str(make_fake_ffmpeg(tmp_path)))
+    assert restarted.lookup("/videos/fire.mp4", file_key) == thumb_id
+
+
+def test_failures_are_retried_after_a_backoff(tmp_path, monkeypatch):
+    """A failed generation is not retried on every lookup, but is not given up on either"""
+    failing = tmp_path / "failing-ffmpeg"
+    failing.write_text('#!/bin/sh\nexit 1\n')
+    failing.chmod(0o755)
+    store = ThumbnailStore(tmp_path / "thumbs", ffmpeg=str(failing), cpu_budget=0)
+    file_key = (1, 2, 3)
+    store.lookup("/videos/fire.mp4", file_key)
+    thumb_id = store.thumbnail_id(file_key)
+    deadline = time.time() + 5
+    while thumb_id not in store._failed and time.time() < deadline:
+        time.sleep(0.02)
+    assert thumb_id in store._failed
+
+    store.ffmpeg = str(make_fake_ffmpeg(tmp_path))
+    time.sleep(0.1)
+    assert store.lookup("/videos/fire.mp4", file_key) is None
+    assert not store._pending
+
+    monkeypatch.setattr(thumbnails, "THUMBNAIL_RETRY_SECONDS", 0)
+    assert wait_for_thumbnail(store, "/videos/fire.mp4", file_key) == thumb_id
+    store.close()
+
+
+def test_cpu_budget_counts_only_ffmpeg(tmp_path):
+    """Other children reaped meanwhile are not charged to thumbnail generation"""
+    idle = tmp_path / "idle-ffmpeg"
+    idle.write_text('#!/bin/sh\nsleep 1\nfor last; do :; done\nprintf "\\377\\330jpeg" > "$last"\n')
+    idle.chmod(0o755)
+    store = ThumbnailStore(tmp_path / "thumbs", ffmpeg=str(idle), cpu_budget=0)
+
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # Busy work by an unrelated child, reaped on another thread while ffmpeg runs
+    busy = subprocess.Popen([sys.executable, "-c", "sum(range(10**7))"])
+    reaper = threading.Thread(target=busy.wait)
+    reaper.start()
+    cpu, error = store._generate("/videos/fire.mp4", tmp_path / "out.jpg", 0)
+    reaper.join()
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    assert error is None
+    assert children_after.ru_utime - children_before.ru_utime > 0.1
+    assert cpu < 0.1
+
+
+def test_timeout_kills_ffmpeg(tmp_path):
+    slow = tmp_path / "slow-ffmpeg"
+    slow.write_text('#!/bin/sh\nexec sleep 10\n')
+    slow.chmod(0o755)
+    store = ThumbnailStore(tmp_path / "thumbs", ffmpeg=str(slow), timeout=0.2)
+    started = time.monotonic()
+    _, error = store._generate("/videos/fire.mp4", tmp_path / "out.jpg", 0)
+    assert "timed out" in error
+    assert time.monotonic() - started < 5
+
+
+def test_disabled_store(tmp_path):
+    store = ThumbnailStore(tmp_path / "thumbs", enabled=False)
+    assert store.lookup("/videos/fire.mp4", (1, 2, 3)) is None
+    assert store.path_for("0" * 40) is None
+
+
+def test_missing_ffmpeg_is_reported_once(tmp_path, caplog):
+    store = ThumbnailStore(tmp_path / "thumbs", ffmpeg="no-such-ffmpeg")
+    store.set_enabled(True)
+    store.set_enabled(True)
+    assert not store.enabled
+    assert [r.message for r in caplog.records].count(
+        "no-such-ffmpeg not found (set FIREPLACE_FFMPEG), thumbnails disabled") == 1
+
+
+def test_thumbnail_route_caching(tmp_path, monkeypatch):
+    """Thumbnails carry an ETag and immutable caching, and revalidate with 304"""
+    store = ThumbnailStore(tmp_path / "thumbs", ffmpeg=str(make_fake_ffmpeg(tmp_path)), cpu_budget=0)
+    thumb_id = wait_for_thumbnail(store, "/videos/fire.mp4", (1, 2, 3))
+    monkeypatch.setattr(server, "thumbnails", store)
+    client = server.app.test_client()
+
+    response = client.get(f"/thumbnails/{thumb_id}")
+    assert response.status_code == 200
+    assert response.mimetype == "image/jpeg"
+    assert response.headers["ETag"] == f'"{thumb_id}"'
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "max-age=31536000" in response.headers["Cache-Control"]
+
+    response = client.get(f"/thumbnails/{thumb_id}", headers={"If-None-Match": f'"{thumb_id}"'})
+    assert response.status_code == 304
+
+    assert client.get("/thumbnails/../../etc/passwd").status_code == 404
+    assert client.get("/thumbnails/" + "f" * 40).status_code == 404
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+from pathlib import Path
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from validators import ConfigValidator, URLValidator, parse_youtube_url
+
+CONFIG_DIR = Path(__file__).parent.parent / "config"
+
+
+def make_validator():
+    return ConfigValidator(str(CONFIG_DIR / "schema.json"))
+
+
+def test_validators_are_compiled_once():
+    """The compiled state and policy validators are reused between calls"""
+    validator = make_validator()
+    with open(CONFIG_DIR / "state_default.json") as f:
+        state = json.load(f)
+    with open(CONFIG_DIR / "policy.json") as f:
+        policy = json.load(f)
+
+    assert validator.validate_state(state)
+    compiled = validator.state_validator
+    assert validator.validate_state(state)
+    assert validator.state_validator is compiled
+
+    assert validator.validate_policy(policy)
+    assert not validator.validate_policy({"network": {"check_interval": 0}})
+
+
+def test_validate_state_fields():
+    """The partial fast path checks only the supplied fields"""
+    validator = make_validator()
+    assert validator.validate_state_fields({"volume": 40, "muted": False})
+    assert validator.validate_state_fields({"mode": "online", "last_online_url": "https://youtu.be/abc"})
+    assert not validator.validate_state_fields({"volume": 140})
+    assert not validator.validate_state_fields({"mode": "sideways"})
+    assert not validator.validate_state_fields({"not_a_field": 1})
+    assert not validator.validate_state_fields({"scheduled_shutdown": {"enabled": True}})
+
+
+def test_parse_youtube_url():
+    """Each URL is parsed once and the result builds every player URL"""
+    parsed = parse_youtube_url("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10")
+    assert parsed.valid and parsed.video_id == "dQw4w9WgXcQ"
+    assert parse_youtube_url("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10") is parsed
+    assert parsed.canonical_url == "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    assert parsed.embed_url("http://localhost:3000/") == \
+        "http://localhost:3000/embed/dQw4w9WgXcQ?autoplay=1&controls=0&loop=1"
+    assert parsed.fullpage_url().endswith("playlist=dQw4w9WgXcQ")
+    assert parse_youtube_url("https://youtube.com/shorts/abc123").video_id == "abc123"
+
+    assert not parse_youtube_url("https://example.com").valid
+    assert parse_youtube_url(None).embed_url() is None
+    assert URLValidator.build_youtube_embed("https://youtu.be/abc") == parse_youtube_url("https://youtu.be/abc").embed_url()
+
+
+def test_validate_youtube_urls():
+    """A batch is normalized in one pass, with invalid and repeated videos reported by position"""
+    batch = URLValidator.validate_youtube_urls([
+        " https://youtu.be/abc ",
+        "https://example.com",
+        "https://www.youtube.com/watch?v=abc",
+        42,
+        "https://www.youtube.com/embed/xyz",
+    ])
+    assert [parsed.url for parsed in batch.valid] == ["https://youtu.be/abc", "https://www.youtube.com/embed/xyz"]
+    assert batch.invalid == [(1, "https://example.com"), (3, 42)]
+    assert batch.duplicates == [(2, "https://www.youtube.com/watch?v=abc")]
+
+
+def test_validate_presets_drops_unplayable():
+    presets = {"presets": [
+        {"name": "Fire", "url": "https://youtu.be/abc"},
+        {"name": "Broken", "url": "https://example.com"},
+        {"name": "Fire again", "url": "https://www.youtube.com/watch?v=abc"},
+    ]}
+    validator = make_validator()
+    assert validator.validate_presets(presets)
+    assert len(presets["presets"]) == 3
+    playable, problems = validator.playable_presets(presets)
+    assert [preset["name"] for preset in playable["presets"]] == ["Fire"]
+    assert len(problems) == 2
+    assert len(presets["presets"]) == 3
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import threading
+import time
+from pathlib import Path
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from video_library import VideoLibrary
+
+
+def age_directory(path, seconds=10):
+    """Backdate the directory mtime so scans are treated as settled"""
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_index_and_membership(tmp_path):
+    """Only supported video files are indexed, sorted by name"""
+    (tmp_path / "b.mp4").write_bytes(b"12345")
+    (tmp_path / "a.webm").write_bytes(b"1")
+    (tmp_path / "notes.txt").write_text("skip me")
+    (tmp_path / "dir.mp4").mkdir()
+    age_directory(tmp_path)
+
+    library = VideoLibrary(tmp_path)
+    assert [v["filename"] for v in library.videos()] == ["a.webm", "b.mp4"]
+    assert library.get("b.mp4")["size"] == 5
+    assert library.contains("a.webm")
+    assert not library.contains("notes.txt")
+    assert not library.contains("dir.mp4")
+
+
+def test_rescan_only_on_directory_change(tmp_path):
+    """Lookups reuse the index until the directory mtime changes"""
+    (tmp_path / "a.mp4").write_bytes(b"1")
+    age_directory(tmp_path, 20)
+
+    library = VideoLibrary(tmp_path)
+    library.videos()
+    library.contains("a.mp4")
+    assert library.scan_count == 1
+    revision = library.revision
+
+    (tmp_path / "b.mp4").write_bytes(b"1")
+    age_directory(tmp_path)
+    assert library.contains("b.mp4")
+    assert library.scan_count == 2
+    assert library.revision == revision + 1
+
+
+def test_listing_pairs_videos_with_their_keys(tmp_path):
+    (tmp_path / "b.mp4").write_bytes(b"12345")
+    (tmp_path / "a.webm").write_bytes(b"1")
+    age_directory(tmp_path)
+
+    library = VideoLibrary(tmp_path)
+    listing = library.listing()
+    assert listing.revision == library.revision
+    assert [(video["filename"], key) for video, key in listing.videos] == [
+        (name, library.file_key(name)) for name in ("a.webm", "b.mp4")]
+    assert library.listing() is listing
+
+
+def test_missing_directory(tmp_path):
+    library = VideoLibrary(tmp_path / "missing")
+    assert library.videos() == []
+    assert not library.contains("a.mp4")
+
+
+def test_concurrent_rescans_are_deduplicated(tmp_path, monkeypatch):
+    """Threads that find the index stale at the same time share one scan"""
+    for i in range(5):
+        (tmp_path / f"{i}.mp4").write_bytes(b"1")
+    age_directory(tmp_path)
+
+    library = VideoLibrary(tmp_path)
+    original_scan = library._scan
+
+    def slow_scan(signature):
+        time.sleep(0.1)
+        original_scan(signature)
+
+    monkeypatch.setattr(library, "_scan", slow_scan)
+    threads = [threading.Thread(target=library.videos) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert library.scan_count == 1
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import server
+from video_library import VideoLibrary
+from video_streaming import VideoStreamer
+
+CONTENT = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    videos_dir = tmp_path / "videos"
+    videos_dir.mkdir()
+    (videos_dir / "fire.mp4").write_bytes(CONTENT)
+    (videos_dir / "clip.webm").write_bytes(b"webm")
+    (tmp_path / "secret.mp4").write_bytes(b"outside")
+    os.symlink(tmp_path / "secret.mp4", videos_dir / "link.mp4")
+    past = time.time() - 10
+    os.utime(videos_dir, (past, past))
+
+    library = VideoLibrary(videos_dir)
+    monkeypatch.setattr(server, "video_library", library)
+    monkeypatch.setattr(server, "video_streamer", VideoStreamer(library))
+    return server.app.test_client()
+
+
+def test_full_and_ranged_reads(client):
+    response = client.get('/videos/fire.mp4')
+    assert response.status_code == 200
+    assert response.data == CONTENT
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.mimetype == "video/mp4"
+    assert client.get('/videos/clip.webm').mimetype == "video/webm"
+
+    response = client.get('/videos/fire.mp4', headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.data == CONTENT[10:20]
+    assert response.headers["Content-Range"] == f"bytes 10-19/{len(CONTENT)}"
+    assert response.headers["Content-Length"] == "10"
+
+    response = client.get('/videos/fire.mp4', headers={"Range": "bytes=9000-"})
+    assert response.data == CONTENT[9000:]
+
+    response = client.get('/videos/fire.mp4', headers={"Range": "bytes=-5"})
+    assert response.data == CONTENT[-5:]
+
+
+def test_unsatisfiable_and_multi_range(client):
+    response = client.get('/videos/fire.mp4', headers={"Range": f"bytes={len(CONTENT) + 1}-"})
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+    # Multiple ranges are answered with the whole file
+    response = client.get('/videos/fire.mp4', headers={"Range": "bytes=0-1,5-6"})
+    assert response.status_code == 200
+    assert response.data == CONTENT
+
+
+def test_conditional_requests(client):
+    etag = client.head('/videos/fire.mp4').headers["ETag"]
+
+    assert client.get('/videos/fire.mp4', headers={"If-None-Match": etag}).status_code == 304
+
+    response = client.get('/videos/fire.mp4', headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == 206
+
+    response = client.get('/videos/fire.mp4', headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.data == CONTENT
+
+
+def test_head_has_no_body(client):
+    response = client.head('/videos/fire.mp4', headers={"Range": "bytes=0-99"})
+    assert response.status_code == 206
+    assert response.headers["Content-Length"] == "100"
+    assert response.data == b""
+
+
+def test_path_security(client):
+    assert client.get('/videos/../secret.mp4').status_code == 404
+    assert client.get('/videos/link.mp4').status_code == 404
+    assert client.get('/videos/missing.mp4').status_code == 404
+    assert client.get('/videos/notes.txt').status_code == 400
+
+
+def test_in_place_rewrite_is_detected(client):
+    client.get('/videos/fire.mp4')
+    (server.video_library.videos_dir / "fire.mp4").write_bytes(b"shorter")
+    response = client.get('/videos/fire.mp4')
+    assert response.status_code == 200
+    assert response.data == b"shorter"
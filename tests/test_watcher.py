@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import os
+import signal
+import socket
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add app directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import runtime_status
+import watcher
+from state_journal import JournaledStateCache
+from fake_cdp import FakeCDPServer
+
+
+class FakeChromium:
+    def __init__(self):
+        self.current_target = None
+        self.ready_at = None
+        self.last_switch_method = "relaunch"
+        self.pid = None
+        self.phase = watcher.PHASE_IDLE
+        self.launches = []
+
+    def is_running(self):
+        return self.current_target is not None
+
+    def launch(self, target_url):
+        self.current_target = target_url
+        self.ready_at = time.time()
+        self.launches.append((time.time(), target_url))
+        return True
+
+    def step(self):
+        return watcher.PHASE_PLAYING if self.current_target else watcher.PHASE_IDLE
+
+    def seconds_until_step(self):
+        return None
+
+    def stop(self):
+        self.current_target = None
+        self.ready_at = None
+
+
+class FakeNetwork:
+    check_interval = 60
+
+    def __init__(self, online=True):
+        self.is_online = online
+        self.checks = 0
+
+    def check_connectivity(self):
+        self.checks += 1
+        return self.is_online
+
+    def seconds_until_next_check(self):
+        return self.check_interval
+
+    def close(self):
+        pass
+
+
+def write_state(path, state):
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+
+@pytest.fixture
+def fireplace(tmp_path, monkeypatch):
+    monkeypatch.setattr(runtime_status, "RUNTIME_DIR", str(tmp_path / "runtime"))
+    state_file = tmp_path / "state.json"
+    write_state(state_file, {
+        "mode": "offline",
+        "last_online_url": "https://www.youtube.com/watch?v=L_LUpnjgPso",
+        "volume": 60,
+        "muted": True,
+        "stick_offline_until_manual": True,
+        "version": "1.0"
+    })
+
+    fw = watcher.FireplaceWatcher()
+    fw.state_cache.close()
+    fw.state_file = state_file
+    fw.state_cache = JournaledStateCache(state_file, validate=fw.validator.validate_state,
+                                         default_factory=fw._default_state)
+    fw.chromium_manager = FakeChromium()
+    fw.network_monitor = FakeNetwork()
+    return fw
+
+
+def run_in_thread(fw):
+    thread = threading.Thread(target=fw.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 2
+    while not fw.chromium_manager.launches and time.time() < deadline:
+        time.sleep(0.01)
+    return thread
+
+
+@pytest.mark.parametrize("journaled", [False, True])
+def test_state_change_triggers_immediate_cycle(fireplace, journaled):
+    """A state write (or journaled change) is acted on well before the next network probe is due"""
+    thread = run_in_thread(fireplace)
+    assert fireplace.chromium_manager.current_target == fireplace.offline_url
+
+    state = json.loads(fireplace.state_file.read_text())
+    state["mode"] = "online"
+    written_at = time.time()
+    if journaled:
+        JournaledStateCache(fireplace.state_file, fsync=False).append(state)
+    else:
+        write_state(fireplace.state_file, state)
+
+    deadline = time.time() + 3
+    while len(fireplace.chromium_manager.launches) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+
+    fireplace.signal_handler(signal.SIGTERM, None)
+    thread.join(timeout=2)
+    assert not thread.is_alive()
+
+    switched_at, target = fireplace.chromium_manager.launches[-1]
+    assert "youtube.com/watch" in target
+    assert switched_at - written_at < 1.5
+    assert len(fireplace.switch_latencies) == 1
+
+
+def test_shutdown_signal_wakes_loop(fireplace):
+    """The self-pipe interrupts a long wait immediately"""
+    thread = run_in_thread(fireplace)
+    time.sleep(0.1)
+    started = time.time()
+    fireplace.signal_handler(signal.SIGTERM, None)
+    thread.join(timeout=2)
+    assert not thread.is_alive()
+    assert time.time() - started < 1
+
+
+def test_cycle_metrics_are_published(fireplace):
+    """Each cycle is timed and the registry reaches the server through runtime_status"""
+    fireplace.run_cycle()
+    snapshot = runtime_status.read('watcher_metrics')
+    assert snapshot is not None
+    metrics = {metric["name"]: metric for metric in snapshot["metrics"]}
+    assert metrics["fireplace_watcher_cycle_duration_seconds"]["series"][0]["count"] >= 1
+    assert metrics["fireplace_chromium_switches_total"]["labelnames"] == ["method"]
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def fake_get(behaviour):
+    """requests.get replacement: behaviour maps endpoint -> (delay, status or None)"""
+    def get(endpoint, timeout, headers):
+        delay, status = behaviour[endpoint]
+        time.sleep(min(delay, timeout))
+        if status is None or delay > timeout:
+            raise watcher.requests.ConnectionError(f"{endpoint} unreachable")
+        return FakeResponse(status)
+    return get
+
+
+def make_monitor(endpoints, timeout=1):
+    return watcher.NetworkMonitor({"network": {
+        "check_interval": 5, "check_timeout": timeout, "check_endpoints": endpoints
+    }})
+
+
+def test_probe_first_success_wins(monkeypatch):
+    """A fast endpoint answers without waiting for slow or dead ones"""
+    monkeypatch.setattr(watcher.requests, "get", fake_get({
+        "https://slow/": (0.8, 200),
+        "https://dead/": (0.1, None),
+        "https://fast/": (0.05, 204),
+    }))
+    monitor = make_monitor(["https://slow/", "https://dead/", "https://fast/"])
+    assert monitor.check_connectivity() is True
+    assert monitor.last_check_duration < 0.5
+
+    time.sleep(0.1)
+    stats = monitor.endpoint_stats
+    assert stats["https://fast/"]["successes"] == 1
+    assert stats["https://dead/"]["failures"] == 1
+    monitor.close()
+
+
+def test_probe_worst_case_is_one_timeout(monkeypatch):
+    """With every endpoint hanging, a check takes about one timeout, not one per endpoint"""
+    monkeypatch.setattr(watcher.requests, "get", fake_get({
+        f"https://hang{i}/": (5, None) for i in range(3)
+    }))
+    monitor = make_monitor([f"https://hang{i}/" for i in range(3)], timeout=1)
+    assert monitor.check_connectivity() is False
+    assert monitor.last_check_duration < 1.5
+    monitor.close()
+
+
+def test_probe_schedule_backs_off_while_offline(monkeypatch):
+    """Offline checks back off exponentially up to max_backoff; transitions probe fast"""
+    monitor = watcher.NetworkMonitor({"network": {
+        "check_interval": 5, "check_timeout": 1, "check_endpoints": ["https://a/"],
+        "exponential_backoff": True, "max_backoff": 30
+    }})
+    results = iter([True] + [False] * 8 + [True])
+    monkeypatch.setattr(monitor, "_probe_endpoints", lambda: next(results))
+
+    intervals = []
+    for _ in range(10):
+        monitor.check_connectivity(force=True)
+        intervals.append(monitor.schedule["interval"])
+
+    # online, lost (3 fast probes), back off 5/10/20/30/30, restored (fast)
+    assert intervals == [5, 2.5, 2.5, 2.5, 5, 10, 20, 30, 30, 2.5]
+    assert monitor.schedule["fast_probes_remaining"] == 2
+    assert 0 < monitor.seconds_until_next_check() <= 2.5
+    monitor.close()
+
+
+@pytest.fixture
+def chromium(tmp_path, monkeypatch):
+    """ChromiumManager driving a fake browser and a fake xdotool that logs its arguments"""
+    browser = tmp_path / "chromium"
+    browser.write_text('#!/bin/sh\nexec sleep 30\n')
+    browser.chmod(0o755)
+    xdotool = tmp_path / "xdotool"
+    xdotool.write_text(f'#!/bin/sh\necho "$*" >> {tmp_path / "xdotool.log"}\n')
+    xdotool.chmod(0o755)
+
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+    monkeypatch.setattr(watcher, "LAUNCH_SETTLE_SECONDS", 0.05)
+    monkeypatch.setattr(watcher, "LAUNCH_POLL_SECONDS", 0.02)
+    monkeypatch.setattr(watcher, "YOUTUBE_AUTOMATION_STEPS",
+                        tuple((0.05, args, name) for _, args, name in watcher.YOUTUBE_AUTOMATION_STEPS))
+    # Nothing listens on the DevTools port unless a test starts a fake
+    manager = watcher.ChromiumManager(cdp_port=free_port())
+    monkeypatch.setattr(manager, "get_chromium_flags", lambda: [str(browser)])
+    yield manager
+    manager.stop()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def step_until(manager, phase, timeout=3):
+    deadline = time.time() + timeout
+    while manager.step() != phase and time.time() < deadline:
+        time.sleep(manager.seconds_until_step() or 0.01)
+    return manager.phase
+
+
+def xdotool_calls(tmp_path):
+    log = tmp_path / "xdotool.log"
+    return log.read_text().splitlines() if log.exists() else []
+
+
+def test_launch_does_not_block(chromium):
+    started = time.time()
+    assert chromium.launch("http://localhost:8080/offline")
+    assert time.time() - started < 0.5
+    assert chromium.phase == watcher.PHASE_LAUNCHING
+    assert chromium.ready_at is None
+
+    assert step_until(chromium, watcher.PHASE_PLAYING) == watcher.PHASE_PLAYING
+    assert chromium.ready_at is not None
+    assert chromium.seconds_until_step() is None
+
+
+def test_youtube_automation_is_stepped(chromium, tmp_path):
+    chromium.launch("https://www.youtube.com/watch?v=L_LUpnjgPso")
+    assert step_until(chromium, watcher.PHASE_AUTOMATING) == watcher.PHASE_AUTOMATING
+    assert step_until(chromium, watcher.PHASE_PLAYING) == watcher.PHASE_PLAYING
+    assert xdotool_calls(tmp_path) == [" ".join(args) for _, args, _ in watcher.YOUTUBE_AUTOMATION_STEPS]
+
+
+def test_new_target_preempts_automation(chromium, tmp_path):
+    """Switching away mid-automation abandons the remaining xdotool steps"""
+    chromium.launch("https://www.youtube.com/watch?v=L_LUpnjgPso")
+    step_until(chromium, watcher.PHASE_AUTOMATING)
+    old_process = chromium.process
+
+    chromium.launch("http://localhost:8080/offline")
+    assert old_process.poll() is not None
+    assert step_until(chromium, watcher.PHASE_PLAYING) == watcher.PHASE_PLAYING
+    assert len(xdotool_calls(tmp_path)) < len(watcher.YOUTUBE_AUTOMATION_STEPS)
+
+
+def test_browser_exit_during_launch_fails(chromium, tmp_path, monkeypatch):
+    crashing = tmp_path / "crashing"
+    crashing.write_text('#!/bin/sh\necho "no display" >&2\nexit 1\n')
+    crashing.chmod(0o755)
+    monkeypatch.setattr(chromium, "get_chromium_flags", lambda: [str(crashing)])
+
+    assert chromium.launch("http://localhost:8080/offline")
+    assert step_until(chromium, watcher.PHASE_FAILED) == watcher.PHASE_FAILED
+
+
+@pytest.fixture
+def devtools(chromium):
+    server = FakeCDPServer(chromium.cdp.port).start()
+    yield server
+    server.stop()
+
+
+def test_running_browser_is_navigated_over_cdp(chromium, devtools):
+    """A target change reuses the running browser instead of relaunching it"""
+    chromium.launch("http://localhost:8080/offline")
+    assert step_until(chromium, watcher.PHASE_PLAYING) == watcher.PHASE_PLAYING
+    assert chromium.last_switch_method == "relaunch"
+    process = chromium.process
+
+    url = "https://www.youtube.com/watch?v=L_LUpnjgPso"
+    assert chromium.launch(url)
+    assert chromium.process is process
+    assert chromium.current_target == url
+    assert chromium.last_switch_method == "cdp"
+    assert devtools.current_url == url
+    assert devtools.commands == [("Page.navigate", {"url": url})]
+    # YouTube still gets its playback automation after navigating
+    assert chromium.step() == watcher.PHASE_AUTOMATING
+
+
+def test_failed_navigation_falls_back_to_relaunch(chromium, devtools):
+    chromium.launch("http://localhost:8080/offline")
+    step_until(chromium, watcher.PHASE_PLAYING)
+    process = chromium.process
+
+    devtools.fail_navigation = True
+    assert chromium.launch("https://www.youtube.com/watch?v=L_LUpnjgPso")
+    assert chromium.process is not process
+    assert chromium.last_switch_method == "relaunch"
+    assert chromium.phase == watcher.PHASE_LAUNCHING
+